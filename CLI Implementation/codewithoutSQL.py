@@ -3,43 +3,138 @@
 # CLI implementation with CSV and Graphs, no SQLite
 
 import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import contextlib
 import csv
+import numpy as np
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.store import ColumnStore, EXPENSE_SCHEMA
+from ledger.journal import Journal
+from ledger.batch import conform_columns, read_records, record_format, rejected_records, emit, write_frame, open_output
+from ledger.importer import ImportCheckpoint, import_csv
+from ledger import trace
 
+DATE_FORMAT = '%d-%m-%Y'
+CSV_FILE = "expenses.csv"
+CSV_HEADER = ["Date", "Amount Spent", "Category", "Place", "Autopay"]
+# Rows of CSV_FILE that cannot be read are moved here, unchanged, when it is compacted.
+REJECTED_FILE = "expenses.rejected.csv"
+FLUSH_BATCH_SIZE = 1000
+JOURNAL_FILE = "expenses.journal"
+GROUP_COMMIT_RECORDS = 64
+GROUP_COMMIT_MS = 200
+CHECKPOINT_RECORDS = 5000
+# Working memory for reading a CSV file, whatever its size, and where
+# interrupted batch imports record how far they got.
+IMPORT_MEMORY_BYTES = 64 * 2**20
+IMPORT_CHECKPOINT_DIR = "import_checkpoints"
+# CSV_HEADER -> store column, for batch ingest and export.
+BATCH_COLUMNS = {"Date": "date", "Amount Spent": "amount", "Category": "category", "Place": "place", "Autopay": "autopay"}
+# Set EXPENSES_TRACE and/or EXPENSES_METRICS to trace each operation; see ledger/trace.py.
+TRACE_FILE = os.environ.get("EXPENSES_TRACE")
+METRICS_FILE = os.environ.get("EXPENSES_METRICS")
+TRACE_MEMORY = os.environ.get("EXPENSES_TRACE_MEMORY") == "1"
+
+@trace.instrument
 class Expenses:
     def __init__(self):
         """Initialize the expense tracker with in-memory storage."""
         self.expenses = {}
-        self.category = []
-        self.amountspent = []
-        self.datespent = []
-        self.placeofspending = []
-        self.autopay = []
+        self.store = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+        self.saved_rows = 0
+        self.unreadable = []
+        self._checkpoint_lock = threading.Lock()
+        # Held while rows are added and while a checkpoint, which may run on
+        # another thread, takes its copy of the rows it writes.
+        self._store_lock = threading.Lock()
+        self._checkpoint_thread = None
         self.load_from_csv()
+        self.replay_journal()
+        self.journal = Journal(JOURNAL_FILE, GROUP_COMMIT_RECORDS, GROUP_COMMIT_MS)
 
     def load_from_csv(self):
-        """Load expenses from CSV into memory if it exists."""
+        """Load expenses from CSV into memory, a bounded chunk at a time, if it exists."""
+        skipped = 0
         try:
-            with open("expenses.csv", "r") as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                for row in reader:
-                    self.datespent.append(row[0])
-                    self.amountspent.append(float(row[1]))
-                    self.category.append(row[2])
-                    self.placeofspending.append(row[3])
-                    self.autopay.append(bool(int(row[4])))
+            summary = import_csv(CSV_FILE, BATCH_COLUMNS, lambda clean: self.store.extend({name: clean[name] for name in self.store.schema}),
+                                 DATE_FORMAT, IMPORT_MEMORY_BYTES, on_rejected=self.unreadable.append, normalize=normalize_saved_rows)
+            skipped = summary["rejected"]
             self.update_expenses_dict()
         except FileNotFoundError:
             pass
+        self.saved_rows = len(self.store)
+        if skipped:
+            print(f"Skipped {skipped} unreadable rows in '{CSV_FILE}'. Compacting the CSV moves them to '{REJECTED_FILE}'.")
+
+    def replay_journal(self):
+        """Re-apply journaled expenses that the last checkpoint did not reach."""
+        replayed = 0
+        for record in Journal.replay(JOURNAL_FILE):
+            # Rows are never removed, so a record's sequence number is its row index.
+            if record["lsn"] < len(self.store):
+                continue
+            self.store.append(
+                date=pd.to_datetime(record["date"], format='%Y-%m-%d'),
+                amount=record["amount"],
+                category=record["category"],
+                place=record["place"],
+                autopay=record["autopay"]
+            )
+            replayed += 1
+        if replayed:
+            self.update_expenses_dict()
+            print(f"Recovered {replayed} expenses from '{JOURNAL_FILE}'")
+
+    def add_expense(self, category, amount, date, place, autopay):
+        """Add one expense in memory and journal it."""
+        with self._store_lock:
+            self.store.append(category=category, amount=amount, date=date, place=place, autopay=autopay)
+            lsn = len(self.store) - 1
+        self.journal.append({
+            "lsn": lsn,
+            "date": date.strftime('%Y-%m-%d'),
+            "amount": amount,
+            "category": category,
+            "place": place,
+            "autopay": autopay
+        })
+        if self.journal.records >= CHECKPOINT_RECORDS:
+            self.checkpoint_in_background()
+
+    def add_expenses(self, frame):
+        """Add a batch of normalised expenses and append them to the CSV in one checkpoint."""
+        with self._store_lock:
+            self.store.extend({name: frame[name] for name in self.store.schema})
+        self.update_expenses_dict()
+        # Checkpointed rather than journaled: the batch is durable once this returns.
+        self._checkpoint()
+        return len(frame)
+
+    def import_file(self, path, memory_limit=IMPORT_MEMORY_BYTES, restart=False, on_rejected=None, date_format=DATE_FORMAT):
+        """Import a CSV of expenses of any size chunk by chunk, continuing an earlier import of it that was interrupted."""
+        checkpoint = ImportCheckpoint(IMPORT_CHECKPOINT_DIR, path, "expenses")
+        if restart:
+            checkpoint.clear()
+        elif checkpoint.stale:
+            print(f"'{path}' changed since its last import; importing it from the start.")
+        summary = import_csv(path, BATCH_COLUMNS, self.add_expenses, date_format, memory_limit, checkpoint, on_rejected,
+                             lambda raw: conform_columns(raw, BATCH_COLUMNS))
+        if summary["already_imported"]:
+            print(f"'{path}' was already imported; use --restart to import it again.")
+        elif summary["resumed_at_line"]:
+            print(f"Resumed the import of '{path}' at line {summary['resumed_at_line']}.")
+        return summary
 
     def update_expenses_dict(self):
-        """Update the expenses dictionary from lists."""
-        self.expenses["Date"] = self.datespent
-        self.expenses["Amount Spent"] = self.amountspent
-        self.expenses["Category"] = self.category
-        self.expenses["Place"] = self.placeofspending
-        self.expenses["Autopay"] = self.autopay
+        """Update the expenses dictionary with views of the store's columns."""
+        self.expenses["Date"] = self.store.values("date")
+        self.expenses["Amount Spent"] = self.store.values("amount")
+        self.expenses["Category"] = self.store.values("category")
+        self.expenses["Place"] = self.store.values("place")
+        self.expenses["Autopay"] = self.store.values("autopay")
 
     def enter_expenses(self):
         """Enter new expenses and save to CSV."""
@@ -50,16 +145,11 @@ class Expenses:
                 amount = float(input("Enter amount spent: "))
                 if amount < 0:
                     raise ValueError("Amount cannot be negative.")
-                date = input("Date of spending (DD-MM-YYYY): ")
+                date = pd.to_datetime(input("Date of spending (DD-MM-YYYY): "), format=DATE_FORMAT)
                 place = input("Enter place of spending: ")
                 autopay = input("Auto-pay? (True/False): ").lower() == 'true'
-                self.category.append(category)
-                self.amountspent.append(amount)
-                self.datespent.append(date)
-                self.placeofspending.append(place)
-                self.autopay.append(autopay)
+                self.add_expense(category, amount, date, place, autopay)
             self.update_expenses_dict()
-            self.save_to_csv()
             print("Expenses added. Enter 1 to view, 0 to continue.")
             if int(input()) == 1:
                 self.view_expenses()
@@ -67,37 +157,114 @@ class Expenses:
             print(f"Error: {e}. Try again.")
 
     def view_expenses(self):
-        """View expenses and save to CSV."""
-        if not self.datespent:
+        """View expenses."""
+        if not len(self.store):
             print("No expenses found.")
             return
         print("\n=== Expenses ===")
-        for i in range(len(self.datespent)):
-            print(f"{self.datespent[i]} | ${self.amountspent[i]:.2f} | {self.category[i]} | {self.placeofspending[i]} | Autopay: {self.autopay[i]}")
-        self.save_to_csv()
+        df = self.store.to_frame()
+        for row in zip(df["date"].dt.strftime(DATE_FORMAT), df["amount"], df["category"], df["place"], df["autopay"]):
+            print(f"{row[0]} | ${row[1]:.2f} | {row[2]} | {row[3]} | Autopay: {row[4]}")
 
     def total_expense(self):
         """Calculate total expenses."""
-        return sum(self.amountspent)
+        return self.store.running_total()
+
+    def _write_rows(self, f, df):
+        """Write a frame of expenses to an open CSV file in batches."""
+        writer = csv.writer(f)
+        for start in range(0, len(df), FLUSH_BATCH_SIZE):
+            batch = df.iloc[start:start + FLUSH_BATCH_SIZE]
+            writer.writerows(zip(batch["date"].dt.strftime(DATE_FORMAT), batch["amount"], batch["category"], batch["place"], batch["autopay"].astype(int)))
+            f.flush()
+        os.fsync(f.fileno())
+
+    def _checkpoint(self):
+        """Append journaled expenses to CSV and drop the journal segment they came from."""
+        with self._checkpoint_lock:
+            with self._store_lock:
+                self.journal.rotate()
+                # Read after rotating: every record in the rotated segment is below this row.
+                upto = len(self.store)
+                # Copied, as rows added from here on may grow the arrays and their categories.
+                df = self.store.to_frame(mask=slice(self.saved_rows, upto)).copy() if upto > self.saved_rows else None
+            if df is not None:
+                with open(CSV_FILE, "a+", newline="") as f:
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() == 0:
+                        csv.writer(f).writerow(CSV_HEADER)
+                    else:
+                        # Terminate a torn last line so it cannot swallow the first new row.
+                        f.seek(f.tell() - 1)
+                        if f.read(1) != "\n":
+                            f.write("\n")
+                    self._write_rows(f, df)
+            written = upto - self.saved_rows
+            self.saved_rows = upto
+            self.journal.discard_rotated()
+            return written
+
+    def checkpoint_in_background(self):
+        """Start a checkpoint on a worker thread unless one is already running."""
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_thread = threading.Thread(target=self._checkpoint, daemon=True)
+        self._checkpoint_thread.start()
 
     def save_to_csv(self):
-        """Save expenses to CSV."""
-        with open("expenses.csv", "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Date", "Amount Spent", "Category", "Place", "Autopay"])
-            writer.writerows(zip(self.datespent, self.amountspent, self.category, self.placeofspending, [int(a) for a in self.autopay]))
-        print("Saved to 'expenses.csv'")
+        """Checkpoint expenses not yet in the CSV."""
+        written = self._checkpoint()
+        if written:
+            print(f"Appended {written} rows to '{CSV_FILE}'")
+
+    def compact_csv(self):
+        """Rewrite the CSV from memory, replacing the old file atomically.
+
+        Rows that could not be read are appended to REJECTED_FILE first, so
+        compacting never loses them.
+        """
+        self.save_to_csv()
+        with self._checkpoint_lock:
+            moved = self._move_unreadable()
+            temp_file = CSV_FILE + ".tmp"
+            with open(temp_file, "w", newline="") as f:
+                csv.writer(f).writerow(CSV_HEADER)
+                self._write_rows(f, self.store.to_frame(mask=slice(0, self.saved_rows)))
+            os.replace(temp_file, CSV_FILE)
+        print(f"Compacted '{CSV_FILE}' to {self.saved_rows} rows")
+        if moved:
+            print(f"Moved {moved} unreadable rows to '{REJECTED_FILE}'")
+
+    def _move_unreadable(self):
+        """Append the rows load_from_csv could not read to REJECTED_FILE and forget them."""
+        if not self.unreadable:
+            return 0
+        rejected = pd.concat(self.unreadable)[CSV_HEADER]
+        new_file = not os.path.exists(REJECTED_FILE)
+        with open(REJECTED_FILE, "a", newline="") as f:
+            rejected.to_csv(f, index=False, header=new_file)
+            f.flush()
+            os.fsync(f.fileno())
+        self.unreadable = []
+        return len(rejected)
+
+    def close(self):
+        """Finish any background checkpoint, checkpoint the rest and close the journal."""
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.join()
+        self.save_to_csv()
+        self.journal.close()
 
     def generate_graphs(self):
         """Generate basic spending graphs."""
-        df = pd.DataFrame(self.expenses)
+        import matplotlib.pyplot as plt  # Imported here so startup does not pay for it
+        df = self.store.to_frame(columns=["category", "amount"])
         if df.empty:
             print("No data to graph.")
-            return
-        df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y')
+            return []
 
         # Bar Chart: Spending by Category
-        category_totals = df.groupby("Category")["Amount Spent"].sum()
+        category_totals = df.groupby("category", observed=True)["amount"].sum()
         plt.figure(figsize=(10, 6))
         category_totals.plot(kind='bar', color='skyblue')
         plt.title("Spending by Category")
@@ -118,13 +285,51 @@ class Expenses:
         plt.savefig("category_distribution.png")
         plt.close()
         print("Pie chart saved as 'category_distribution.png'")
+        return ["spending_by_category.png", "category_distribution.png"]
+
+def normalize_saved_rows(raw, columns, date_format):
+    """Parse a chunk of the tracker's own CSV like normalize_frame, rejecting only unreadable rows.
+
+    Anything the tracker may have written itself, such as an empty category,
+    is kept: rows are never removed, so journal records find their row by
+    position. Dates not in date_format, as older versions saved whatever the
+    user typed, are read day first in any common format.
+    """
+    missing = set(columns) - set(raw.columns)
+    if missing:
+        raise ValueError(f"missing required columns: {missing}")
+    dates = pd.to_datetime(raw["Date"], format=date_format, errors='coerce')
+    legacy = dates.isna()
+    if legacy.any():
+        dates[legacy] = pd.to_datetime(raw["Date"][legacy], format='mixed', dayfirst=True, errors='coerce')
+    amounts = pd.to_numeric(raw["Amount Spent"], errors='coerce')
+    flags = pd.to_numeric(raw["Autopay"], errors='coerce')
+    # A torn line left by an interrupted append.
+    bad = (dates.isna() | amounts.isna() | flags.isna()).values
+    clean = pd.DataFrame({
+        "date": dates.values.astype('datetime64[s]'),
+        "amount": amounts.values.astype(float),
+        "category": raw["Category"].values,
+        "place": raw["Place"].values,
+        "autopay": np.asarray(flags.fillna(0).values != 0)
+    })[~bad].reset_index(drop=True)
+    rejected = raw[bad].copy()
+    rejected.insert(0, "line", rejected.index + 2)
+    rejected["reason"] = "unreadable row"
+    return clean, rejected.reset_index(drop=True)
+
+def authorised(id, password):
+    """Check the tracker's login."""
+    return id == "1234" and password == ""
 
 def main():
     """Run the expense tracker CLI."""
+    if TRACE_FILE or METRICS_FILE:
+        trace.enable(TRACE_FILE, memory=TRACE_MEMORY)
     print("Welcome to Your Personal Expense Tracker")
     id = input("Enter ID: ")
     password = input("Enter Password: ")
-    if id == "1234" and password == "":
+    if authorised(id, password):
         tracker = Expenses()
         while True:
             print("\n=== Menu ===")
@@ -132,7 +337,8 @@ def main():
             print("2. View Expenses")
             print("3. Total Expenses")
             print("4. Generate Graphs")
-            print("5. Exit")
+            print("5. Compact CSV")
+            print("6. Exit")
             choice = input("Choose an option: ")
             if choice == "1":
                 tracker.enter_expenses()
@@ -143,12 +349,142 @@ def main():
             elif choice == "4":
                 tracker.generate_graphs()
             elif choice == "5":
+                tracker.compact_csv()
+            elif choice == "6":
+                tracker.close()
                 print("Goodbye!")
                 break
             else:
                 print("Invalid option, try again.")
     else:
         print("Invalid ID or Password.")
+    if METRICS_FILE:
+        trace.write_metrics(METRICS_FILE)
+
+def _batch_parser():
+    """Build the argument parser for batch mode."""
+    parser = argparse.ArgumentParser(
+        prog="codewithoutSQL.py",
+        description="Run one expense tracker command without prompts. Results are written to stdout as JSON lines "
+                    "and progress messages to stderr. The login is read from EXPENSES_ID and EXPENSES_PASSWORD. "
+                    "Without a command the interactive menu starts."
+    )
+    parser.add_argument("--date-format", default=DATE_FORMAT, help="Format of dates read and of --from and --to.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Add expenses from CSV or JSON-lines files, or stdin, in batches.")
+    ingest.add_argument("files", nargs="*", default=["-"], help="Files to read; '-' (the default) is stdin.")
+    ingest.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto", help="auto goes by file extension; stdin is CSV.")
+    ingest.add_argument("--batch-size", type=int, default=CHECKPOINT_RECORDS, help="Records per batch from JSON lines or stdin.")
+    ingest.add_argument("--memory-mb", type=int, default=IMPORT_MEMORY_BYTES // 2**20, help="Working memory for reading CSV files.")
+    ingest.add_argument("--restart", action="store_true", help="Import CSV files from the start even if an earlier import was interrupted.")
+    totals = commands.add_parser("totals", help="Print total expenses.")
+    totals.add_argument("--month", nargs="+", help="One or more YYYY-MM months; all time if left out.")
+    export = commands.add_parser("export", help="Write matching expenses as CSV or JSON lines.")
+    export.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export.add_argument("--output", help="File to write; stdout if left out.")
+    export.add_argument("--from", dest="date_start")
+    export.add_argument("--to", dest="date_end")
+    export.add_argument("--category")
+    export.add_argument("--month", help="YYYY-MM")
+    commands.add_parser("graphs", help="Save the spending charts.")
+    return parser
+
+def _batch_ingest(tracker, args, out):
+    """Add every readable record and report rejected ones."""
+    result = {"command": "ingest", "rows": 0, "rejected": 0}
+
+    def report(rejected):
+        for record in rejected_records(source, rejected):
+            emit(record, out)
+
+    try:
+        for source in args.files:
+            if source != "-" and record_format(source, args.format) == "csv":
+                # CSV files are read in chunks of bounded size, and an
+                # interrupted import carries on where it stopped.
+                summary = tracker.import_file(source, args.memory_mb * 2**20, args.restart, report, args.date_format)
+                emit(dict(source=source, **summary), out)
+                result["rows"] += summary["rows"]
+                result["rejected"] += summary["rejected"]
+                continue
+            for _, clean, rejected in read_records([source], BATCH_COLUMNS, args.format, args.batch_size, args.date_format):
+                result["rows"] += tracker.add_expenses(clean)
+                result["rejected"] += len(rejected)
+                report(rejected)
+    except (OSError, ValueError) as e:
+        # Rows reported in "rows" were added before the failure.
+        result["error"] = str(e)
+    emit(result, out)
+    return 1 if "error" in result else 0
+
+def _batch_totals(tracker, args, out):
+    """Report the total for each requested month, or overall."""
+    for month in args.month or [None]:
+        try:
+            total = tracker.store.running_total(month=month)
+        except ValueError:
+            emit({"command": "totals", "month": month, "error": "Invalid month. Use YYYY-MM."}, out)
+            return 1
+        emit({"command": "totals", "month": month, "expenses": round(total, 2)}, out)
+    return 0
+
+def _batch_export(tracker, args, out):
+    """Stream matching expenses to a file or stdout."""
+    result = {"command": "export", "format": args.format, "path": args.output or "-", "rows": 0}
+    try:
+        bounds = [pd.to_datetime(date, format=args.date_format) if date else None for date in (args.date_start, args.date_end)]
+        mask = tracker.store.mask(date_start=bounds[0], date_end=bounds[1], month=args.month, category=args.category)
+        rows = mask.nonzero()[0]
+        with open_output(args.output, out) as stream:
+            if args.format == "csv":
+                csv.writer(stream).writerow(CSV_HEADER)
+            for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                chunk = tracker.store.to_frame(mask=rows[start:start + FLUSH_BATCH_SIZE], columns=list(BATCH_COLUMNS.values()))
+                # Dates in --date-format (and 0/1 flags in CSV), so the output can be ingested again.
+                chunk = chunk.assign(date=chunk["date"].dt.strftime(args.date_format))
+                if args.format == "csv":
+                    chunk = chunk.assign(autopay=chunk["autopay"].astype(int))
+                write_frame(chunk, stream, args.format)
+                result["rows"] += len(chunk)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    # The rows themselves occupy stdout when no file is given.
+    emit(result, out if args.output else sys.stderr)
+    return 1 if "error" in result else 0
+
+def _batch_graphs(tracker, args, out):
+    """Save the charts and report their paths."""
+    emit({"command": "graphs", "paths": tracker.generate_graphs()}, out)
+    return 0
+
+BATCH_COMMANDS = {
+    "ingest": _batch_ingest,
+    "totals": _batch_totals,
+    "export": _batch_export,
+    "graphs": _batch_graphs
+}
+
+def batch(argv):
+    """Run one command from argv without prompting and return the exit status."""
+    args = _batch_parser().parse_args(argv)
+    if not authorised(os.environ.get("EXPENSES_ID", ""), os.environ.get("EXPENSES_PASSWORD", "")):
+        emit({"command": args.command, "error": "Invalid ID or Password."}, sys.stdout)
+        return 1
+    if TRACE_FILE or METRICS_FILE:
+        trace.enable(TRACE_FILE, memory=TRACE_MEMORY)
+    out = sys.stdout
+    # Everything the tracker prints goes to stderr so scripts can parse stdout.
+    with contextlib.redirect_stdout(sys.stderr):
+        tracker = Expenses()
+        try:
+            status = BATCH_COMMANDS[args.command](tracker, args, out)
+        finally:
+            tracker.close()
+    if METRICS_FILE:
+        trace.write_metrics(METRICS_FILE)
+    return status
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(batch(sys.argv[1:]))
     main()
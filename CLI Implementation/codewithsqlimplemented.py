@@ -2,285 +2,490 @@
 # Created by Rananjay Singh Chauhan on 19/03/25.
 # CLI implementation with MySQL
 
-import pandas as pd
-import mysql.connector as sql
-import csv
-import matplotlib
-matplotlib.use('Agg')  
-import matplotlib.pyplot as plt
-import seaborn as sns
-import tkinter as tk
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from datetime import datetime
+import argparse
+import contextlib
+import hashlib
 import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.schema import ROW_HASH, SQLITE_ROW_HASH, BASE_TABLES, SQLITE_BASE_TABLES, MIGRATIONS, SQLITE_MIGRATIONS, migrate
+from ledger.db import ConnectionPool, FallbackPool, db_errors
+from ledger.sqlite import SQLitePool
+from ledger.writebehind import WriteBehind
+from ledger import trace
+# pandas and numpy (and the ledger modules built on them), matplotlib, seaborn,
+# reportlab and mysql.connector each take longer to import than everything
+# above; they are imported by the functions that use them, so the module
+# loads and the batch CLI parses its arguments without paying for them.
 
+BULK_BATCH_SIZE = 5000
+# Working memory for reading a CSV file, whatever its size, and where
+# interrupted imports record how far they got.
+IMPORT_MEMORY_BYTES = 64 * 2**20
+IMPORT_CHECKPOINT_DIR = "import_checkpoints"
+# Entered expenses and receipts reach the database through a background
+# writer: one transaction per WRITE_BEHIND_RECORDS entries or WRITE_BEHIND_MS
+# milliseconds, so the next prompt never waits on a commit. Entries it could
+# not write by exit are kept in WRITE_BEHIND_SPILL, one file per DB_BACKEND,
+# and retried on next start. They are only ever written to that backend,
+# never to the SQLite fallback.
+WRITE_BEHIND_RECORDS = 256
+WRITE_BEHIND_MS = 200
+WRITE_BEHIND_MAX_PENDING = 10000
+WRITE_BEHIND_SPILL = "pending_writes.{backend}.jsonl"
+# Every entered row is inserted, including repeats of an identical entry.
+ENTRY_INSERTS = {
+     "expenses": "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
+     "received": "INSERT INTO received (sender, amount, date) VALUES (%s, %s, %s)"
+}
+# Rows per chunk when views and exports stream query results.
+STREAM_CHUNK_SIZE = 5000
+VIEW_COLUMN_WIDTH = 12
+CSV_EXPORT_COLUMNS = {
+     "expenses": {"category": "Category", "amount": "Amount", "date": "Date", "place": "Place of Spending", "autopay": "Auto-Pay"},
+     "received": {"sender": "Sender", "amount": "Amount", "date": "Date of Receiving"}
+}
+
+# Charts are drawn in worker processes once a filter matches this many rows;
+# below it the pool costs more than it saves. None uses every CPU.
+CHART_WORKERS = None
+PARALLEL_CHART_ROWS = 50000
+
+# Rendered charts are kept here, named by what they show, and the least
+# recently used are deleted past CHART_CACHE_BYTES.
+CHART_CACHE_DIR = "chart_cache"
+CHART_CACHE_BYTES = 64 * 2**20
+# Cache keys digest every stored row through the row_hash index: MySQL sums
+# it into one value (a sum, as identical rows would cancel out of an XOR),
+# SQLite has no hash functions and streams it.
+LEDGER_DIGEST = {
+     "mysql": "SELECT COUNT(*), SUM(CAST(CONV(HEX(LEFT(row_hash, 8)), 16, 10) AS UNSIGNED)) FROM {table}",
+     "sqlite": "SELECT row_hash FROM {table} ORDER BY row_hash"
+}
+
+# Tracing is off unless these are set: EXPENSES_TRACE appends one JSON line
+# per finished operation, EXPENSES_METRICS receives a Prometheus text
+# snapshot on exit and EXPENSES_TRACE_MEMORY=1 adds peak memory (slower).
+TRACE_FILE = os.environ.get("EXPENSES_TRACE")
+METRICS_FILE = os.environ.get("EXPENSES_METRICS")
+TRACE_MEMORY = os.environ.get("EXPENSES_TRACE_MEMORY") == "1"
+
+# "mysql" or "sqlite". With "mysql", SQLITE_FALLBACK switches to the SQLite
+# file when the server cannot be reached instead of keeping data in memory only.
+DB_BACKEND = "mysql"
+SQLITE_PATH = "expenses.db"
+SQLITE_FALLBACK = True
+
+DB_CONFIG = {
+     "host": "",
+     "user": "",
+     "password": "",
+     "database": "",
+     "allow_local_infile": True
+}
+
+def month_bounds(month):
+     """Return the half-open [first day, first day of next month) range for a YYYY-MM string."""
+     import pandas as pd
+     start = pd.to_datetime(month + "-01", format='%Y-%m-%d')
+     return start.strftime('%Y-%m-%d'), (start + pd.DateOffset(months=1)).strftime('%Y-%m-%d')
+
+def _pyplot():
+     """Import matplotlib.pyplot on the Agg backend on first use and return it."""
+     import matplotlib
+     matplotlib.use('Agg')
+     import matplotlib.pyplot as plt
+     return plt
+
+def sync_staging_ddl(row_hash):
+     """Temporary staging tables for _insert_missing, fingerprinted like the real tables."""
+     return {
+          "expenses": f'''CREATE TEMPORARY TABLE {{staging}} (
+               line INT PRIMARY KEY,
+               category VARCHAR(32) NOT NULL,
+               amount DECIMAL(10,2) NOT NULL,
+               date DATE NOT NULL,
+               place VARCHAR(32),
+               autopay BOOLEAN NOT NULL DEFAULT FALSE,
+               row_hash BINARY(16) AS ({row_hash["expenses"]}) STORED
+          )''',
+          "received": f'''CREATE TEMPORARY TABLE {{staging}} (
+               line INT PRIMARY KEY,
+               sender VARCHAR(32) NOT NULL,
+               amount DECIMAL(10,2) NOT NULL,
+               date DATE NOT NULL,
+               row_hash BINARY(16) AS ({row_hash["received"]}) STORED
+          )'''
+     }
+
+SYNC_STAGING_DDL = {
+     "mysql": sync_staging_ddl(ROW_HASH),
+     "sqlite": sync_staging_ddl(SQLITE_ROW_HASH)
+}
+
+@trace.instrument
 class Expenses:
      def __init__(self):
+          from ledger.store import ColumnStore, EXPENSE_SCHEMA, RECEIVED_SCHEMA
+          from ledger.chartcache import ChartCache
           self.expenses = {}
           self.received = {}
-          self.category = []
-          self.amountspent = []
-          self.datespent = []
-          self.placeofspending = []
-          self.autopay = []
-          self.sender = []
-          self.amount_received = []
-          self.dateofreceiving = []
+          self.expense_store = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+          self.received_store = ColumnStore(RECEIVED_SCHEMA, group_by="sender")
           self.total_expenses = 0
           self.total_received = 0
           self.account_balance = 0
           self.amount_left = 0
           self.amount_needed = 0
-          self.connection = None
-          self.cursor = None
-          retries = 3
-          while retries > 0:
-               try:
-                    self.connection = sql.connect(
-                         host="",
-                         user="",  
-                         password="",  
-                         database=""  
-                    )
-                    self.cursor = self.connection.cursor()
-                    self.cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
-                         id INT AUTO_INCREMENT PRIMARY KEY,
-                         category VARCHAR(32) NOT NULL,
-                         amount DECIMAL(10,2) NOT NULL,
-                         date DATE NOT NULL,
-                         place VARCHAR(32),
-                         autopay BOOLEAN NOT NULL DEFAULT FALSE
-                    )''')
-                    self.cursor.execute('''CREATE TABLE IF NOT EXISTS received (
-                         id INT AUTO_INCREMENT PRIMARY KEY,
-                         date DATE NOT NULL,
-                         amount DECIMAL(10,2) NOT NULL,
-                         sender VARCHAR(32) NOT NULL
-                    )''')
-                    self.cursor.execute("SELECT DISTINCT DATE_FORMAT(date, '%Y_%m') AS month FROM expenses")
-                    months = [row[0] for row in self.cursor.fetchall()]
-                    for month in months:
-                         month_table = f"expenses_{month}"
-                         self.cursor.execute(f"""
-                              CREATE TABLE IF NOT EXISTS {month_table} (
-                                   id INT AUTO_INCREMENT PRIMARY KEY,
-                                   category VARCHAR(32) NOT NULL,
-                                   amount DECIMAL(10,2) NOT NULL,
-                                   date DATE NOT NULL,
-                                   place VARCHAR(32),
-                                   autopay BOOLEAN NOT NULL DEFAULT FALSE
-                              )
-                         """)
-                         self.cursor.execute(f"""
-                              INSERT IGNORE INTO {month_table} (category, amount, date, place, autopay)
-                              SELECT category, amount, date, place, autopay
-                              FROM expenses
-                              WHERE DATE_FORMAT(date, '%Y_%m') = %s
-                         """, (month,))
-                    self.connection.commit()
-                    self.load_from_csv()
-                    print("Database connection established successfully.")
-                    break
-               except sql.Error as e:
-                    retries -= 1
-                    print(f"Database connection failed: {e}. Retries left: {retries}")
-                    if retries == 0:
-                         print("Falling back to in-memory mode (no database).")
-                         self.connection = None
-                         self.cursor = None
+          self.local_infile = True
+          self.csv_rows = {"expenses": 0, "received": 0}
+          self.chart_cache = ChartCache(CHART_CACHE_DIR, CHART_CACHE_BYTES)
+          self.db, entry_db = self._open_database()
+          # Before the writer starts: its first write may be what connects.
+          self.load_from_csv()
+          self.writer = WriteBehind(entry_db, ENTRY_INSERTS, WRITE_BEHIND_SPILL.format(backend=DB_BACKEND),
+                                    WRITE_BEHIND_RECORDS, WRITE_BEHIND_MS, WRITE_BEHIND_MAX_PENDING)
+
+     def _open_database(self):
+          """Return the pool operations use and the one entered rows are written to.
+
+          Nothing connects here. With SQLITE_FALLBACK each operation uses
+          SQLite while MySQL cannot be reached, but entered rows only ever go
+          to MySQL: they wait in the write-behind queue until it is back.
+          """
+          if DB_BACKEND == "sqlite":
+               pool = SQLitePool(SQLITE_PATH, on_connect=self._prepare_schema)
+               return pool, pool
+          pool = ConnectionPool(DB_CONFIG, on_connect=self._prepare_schema)
+          if SQLITE_FALLBACK:
+               return FallbackPool(pool, self._open_fallback), pool
+          return pool, pool
+
+     def _open_fallback(self):
+          print(f"Using local SQLite database '{SQLITE_PATH}' while MySQL is unreachable.")
+          return SQLitePool(SQLITE_PATH, on_connect=self._prepare_schema)
+
+     def _prepare_schema(self, connection):
+          """Create the base tables, apply pending migrations and add the loaded CSV rows a fresh pool lacks."""
+          dialect = getattr(connection, "dialect", "mysql")
+          cursor = connection.cursor()
+          try:
+               for statement in (SQLITE_BASE_TABLES if dialect == "sqlite" else BASE_TABLES):
+                    cursor.execute(statement)
+               connection.commit()
+          finally:
+               cursor.close()
+          applied = migrate(connection, SQLITE_MIGRATIONS if dialect == "sqlite" else MIGRATIONS)
+          if applied:
+               print(f"Applied schema migrations: {', '.join(str(v) for v in applied)}")
+          cursor = connection.cursor()
+          try:
+               for table, store in (("expenses", self.expense_store), ("received", self.received_store)):
+                    if self.csv_rows[table]:
+                         frame = store.to_frame(mask=slice(0, self.csv_rows[table]))
+                         added = self._insert_missing(cursor, dialect, table, frame, BULK_BATCH_SIZE)
+                         if len(added):
+                              print(f"Added {len(added)} rows from {table}.csv that the database lacked.")
+               connection.commit()
+          finally:
+               cursor.close()
+          print("Database connection established successfully.")
 
      def load_from_csv(self):
-          """Load data from expenses.csv and received.csv into memory and MySQL."""
+          """Load data from expenses.csv and received.csv into memory.
+
+          Each database gets the rows it lacks when it is first connected,
+          so a start that only enters data never waits for MySQL.
+          """
+          from ledger.ingest import EXPENSE_COLUMNS, RECEIVED_COLUMNS
           try:
-               with open('expenses.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    required = {"Category", "Amount", "Date", "Place of Spending", "Auto-Pay"}
-                    if not required.issubset(reader.fieldnames):
-                         raise ValueError(f"expenses.csv missing required columns: {required - set(reader.fieldnames)}")
-                    for row in reader:
-                         category = row["Category"].strip()
-                         amount = float(row["Amount"])
-                         date = pd.to_datetime(row["Date"], format='%Y-%m-%d', errors='coerce')
-                         if pd.isna(date):
-                              print(f"Skipping invalid date in expenses.csv: {row['Date']}")
-                              continue
-                         date = date.strftime('%Y-%m-%d')
-                         place = row["Place of Spending"].strip()
-                         autopay = row["Auto-Pay"].lower() == 'true'
-                         self.category.append(category)
-                         self.amountspent.append(amount)
-                         self.datespent.append(date)
-                         self.placeofspending.append(place)
-                         self.autopay.append(autopay)
-                         if self.connection:
-                              self.cursor.execute(
-                                   "INSERT IGNORE INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
-                                   (category, amount, date, place, autopay)
-                              )
-               if self.connection:
-                    self.connection.commit()
-               with open('received.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    required = {"Sender", "Amount", "Date of Receiving"}
-                    if not required.issubset(reader.fieldnames):
-                         raise ValueError(f"received.csv missing required columns: {required - set(reader.fieldnames)}")
-                    for row in reader:
-                         sender = row["Sender"].strip()
-                         amount = float(row["Amount"])
-                         date = pd.to_datetime(row["Date of Receiving"], format='%Y-%m-%d', errors='coerce')
-                         if pd.isna(date):
-                              print(f"Skipping invalid date in received.csv: {row['Date of Receiving']}")
-                              continue
-                         date = date.strftime('%Y-%m-%d')
-                         self.sender.append(sender)
-                         self.amount_received.append(amount)
-                         self.dateofreceiving.append(date)
-                         if self.connection:
-                              self.cursor.execute(
-                                   "INSERT IGNORE INTO received (sender, amount, date) VALUES (%s, %s, %s)",
-                                   (sender, amount, date)
-                              )
-               if self.connection:
-                    self.connection.commit()
+               self._load_csv_file('expenses.csv', EXPENSE_COLUMNS, "expenses")
+               self._load_csv_file('received.csv', RECEIVED_COLUMNS, "received")
                print("Data loaded from CSV files successfully.")
           except FileNotFoundError as e:
                print(f"CSV file not found: {e}. Starting with empty data.")
           except ValueError as e:
                print(f"Error in CSV data: {e}. Loading partial data.")
-          except sql.Error as e:
-               print(f"Database error during CSV load: {e}")
-               if self.connection:
-                    self.connection.rollback()
-
-     def sync_csv_to_sql(self):
-          """Check CSV lines against MySQL tables and add missing entries."""
-          if not self.connection:
+
+     def _load_csv_file(self, path, columns, table):
+          """Parse one CSV file column-wise into memory, a chunk at a time."""
+          from ledger.importer import import_csv
+          start = time.perf_counter()
+          store = self.expense_store if table == "expenses" else self.received_store
+          shown = []
+
+          def show(rejected):
+               for row in rejected.head(10 - len(shown)).itertuples(index=False):
+                    print(f"Skipping line {row.line} in {path}: {row.reason}")
+                    shown.append(row.line)
+
+          try:
+               summary = import_csv(path, columns, lambda clean: store.extend({name: clean[name] for name in store.schema}),
+                                    memory_limit=IMPORT_MEMORY_BYTES, on_rejected=show)
+          except ValueError as e:
+               raise ValueError(f"{path} {e}")
+          finally:
+               self.csv_rows[table] = len(store)
+          elapsed = max(time.perf_counter() - start, 1e-9)
+          print(f"Loaded {summary['rows']} rows from {path} in {elapsed:.2f}s "
+                f"({summary['rows'] / elapsed:.0f} rows/sec), skipped {summary['rejected']} invalid rows.")
+          return summary['rows'], summary['rejected']
+
+     def import_file(self, path, table, memory_limit=IMPORT_MEMORY_BYTES, restart=False, on_rejected=None, batch_size=BULK_BATCH_SIZE,
+                     date_format='%Y-%m-%d', prepare=None):
+          """Import a ledger CSV of any size chunk by chunk, continuing an earlier import of it that was interrupted.
+
+          Progress is checkpointed only while the database is reachable:
+          rows held in memory alone would be lost with the process. restart
+          ignores earlier progress; date_format and prepare are passed on to
+          import_csv. Returns its summary.
+          """
+          from ledger.ingest import EXPENSE_COLUMNS, RECEIVED_COLUMNS
+          from ledger.importer import ImportCheckpoint, import_csv
+          columns = EXPENSE_COLUMNS if table == "expenses" else RECEIVED_COLUMNS
+          checkpoint = None
+          if self.db.available():
+               checkpoint = ImportCheckpoint(IMPORT_CHECKPOINT_DIR, path, table)
+               if restart:
+                    checkpoint.clear()
+               elif checkpoint.stale:
+                    print(f"'{path}' changed since its last import; importing it from the start.")
+          else:
+               print(f"No database connection; '{path}' is imported into memory only and cannot be resumed.")
+          summary = import_csv(path, columns, lambda clean: self.add_rows(table, clean, batch_size),
+                               date_format, memory_limit, checkpoint, on_rejected, prepare)
+          if summary["already_imported"]:
+               print(f"'{path}' was already imported into {table}; use --restart to import it again.")
+          elif summary["resumed_at_line"]:
+               print(f"Resumed the import of '{path}' at line {summary['resumed_at_line']}.")
+          return summary
+
+     def add_rows(self, table, frame, batch_size=BULK_BATCH_SIZE):
+          """Add a normalised frame to memory and, when connected, to the database in bulk; returns its length."""
+          store = self.expense_store if table == "expenses" else self.received_store
+          store.extend({name: frame[name] for name in store.schema})
+          if self.db.available() and not frame.empty:
+               dialect = self.db.dialect
+               with self.db.cursor() as cursor:
+                    self._bulk_insert(cursor, dialect, table, frame, batch_size)
+          return len(frame)
+
+     def _bulk_insert(self, cursor, dialect, table, frame, batch_size):
+          """Send a normalised frame to the database, preferring LOAD DATA LOCAL INFILE when a MySQL server allows it."""
+          from ledger.ingest import insert_batches
+          if self.local_infile and dialect == "mysql" and not frame.empty:
+               out = frame.copy()
+               out['date'] = out['date'].dt.strftime('%Y-%m-%d')
+               if 'autopay' in out:
+                    out['autopay'] = out['autopay'].astype(int)
+               with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+                    out.to_csv(f, index=False, header=False, lineterminator='\n')
+               try:
+                    cursor.execute(
+                         f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                         "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                         f"({', '.join(frame.columns)})",
+                         (f.name,)
+                    )
+                    return len(frame)
+               except db_errors() as e:
+                    print(f"LOAD DATA LOCAL INFILE unavailable ({e}). Falling back to batched inserts.")
+                    self.local_infile = False
+               finally:
+                    os.remove(f.name)
+          return insert_batches(cursor, table, frame, batch_size, ignore=False)
+
+     def _insert_missing(self, cursor, dialect, table, frame, batch_size):
+          """Insert the rows of a normalised frame that the table lacks, and return them.
+
+          Rows are staged in a temporary table and matched by row_hash, copy
+          for copy: a row three times in frame and once in the table is
+          inserted twice.
+          """
+          import pandas as pd
+          frame = frame.reset_index(drop=True)
+          staging = f"sync_{table}"
+          cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+          cursor.execute(SYNC_STAGING_DDL[dialect][table].format(staging=staging))
+          self._bulk_insert(cursor, dialect, staging, pd.concat([pd.Series(range(len(frame)), name="line"), frame], axis=1), batch_size)
+          cursor.execute(
+               f"SELECT s.line FROM (SELECT line, row_hash, ROW_NUMBER() OVER (PARTITION BY row_hash ORDER BY line) AS nth "
+               f"FROM {staging}) s WHERE s.nth > (SELECT COUNT(*) FROM {table} t WHERE t.row_hash = s.row_hash)"
+          )
+          missing = frame.iloc[sorted(row[0] for row in cursor.fetchall())].reset_index(drop=True)
+          cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+          self._bulk_insert(cursor, dialect, table, missing, batch_size)
+          return missing
+
+     def sync_csv_to_sql(self, batch_size=BULK_BATCH_SIZE):
+          """Add CSV rows missing from MySQL using a staging table and one anti-join per table.
+
+          Returns the number of (expenses, received) rows added, or None if nothing was synced.
+          """
+          from ledger.ingest import EXPENSE_COLUMNS, RECEIVED_COLUMNS
+          if not self.db.available():
                print("No database connection. Syncing skipped.")
                return
           try:
-               with open('expenses.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    required = {"Category", "Amount", "Date", "Place of Spending", "Auto-Pay"}
-                    if not required.issubset(reader.fieldnames):
-                         raise ValueError(f"expenses.csv missing required columns: {required - set(reader.fieldnames)}")
-                    for row in reader:
-                         category = row["Category"].strip()
-                         amount = float(row["Amount"])
-                         date = pd.to_datetime(row["Date"], format='%Y-%m-%d', errors='coerce')
-                         if pd.isna(date):
-                              print(f"Skipping invalid date in expenses.csv: {row['Date']}")
-                              continue
-                         date = date.strftime('%Y-%m-%d')
-                         place = row["Place of Spending"].strip()
-                         autopay = row["Auto-Pay"].lower() == 'true'
-                         self.cursor.execute(
-                              "SELECT COUNT(*) FROM expenses WHERE category = %s AND amount = %s AND date = %s AND place = %s AND autopay = %s",
-                              (category, amount, date, place, autopay)
-                         )
-                         if self.cursor.fetchone()[0] == 0:
-                              self.cursor.execute(
-                                   "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
-                                   (category, amount, date, place, autopay)
-                              )
-                              self.category.append(category)
-                              self.amountspent.append(amount)
-                              self.datespent.append(date)
-                              self.placeofspending.append(place)
-                              self.autopay.append(autopay)
-                              print(f"Added missing expense: {category}, ${amount}, {date}")
-               with open('received.csv', 'r') as f:
-                    reader = csv.DictReader(f)
-                    required = {"Sender", "Amount", "Date of Receiving"}
-                    if not required.issubset(reader.fieldnames):
-                         raise ValueError(f"received.csv missing required columns: {required - set(reader.fieldnames)}")
-                    for row in reader:
-                         sender = row["Sender"].strip()
-                         amount = float(row["Amount"])
-                         date = pd.to_datetime(row["Date of Receiving"], format='%Y-%m-%d', errors='coerce')
-                         if pd.isna(date):
-                              print(f"Skipping invalid date in received.csv: {row['Date of Receiving']}")
-                              continue
-                         date = date.strftime('%Y-%m-%d')
-                         self.cursor.execute(
-                              "SELECT COUNT(*) FROM received WHERE sender = %s AND amount = %s AND date = %s",
-                              (sender, amount, date)
-                         )
-                         if self.cursor.fetchone()[0] == 0:
-                              self.cursor.execute(
-                                   "INSERT INTO received (sender, amount, date) VALUES (%s, %s, %s)",
-                                   (sender, amount, date)
-                              )
-                              self.sender.append(sender)
-                              self.amount_received.append(amount)
-                              self.dateofreceiving.append(date)
-                              print(f"Added missing received: {sender}, ${amount}, {date}")
-               self.connection.commit()
+               dialect = self.db.dialect
+               with self.db.cursor() as cursor:
+                    expenses = self._sync_csv_file(cursor, dialect, 'expenses.csv', EXPENSE_COLUMNS, "expenses", batch_size)
+                    received = self._sync_csv_file(cursor, dialect, 'received.csv', RECEIVED_COLUMNS, "received", batch_size)
+               # Only touch memory once the transaction has committed.
+               self.expense_store.extend({name: expenses[name] for name in self.expense_store.schema})
+               self.received_store.extend({name: received[name] for name in self.received_store.schema})
                print("CSV data synced with MySQL tables successfully.")
+               return len(expenses), len(received)
           except FileNotFoundError as e:
                print(f"CSV file not found: {e}. Nothing to sync.")
           except ValueError as e:
                print(f"Error in CSV data: {e}. Syncing partial data.")
-          except sql.Error as e:
+          except db_errors() as e:
                print(f"Database error during sync: {e}")
-               self.connection.rollback()
 
-     def filter_data(self, table, date_start=None, date_end=None, key=None, value=None, use_monthly=None):
+     def _sync_csv_file(self, cursor, dialect, path, columns, table, batch_size):
+          """Stage one CSV file in a temporary table, insert the rows the table lacks and return them."""
+          from ledger.ingest import read_ledger_csv
+          try:
+               frame, rejected = read_ledger_csv(path, columns)
+          except ValueError as e:
+               raise ValueError(f"{path} {e}")
+          for row in rejected.head(10).itertuples(index=False):
+               print(f"Skipping line {row.line} in {path}: {row.reason}")
+          missing = self._insert_missing(cursor, dialect, table, frame, batch_size)
+          print(f"Added {len(missing)} missing rows from {path} to {table}.")
+          return missing
+
+     def filter_data(self, table, date_start=None, date_end=None, key=None, value=None, use_monthly=None, columns=None):
           """Filter data from MySQL based on date range, key (category/sender), or monthly table."""
-          if not self.connection:
+          import pandas as pd
+          if not self.db.available():
                print("No database connection. Using in-memory data.")
-               df = pd.DataFrame({
-                    'category': self.category,
-                    'amount': self.amountspent,
-                    'date': self.datespent,
-                    'place': self.placeofspending,
-                    'autopay': self.autopay
-               }) if table == "expenses" else pd.DataFrame({
-                    'sender': self.sender,
-                    'amount': self.amount_received,
-                    'date': self.dateofreceiving
-               })
+               store = self.expense_store if table == "expenses" else self.received_store
+               mask = self._store_mask(store, date_start, date_end, key, value, use_monthly)
+               if mask is None:
+                    return pd.DataFrame()
+               df = store.to_frame(mask=mask, columns=columns)
           else:
                try:
-                    if use_monthly:
-                         try:
-                              pd.to_datetime(use_monthly, format='%Y-%m-%d')
-                              year, month = use_monthly.split('-')[0], use_monthly.split('-')[1]
-                              table = f"expenses_{year}_{month}"
-                              self.cursor.execute(f"SHOW TABLES LIKE '{table}'")
-                              if not self.cursor.fetchone():
-                                   print(f"Monthly table {table} does not exist.")
-                                   return pd.DataFrame()
-                         except ValueError:
-                              print(f"Invalid use_monthly format: {use_monthly}. Use YYYY-MM-DD.")
-                              return pd.DataFrame()
-                    query = f"SELECT * FROM {table}"
-                    conditions = []
-                    params = []
-                    if date_start:
-                         conditions.append("date >= %s")
-                         params.append(date_start)
-                    if date_end:
-                         conditions.append("date <= %s")
-                         params.append(date_end)
-                    if key and value:
-                         conditions.append(f"{key} = %s")
-                         params.append(value)
-                    if conditions:
-                         query += " WHERE " + " AND ".join(conditions)
-                    self.cursor.execute(query, params)
-                    df = pd.DataFrame(
-                         self.cursor.fetchall(),
-                         columns=[desc[0] for desc in self.cursor.description]
-                    )
-               except sql.Error as e:
+                    with self.db.cursor() as cursor:
+                         df = self._query_rows(cursor, table, date_start, date_end, key, value, use_monthly, columns)
+               except db_errors() as e:
                     print(f"Database error filtering {table}: {e}")
                     return pd.DataFrame()
           return df
 
+     def iter_filtered(self, table, date_start=None, date_end=None, key=None, value=None, use_monthly=None, columns=None, chunk_size=STREAM_CHUNK_SIZE):
+          """Yield filter_data's rows in date order as DataFrames of at most chunk_size rows.
+
+          Memory use depends on chunk_size, not on how many rows match; the
+          connection stays checked out until the generator is exhausted or closed.
+          """
+          import pandas as pd
+          import numpy as np
+          if not self.db.available():
+               store = self.expense_store if table == "expenses" else self.received_store
+               mask = self._store_mask(store, date_start, date_end, key, value, use_monthly)
+               if mask is None:
+                    return
+               rows = np.flatnonzero(mask)
+               rows = rows[np.argsort(store.column("date")[rows], kind="stable")]
+               for start in range(0, len(rows), chunk_size):
+                    yield store.to_frame(mask=rows[start:start + chunk_size], columns=columns)
+               return
+          # Unbuffered, so MySQL streams rows from the server as they are fetched
+          # instead of the client reading the whole result first; SQLite
+          # cursors always step through rows lazily.
+          with self.db.cursor(buffered=False) as cursor:
+               query = self._build_query(cursor, table, date_start, date_end, key, value, use_monthly, columns)
+               if query is None:
+                    return
+               cursor.execute(query[0] + " ORDER BY date", query[1])
+               names = [desc[0] for desc in cursor.description]
+               try:
+                    while True:
+                         rows = cursor.fetchmany(chunk_size)
+                         if not rows:
+                              break
+                         frame = pd.DataFrame(rows, columns=names)
+                         frame["date"] = pd.to_datetime(frame["date"])
+                         frame["amount"] = frame["amount"].astype(float)
+                         if "autopay" in frame:
+                              frame["autopay"] = frame["autopay"].astype(bool)
+                         yield frame
+               except GeneratorExit:
+                    # The consumer stopped early; an unbuffered result must still be read
+                    # to the end before the connection goes back to the pool.
+                    while cursor.fetchmany(chunk_size):
+                         pass
+                    raise
+
+     def _query_rows(self, cursor, table, date_start, date_end, key, value, use_monthly, columns=None):
+          """Run the filtered SELECT for filter_data on an open cursor."""
+          import pandas as pd
+          query = self._build_query(cursor, table, date_start, date_end, key, value, use_monthly, columns)
+          if query is None:
+               return pd.DataFrame()
+          cursor.execute(*query)
+          return pd.DataFrame(
+               cursor.fetchall(),
+               columns=[desc[0] for desc in cursor.description]
+          )
+
+     def _store_mask(self, store, date_start, date_end, key, value, use_monthly):
+          """Return _build_query's filters as a row mask of store, or None when use_monthly is invalid."""
+          import pandas as pd
+          month = None
+          if use_monthly:
+               try:
+                    month = pd.to_datetime(use_monthly, format='%Y-%m-%d').strftime('%Y-%m')
+               except ValueError:
+                    print(f"Invalid use_monthly format: {use_monthly}. Use YYYY-MM-DD.")
+                    return None
+          equals = {key: value} if key and value else {}
+          return store.mask(date_start=date_start, date_end=date_end, month=month, **equals)
+
+     def _build_query(self, cursor, table, date_start, date_end, key, value, use_monthly, columns=None):
+          """Return (query, params) for a filtered SELECT, or None when the requested month is empty or invalid."""
+          import pandas as pd
+          if use_monthly:
+               try:
+                    month_start = pd.to_datetime(use_monthly, format='%Y-%m-%d').to_period('M').start_time
+               except ValueError:
+                    print(f"Invalid use_monthly format: {use_monthly}. Use YYYY-MM-DD.")
+                    return None
+               aggregate = "monthly_totals" if table == "expenses" else "monthly_received"
+               cursor.execute(
+                    f"SELECT COALESCE(SUM(entries), 0) FROM {aggregate} WHERE month = %s",
+                    (month_start.strftime('%Y-%m'),)
+               )
+               if not cursor.fetchone()[0]:
+                    entries = "expenses" if table == "expenses" else "received entries"
+                    print(f"No {entries} recorded for {month_start.strftime('%Y-%m')}.")
+                    return None
+          query = f"SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+          conditions = []
+          params = []
+          if use_monthly:
+               conditions.append("date >= %s AND date < %s")
+               params.extend(month_bounds(month_start.strftime('%Y-%m')))
+          if date_start:
+               conditions.append("date >= %s")
+               params.append(date_start)
+          if date_end:
+               conditions.append("date <= %s")
+               params.append(date_end)
+          if key and value:
+               conditions.append(f"{key} = %s")
+               params.append(value)
+          if conditions:
+               query += " WHERE " + " AND ".join(conditions)
+          return query, params
+
      def enter_expenses(self):
+          import pandas as pd
           try:
                x = int(input("Enter the number of expenses to be added: "))
                if x < 0:
@@ -310,62 +515,38 @@ class Expenses:
                     if e_input not in ('true', 'false'):
                          raise ValueError("Please enter 'True' or 'False'.")
                     e = e_input == 'true'
-                    self.category.append(a)
-                    self.amountspent.append(b)
-                    self.datespent.append(c)
-                    self.placeofspending.append(d)
-                    self.autopay.append(e)
-                    if self.connection:
-                         year, month = c.split('-')[0], c.split('-')[1]
-                         month_table = f"expenses_{year}_{month}"
-                         self.cursor.execute(f"""
-                              CREATE TABLE IF NOT EXISTS {month_table} (
-                                   id INT AUTO_INCREMENT PRIMARY KEY,
-                                   category VARCHAR(32) NOT NULL,
-                                   amount DECIMAL(10,2) NOT NULL,
-                                   date DATE NOT NULL,
-                                   place VARCHAR(32),
-                                   autopay BOOLEAN NOT NULL DEFAULT FALSE
-                              )
-                         """)
-                         self.cursor.execute(
-                              "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
-                              (a, b, c, d, e)
-                         )
-                         self.cursor.execute(
-                              f"INSERT INTO {month_table} (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
-                              (a, b, c, d, e)
-                         )
-                         self.connection.commit()
+                    self.expense_store.append(category=a, amount=b, date=c, place=d, autopay=e)
+                    if self.db.available():
+                         self.writer.put("expenses", (a, b, c, d, e))
                     print(f"Expense {i+1} added successfully: {a}, ${b}, {c}")
                except ValueError as e:
                     print(f"Error in entry {i+1}: {e}. Skipping this entry.")
-               except sql.Error as e:
-                    print(f"Database error in entry {i+1}: {e}")
-                    if self.connection:
-                         self.connection.rollback()
+               self.report_writes()
 
      def update_expense_tables(self):
           try:
-               self.expenses["Category"] = self.category
-               self.expenses["Amount"] = self.amountspent
-               self.expenses["Date"] = self.datespent
-               self.expenses["Place of Spending"] = self.placeofspending
-               self.expenses["Auto-Pay"] = self.autopay
-               self.expenses = pd.DataFrame(self.expenses)
+               self.expenses = self.expense_store.to_frame().rename(columns={
+                    "category": "Category",
+                    "amount": "Amount",
+                    "date": "Date",
+                    "place": "Place of Spending",
+                    "autopay": "Auto-Pay"
+               })
           except Exception as e:
                print(f"Error updating expenses table: {e}")
 
      def update_receiving_table(self):
           try:
-               self.received["Sender"] = self.sender
-               self.received["Amount"] = self.amount_received
-               self.received["Date of Receiving"] = self.dateofreceiving
-               self.received = pd.DataFrame(self.received)
+               self.received = self.received_store.to_frame().rename(columns={
+                    "sender": "Sender",
+                    "amount": "Amount",
+                    "date": "Date of Receiving"
+               })
           except Exception as e:
                print(f"Error updating received table: {e}")
 
      def enter_receiving(self):
+          import pandas as pd
           try:
                x = int(input("Enter the number of received entries to be added: "))
                if x < 0:
@@ -390,22 +571,24 @@ class Expenses:
                          except ValueError:
                               raise ValueError("Invalid date format. Use YYYY-MM-DD (e.g., 2025-03-19).")
                     c = date_obj.strftime('%Y-%m-%d')
-                    self.sender.append(a)
-                    self.amount_received.append(b)
-                    self.dateofreceiving.append(c)
-                    if self.connection:
-                         self.cursor.execute(
-                              "INSERT INTO received (sender, amount, date) VALUES (%s, %s, %s)",
-                              (a, b, c)
-                         )
-                         self.connection.commit()
+                    self.received_store.append(sender=a, amount=b, date=c)
+                    if self.db.available():
+                         self.writer.put("received", (a, b, c))
                     print(f"Received entry {i+1} added successfully: {a}, ${b}, {c}")
                except ValueError as e:
                     print(f"Error in entry {i+1}: {e}. Skipping this entry.")
-               except sql.Error as e:
-                    print(f"Database error in entry {i+1}: {e}")
-                    if self.connection:
-                         self.connection.rollback()
+               self.report_writes()
+
+     def report_writes(self):
+          """Print what went wrong writing queued entries since the last call."""
+          for message in self.writer.reports():
+               print(message)
+
+     def sync_writes(self):
+          """Wait for queued entries to be committed, so what follows reads them back from the database."""
+          if not self.writer.flush():
+               print(f"{self.writer.pending()} entries are not in the database yet; results may leave them out.")
+          self.report_writes()
 
      def view_expenses(self):
           print("Filter expenses (leave blank for no filter):")
@@ -415,39 +598,43 @@ class Expenses:
           use_monthly = input("Use monthly table (enter YYYY-MM-DD to specify month, or leave blank): ").strip() or None
           plot = input("Generate a bar plot? (yes/no): ").lower() == 'yes'
           try:
-               df = self.filter_data(
+               chunks = self.iter_filtered(
                     "expenses",
                     date_start=date_start,
                     date_end=date_end,
                     key="category" if category else None,
                     value=category,
-                    use_monthly=use_monthly
+                    use_monthly=use_monthly,
+                    columns=["date", "amount", "category", "place", "autopay"]
                )
-               if df.empty:
+               printed = self._print_rows("Filtered Expenses", chunks, {
+                    "date": "Date",
+                    "amount": "Amount",
+                    "category": "Category",
+                    "place": "Place",
+                    "autopay": "Auto-Pay"
+               })
+               if not printed:
                     print("No expenses match the filter.")
-               else:
-                    df = df.rename(columns={
-                         "date": "Date",
-                         "amount": "Amount",
-                         "category": "Category",
-                         "place": "Place",
-                         "autopay": "Auto-Pay"
-                    })
-                    print("\n=== Filtered Expenses ===")
-                    print(df[["Date", "Amount", "Category", "Place", "Auto-Pay"]].to_string(index=False))
-                    if plot:
-                         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+               elif plot:
+                    def render(filename):
+                         plt = _pyplot()
+                         import seaborn as sns
+                         totals = self.aggregate("expenses", ["category"], date_start, date_end,
+                                                 "category" if category else None, category, use_monthly)
                          plt.figure(figsize=(10, 6))
-                         sns.barplot(x='Category', y='Amount', data=df, estimator=sum, palette='muted')
+                         sns.barplot(x='category', y='total', data=totals, hue='category', palette='muted', legend=False)
                          plt.title(f"Expenses by Category ({date_start or 'Start'} to {date_end or 'End'})")
                          plt.xlabel("Category")
                          plt.ylabel("Total Amount ($)")
                          plt.xticks(rotation=45)
                          plt.tight_layout()
-                         filename = f"view_expenses_barplot_{timestamp}.png"
                          plt.savefig(filename)
                          plt.close()
-                         print(f"Bar plot saved as '{filename}'")
+                    params = {"date_start": date_start, "date_end": date_end, "category": category, "use_monthly": use_monthly}
+                    filename, cached = self.chart_cache.get_or_render(
+                         "view_expenses_barplot", params, self._ledger_version("expenses"), render)
+                    print(f"Bar plot {'unchanged:' if cached else 'saved as'} '{filename}'")
           except Exception as e:
                print(f"Error viewing expenses: {e}")
 
@@ -457,121 +644,121 @@ class Expenses:
           date_end = input("End date (YYYY-MM-DD): ").strip() or None
           sender = input("Sender: ").strip() or None
           try:
-               df = self.filter_data(
+               chunks = self.iter_filtered(
                     "received",
                     date_start=date_start,
                     date_end=date_end,
                     key="sender" if sender else None,
-                    value=sender
+                    value=sender,
+                    columns=["date", "amount", "sender"]
                )
-               if df.empty:
+               if not self._print_rows("Filtered Received", chunks, {"date": "Date", "amount": "Amount", "sender": "Sender"}):
                     print("No received amounts match the filter.")
-               else:
-                    df = df.rename(columns={
-                         "date": "Date",
-                         "amount": "Amount",
-                         "sender": "Sender"
-                    })
-                    print("\n=== Filtered Received ===")
-                    print(df[["Date", "Amount", "Sender"]].to_string(index=False))
           except Exception as e:
                print(f"Error viewing received: {e}")
 
+     def _print_rows(self, title, chunks, columns):
+          """Print chunks of rows under a single header as they arrive and return how many were printed."""
+          printed = 0
+          for chunk in chunks:
+               if chunk.empty:
+                    continue
+               if not printed:
+                    print(f"\n=== {title} ===")
+               # A fixed minimum width keeps columns aligned from one chunk to the next.
+               print(chunk.rename(columns=columns)[list(columns.values())].to_string(
+                    index=False, header=not printed, col_space=VIEW_COLUMN_WIDTH))
+               printed += len(chunk)
+          return printed
+
      def show_total_expenses(self, month=None):
           try:
-               if month:
-                    try:
-                         pd.to_datetime(month + "-01", format='%Y-%m-%d')  # Validate YYYY-MM format
-                    except ValueError:
-                         print(f"Invalid month format: {month}. Use YYYY-MM (e.g., 2025-03).")
-                         return
-                    month_filter = f" WHERE DATE_FORMAT(date, '%Y-%m') = '{month}'"
-                    month_table = f"expenses_{month.replace('-', '_')}"
-               else:
-                    month_filter = ""
-                    month_table = None
-
-               if self.connection:
-                    # Try monthly table first if specified
-                    if month_table:
-                         self.cursor.execute(f"SHOW TABLES LIKE '{month_table}'")
-                         if self.cursor.fetchone():
-                              query = f"SELECT SUM(amount) FROM {month_table}"
-                              self.cursor.execute(query)
-                         else:
-                              query = f"SELECT SUM(amount) FROM expenses{month_filter}"
-                              self.cursor.execute(query)
-                    else:
-                         query = f"SELECT SUM(amount) FROM expenses{month_filter}"
-                         self.cursor.execute(query)
-                    total = self.cursor.fetchone()[0]
-                    self.total_expenses = total if total is not None else 0
-               else:
-                    if month:
-                         df = pd.DataFrame({
-                              'amount': self.amountspent,
-                              'date': pd.to_datetime(self.datespent)
-                         })
-                         self.total_expenses = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-                    else:
-                         self.total_expenses = sum(self.amountspent)
-               month_str = f" for {month}" if month else ""
+               month_key = self._month_key(month)
+          except ValueError:
+               print(f"Invalid month format: {month}. Use YYYY-MM (e.g., 2025-03).")
+               return
+          month_str = f" for {month}" if month else ""
+          try:
+               self.total_expenses = self._aggregate_total("monthly_totals", month_key, self.expense_store)
                print(f"Total Expenses{month_str}: ${self.total_expenses:.2f}")
-          except sql.Error as e:
+          except db_errors() as e:
                print(f"Database error: {e}")
-               if month:
-                    df = pd.DataFrame({
-                         'amount': self.amountspent,
-                         'date': pd.to_datetime(self.datespent)
-                    })
-                    self.total_expenses = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-               else:
-                    self.total_expenses = sum(self.amountspent)
-               month_str = f" for {month}" if month else ""
+               self.total_expenses = self.expense_store.running_total(month=month_key)
                print(f"Using in-memory total expenses{month_str}: ${self.total_expenses:.2f}")
 
      def show_total_received(self, month=None):
           try:
-               if month:
-                    try:
-                         pd.to_datetime(month + "-01", format='%Y-%m-%d')  # Validate YYYY-MM format
-                    except ValueError:
-                         print(f"Invalid month format: {month}. Use YYYY-MM (e.g., 2025-03).")
-                         return
-                    month_filter = f" WHERE DATE_FORMAT(date, '%Y-%m') = '{month}'"
-               else:
-                    month_filter = ""
-
-               if self.connection:
-                    query = f"SELECT SUM(amount) FROM received{month_filter}"
-                    self.cursor.execute(query)
-                    total = self.cursor.fetchone()[0]
-                    self.total_received = total if total is not None else 0
-               else:
-                    if month:
-                         df = pd.DataFrame({
-                              'amount': self.amount_received,
-                              'date': pd.to_datetime(self.dateofreceiving)
-                         })
-                         self.total_received = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-                    else:
-                         self.total_received = sum(self.amount_received)
-               month_str = f" for {month}" if month else ""
+               month_key = self._month_key(month)
+          except ValueError:
+               print(f"Invalid month format: {month}. Use YYYY-MM (e.g., 2025-03).")
+               return
+          month_str = f" for {month}" if month else ""
+          try:
+               self.total_received = self._aggregate_total("monthly_received", month_key, self.received_store)
                print(f"Total Received{month_str}: ${self.total_received:.2f}")
-          except sql.Error as e:
+          except db_errors() as e:
                print(f"Database error: {e}")
-               if month:
-                    df = pd.DataFrame({
-                         'amount': self.amount_received,
-                         'date': pd.to_datetime(self.dateofreceiving)
-                    })
-                    self.total_received = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-               else:
-                    self.total_received = sum(self.amount_received)
-               month_str = f" for {month}" if month else ""
+               self.total_received = self.received_store.running_total(month=month_key)
                print(f"Using in-memory total received{month_str}: ${self.total_received:.2f}")
 
+     def _month_key(self, month):
+          """Normalise a YYYY-MM string, raising ValueError if it is not a valid month."""
+          import pandas as pd
+          if not month:
+               return None
+          return pd.to_datetime(month + "-01", format='%Y-%m-%d').strftime('%Y-%m')
+
+     def _aggregate_total(self, aggregate, month_key, store):
+          """Read a total from a trigger-maintained aggregate table, or the store's running totals offline."""
+          if not self.db.available():
+               return store.running_total(month=month_key)
+          with self.db.cursor() as cursor:
+               if month_key:
+                    cursor.execute(f"SELECT SUM(total) FROM {aggregate} WHERE month = %s", (month_key,))
+               else:
+                    cursor.execute(f"SELECT SUM(total) FROM {aggregate}")
+               total = cursor.fetchone()[0]
+          return float(total) if total is not None else 0.0
+
+     def totals_by_month(self, table, months):
+          """Return a Series of totals for each YYYY-MM in months, fetched with a single GROUP BY query."""
+          import pandas as pd
+          keys = sorted({self._month_key(m) for m in months})
+          store = self.expense_store if table == "expenses" else self.received_store
+          if self.db.available():
+               aggregate = "monthly_totals" if table == "expenses" else "monthly_received"
+               placeholders = ", ".join(["%s"] * len(keys))
+               try:
+                    with self.db.cursor() as cursor:
+                         cursor.execute(
+                              f"SELECT month, SUM(total) FROM {aggregate} WHERE month IN ({placeholders}) GROUP BY month",
+                              keys
+                         )
+                         rows = cursor.fetchall()
+                    totals = pd.Series({row[0]: float(row[1]) for row in rows}, dtype=float)
+                    return totals.reindex(keys, fill_value=0.0)
+               except db_errors() as e:
+                    print(f"Database error: {e}. Using in-memory totals.")
+          return pd.Series({key: store.running_total(month=key) for key in keys}, dtype=float)
+
+     def show_monthly_totals(self, months):
+          """Print expenses, received and balance side by side for several months."""
+          import pandas as pd
+          try:
+               expenses = self.totals_by_month("expenses", months)
+               received = self.totals_by_month("received", months)
+          except ValueError:
+               print(f"Invalid month list: {', '.join(months)}. Use YYYY-MM values separated by commas.")
+               return
+          table = pd.DataFrame({"Expenses": expenses, "Received": received})
+          table["Balance"] = table["Received"] - table["Expenses"]
+          table.index.name = "Month"
+          print("\n=== Monthly Totals ===")
+          print(table.to_string(float_format=lambda v: f"${v:.2f}"))
+          return table
+
      def calculate_balance(self):
+          import pandas as pd
           try:
                month = input("Enter month to filter totals (YYYY-MM, or leave blank for all): ").strip() or None
                self.show_total_expenses(month)
@@ -585,125 +772,106 @@ class Expenses:
                     print(f"Amount Needed: ${self.amount_needed:.2f}")
                plot = input("Generate a balance comparison plot? (yes/no): ").lower() == 'yes'
                if plot:
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    balance_data = pd.DataFrame({
-                         'Type': ['Expenses', 'Received'],
-                         'Amount': [self.total_expenses, self.total_received]
-                    })
-                    plt.figure(figsize=(6, 6))
-                    sns.barplot(x='Type', y='Amount', data=balance_data, palette='Set2')
-                    month_str = f" for {month}" if month else ""
-                    plt.title(f"Expenses vs Received{month_str}")
-                    plt.ylabel("Amount ($)")
-                    plt.tight_layout()
-                    filename = f"balance_comparison_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Balance comparison plot saved as '{filename}'")
+                    def render(filename):
+                         plt = _pyplot()
+                         import seaborn as sns
+                         balance_data = pd.DataFrame({
+                              'Type': ['Expenses', 'Received'],
+                              'Amount': [self.total_expenses, self.total_received]
+                         })
+                         plt.figure(figsize=(6, 6))
+                         sns.barplot(x='Type', y='Amount', data=balance_data, palette='Set2')
+                         month_str = f" for {month}" if month else ""
+                         plt.title(f"Expenses vs Received{month_str}")
+                         plt.ylabel("Amount ($)")
+                         plt.tight_layout()
+                         plt.savefig(filename)
+                         plt.close()
+                    # The plot shows nothing but the two totals, so they are the whole key.
+                    params = {"month": month, "expenses": round(self.total_expenses, 2), "received": round(self.total_received, 2)}
+                    filename, cached = self.chart_cache.get_or_render("balance_comparison", params, None, render)
+                    print(f"Balance comparison plot {'unchanged:' if cached else 'saved as'} '{filename}'")
           except Exception as e:
                print(f"Error calculating balance: {e}")
 
-     def save_to_a_csv(self):
+     def save_to_a_csv(self, chunk_size=STREAM_CHUNK_SIZE):
           try:
-               self.update_expense_tables()
-               self.update_receiving_table()
-               self.expenses.to_csv('expenses.csv', index=False)
-               self.received.to_csv('received.csv', index=False)
-               print("Data saved to 'expenses.csv' and 'received.csv' successfully.")
-               return self.expenses, self.received
+               expenses = self._export_csv('expenses.csv', self.expense_store, CSV_EXPORT_COLUMNS["expenses"], chunk_size)
+               received = self._export_csv('received.csv', self.received_store, CSV_EXPORT_COLUMNS["received"], chunk_size)
+               print(f"Data saved to 'expenses.csv' and 'received.csv' successfully ({expenses} expenses, {received} received entries).")
+               return expenses, received
+          except db_errors() as e:
+               print(f"Database error while saving to CSV: {e}")
           except IOError as e:
                print(f"Error writing CSV files: {e}")
           except Exception as e:
                print(f"Error saving to CSV: {e}")
 
+     def _export_csv(self, path, store, columns, chunk_size):
+          """Write a store to a CSV file chunk_size rows at a time; the file is only replaced once complete.
+
+          The store rather than the database is exported, so rows the database
+          folded together as duplicates are kept.
+          """
+          temp = path + ".tmp"
+          try:
+               with open(temp, "w", newline="") as f:
+                    f.write(",".join(columns.values()) + "\n")
+                    for start in range(0, len(store), chunk_size):
+                         chunk = store.to_frame(mask=slice(start, start + chunk_size), columns=list(columns))
+                         chunk.to_csv(f, index=False, header=False)
+               os.replace(temp, path)
+          finally:
+               if os.path.exists(temp):
+                    os.remove(temp)
+          return len(store)
+
      def save_to_a_pdf(self):
           print("Filter data for PDF (leave blank for no filter):")
           date_start = input("Start date (YYYY-MM-DD): ").strip() or None
           date_end = input("End date (YYYY-MM-DD): ").strip() or None
           category = input("Category: ").strip() or None
           use_monthly = input("Use monthly table (enter YYYY-MM-DD to specify month, or leave blank): ").strip() or None
+          return self.export_pdf("expense_report.pdf", date_start, date_end, category, use_monthly)
+
+     def export_pdf(self, path, date_start=None, date_end=None, category=None, use_monthly=None, chunk_size=STREAM_CHUNK_SIZE):
+          """Write every matching expense and received row to a paginated PDF with per-category and per-sender subtotals."""
+          from ledger.report import write_pdf_report
+          expense_columns = {"date": "Date", "amount": "Amount", "category": "Category", "place": "Place", "autopay": "Auto-Pay"}
+          received_columns = {"date": "Date", "amount": "Amount", "sender": "Sender"}
           try:
-               expenses_df = self.filter_data(
+               # Rows are streamed chunk by chunk into the PDF; no full table is ever held in memory.
+               expenses = self.iter_filtered(
                     "expenses",
                     date_start=date_start,
                     date_end=date_end,
                     key="category" if category else None,
                     value=category,
-                    use_monthly=use_monthly
+                    use_monthly=use_monthly,
+                    columns=list(expense_columns),
+                    chunk_size=chunk_size
                )
-               received_df = self.filter_data(
+               received = self.iter_filtered(
                     "received",
                     date_start=date_start,
-                    date_end=date_end
+                    date_end=date_end,
+                    columns=list(received_columns),
+                    chunk_size=chunk_size
                )
-               pdf = SimpleDocTemplate("expense_report.pdf", pagesize=letter)
-               elements = []
-               styles = getSampleStyleSheet()
-               title = Paragraph("Expense Report", styles['Heading1'])
-               elements.append(title)
-               elements.append(Spacer(1, 12))
-               if not expenses_df.empty:
-                    expenses_df = expenses_df.rename(columns={
-                         "date": "Date",
-                         "amount": "Amount",
-                         "category": "Category",
-                         "place": "Place",
-                         "autopay": "Auto-Pay"
-                    })
-                    if len(expenses_df) > 20:  # Basic pagination threshold
-                         elements.append(Paragraph("Expenses (First 20 entries shown)", styles['Heading2']))
-                         expenses_data = [expenses_df[["Date", "Amount", "Category", "Place", "Auto-Pay"]].columns.tolist()] + expenses_df[["Date", "Amount", "Category", "Place", "Auto-Pay"]].iloc[:20].values.tolist()
-                         print("Warning: Large expense dataset truncated to 20 entries in PDF.")
-                    else:
-                         elements.append(Paragraph("Expenses", styles['Heading2']))
-                         expenses_data = [expenses_df[["Date", "Amount", "Category", "Place", "Auto-Pay"]].columns.tolist()] + expenses_df[["Date", "Amount", "Category", "Place", "Auto-Pay"]].values.tolist()
-                    expenses_table = Table(expenses_data)
-                    expenses_table.setStyle(TableStyle([
-                         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                         ('FONTSIZE', (0, 0), (-1, 0), 12),
-                         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    elements.append(expenses_table)
-                    elements.append(Spacer(1, 12))
-               if not received_df.empty:
-                    received_df = received_df.rename(columns={
-                         "date": "Date",
-                         "amount": "Amount",
-                         "sender": "Sender"
-                    })
-                    if len(received_df) > 20:
-                         elements.append(Paragraph("Received (First 20 entries shown)", styles['Heading2']))
-                         received_data = [received_df[["Date", "Amount", "Sender"]].columns.tolist()] + received_df[["Date", "Amount", "Sender"]].iloc[:20].values.tolist()
-                         print("Warning: Large received dataset truncated to 20 entries in PDF.")
-                    else:
-                         elements.append(Paragraph("Received", styles['Heading2']))
-                         received_data = [received_df[["Date", "Amount", "Sender"]].columns.tolist()] + received_df[["Date", "Amount", "Sender"]].values.tolist()
-                    received_table = Table(received_data)
-                    received_table.setStyle(TableStyle([
-                         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                         ('FONTSIZE', (0, 0), (-1, 0), 12),
-                         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                         ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    elements.append(received_table)
-               try:
-                    pdf.build(elements)
-                    print("PDF saved as 'expense_report.pdf' successfully.")
-               except IOError as e:
-                    print(f"Error writing PDF file: {e}")
-               return expenses_df, received_df
+               summaries = write_pdf_report(path, "Expense Report", [
+                    ("Expenses", "Category", (chunk.rename(columns=expense_columns) for chunk in expenses)),
+                    ("Received", "Sender", (chunk.rename(columns=received_columns) for chunk in received))
+               ])
+               print(f"PDF saved as '{path}' successfully "
+                     f"({summaries[0]['rows']} expenses, {summaries[1]['rows']} received entries).")
+               return summaries
+          except IOError as e:
+               print(f"Error writing PDF file: {e}")
+          except db_errors() as e:
+               print(f"Database error while exporting PDF: {e}")
           except Exception as e:
                print(f"Error saving to PDF: {e}")
-               return pd.DataFrame(), pd.DataFrame()
+          return []
 
      def generate_graphs(self):
           print("Filter data for graphs (leave blank for no filter):")
@@ -711,127 +879,188 @@ class Expenses:
           date_end = input("End date (YYYY-MM-DD): ").strip() or None
           category = input("Category: ").strip() or None
           use_monthly = input("Use monthly table (enter YYYY-MM-DD to specify month, or leave blank): ").strip() or None
-          timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+          return self.export_graphs(date_start, date_end, category, use_monthly)
+
+     def export_graphs(self, date_start=None, date_end=None, category=None, use_monthly=None, workers=CHART_WORKERS):
+          """Render the expense charts for a filter and return one {chart, path, seconds, error, cached} dict per chart.
+
+          Charts are cached under the filter and the ledger's content
+          fingerprint, so an unchanged ledger is not queried or redrawn.
+          """
+          from ledger.charts import CHARTS, render_charts
           try:
-               df = self.filter_data(
-                    "expenses",
-                    date_start=date_start,
-                    date_end=date_end,
-                    key="category" if category else None,
-                    value=category,
-                    use_monthly=use_monthly
+               params = {"date_start": date_start, "date_end": date_end, "category": category, "use_monthly": use_monthly}
+               start = time.perf_counter()
+               results = render_charts(
+                    lambda charts: self.chart_aggregates(charts, date_start, date_end, category, use_monthly),
+                    span=f"{date_start or 'Start'} to {date_end or 'End'}",
+                    workers=workers,
+                    min_parallel_rows=PARALLEL_CHART_ROWS,
+                    cache=self.chart_cache,
+                    cache_key=[params, self._ledger_version("expenses")]
                )
-               if df.empty:
+               if not results:
                     print("No expense data to graph with this filter.")
-                    return
-               df['date'] = pd.to_datetime(df['date'])
+                    return []
+               for result in results:
+                    label = CHARTS[result["chart"]][0]
+                    if result["error"]:
+                         print(f"Error plotting {label.lower()}: {result['error']}")
+                    elif result["cached"]:
+                         print(f"{label} unchanged: '{result['path']}'")
+                    else:
+                         print(f"{label} saved as '{result['path']}' ({result['seconds']:.2f}s)")
+               drawn = sum(not result["cached"] for result in results)
+               print(f"Rendered {drawn} of {len(results)} charts in {time.perf_counter() - start:.2f}s.")
+               return results
+          except db_errors() as e:
+               print(f"Database error: {e}")
+          except Exception as e:
+               print(f"Error generating graphs: {e}")
+          return []
 
-               try:
-                    plt.figure(figsize=(10, 6))
-                    sns.barplot(x='category', y='amount', data=df, estimator=sum, palette='viridis')
-                    plt.title(f"Spending by Category ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.xlabel("Category")
-                    plt.ylabel("Total Amount ($)")
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    filename = f"spending_by_category_filtered_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Bar chart saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting bar chart: {e}")
+     def chart_aggregates(self, charts, date_start=None, date_end=None, category=None, use_monthly=None):
+          """Return the aggregates render_charts draws the given charts from, or None if no expense matches.
 
-               try:
-                    plt.figure(figsize=(10, 6))
-                    sns.boxplot(x='category', y='amount', data=df, palette='pastel')
-                    plt.title(f"Expense Distribution by Category ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.xlabel("Category")
-                    plt.ylabel("Amount ($)")
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    filename = f"expense_distribution_by_category_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Box plot saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting box plot: {e}")
+          Sums come from aggregate(), so only one row per group leaves the
+          database; raw amounts are fetched only for the box and violin plots.
+          """
+          import pandas as pd
+          from ledger.charts import CHARTS, chart_data
+          needed = {CHARTS[name][2] for name in charts}
+          key = "category" if category else None
+          data = {}
+          if needed & {"totals", "daily", "pivot"}:
+               by_month = self.aggregate("expenses", ["month", "category"], date_start, date_end, key, category, use_monthly)
+               if by_month.empty:
+                    return None
+               data["rows"] = int(by_month["entries"].sum())
+               data["totals"] = by_month.groupby("category")["total"].sum()
+               data["pivot"] = by_month.pivot_table(values="total", index="month", columns="category", aggfunc="sum", fill_value=0)
+          if "daily" in needed:
+               daily = self.aggregate("expenses", ["date"], date_start, date_end, key, category, use_monthly)
+               data["daily"] = pd.Series(daily["total"].to_numpy(), index=daily["date"].to_numpy(dtype='datetime64[D]'))
+          if "distribution" in needed:
+               rows = self.filter_data("expenses", date_start, date_end, key, category, use_monthly, columns=["category", "amount"])
+               if rows.empty:
+                    return None
+               data["rows"] = len(rows)
+               data["distribution"] = chart_data(rows, ["box"])["distribution"]
+          return data
 
-               try:
-                    daily_totals = df.groupby('date')['amount'].sum().reset_index()
-                    plt.figure(figsize=(12, 6))
-                    sns.lineplot(x='date', y='amount', data=daily_totals, marker='o', color='teal')
-                    plt.title(f"Spending Over Time ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.xlabel("Date")
-                    plt.ylabel("Total Amount ($)")
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    filename = f"spending_over_time_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Line plot saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting line plot: {e}")
+     def aggregate(self, table, by, date_start=None, date_end=None, key=None, value=None, use_monthly=None):
+          """Return the sum and count of amount per group, sorted by group, as columns by + ["total", "entries"].
 
-               try:
-                    plt.figure(figsize=(10, 6))
-                    sns.violinplot(x='category', y='amount', data=df, palette='muted', inner='quartile')
-                    plt.title(f"Expense Distribution by Category (Violin) ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.xlabel("Category")
-                    plt.ylabel("Amount ($)")
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    filename = f"expense_violin_by_category_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Violin plot saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting violin plot: {e}")
+          by lists grouping columns among "date", "month" (YYYY-MM) and
+          "category" or "sender". Online the GROUP BY runs in the database,
+          and month-level groupings over whole months are read straight from
+          the trigger-maintained monthly aggregate table without touching
+          the rows.
+          """
+          import pandas as pd
+          import numpy as np
+          group_key = "category" if table == "expenses" else "sender"
+          columns = list(by) + ["total", "entries"]
+          if not self.db.available():
+               store = self.expense_store if table == "expenses" else self.received_store
+               mask = self._store_mask(store, date_start, date_end, key, value, use_monthly)
+               if mask is None:
+                    return pd.DataFrame(columns=columns)
+               frame = store.to_frame(mask=mask, columns=["date", "amount", group_key])
+               frame[group_key] = frame[group_key].astype(str)
+               frame["month"] = np.datetime_as_string(frame["date"].values.astype('datetime64[M]'), unit='M')
+               grouped = frame.groupby(list(by))["amount"].agg(total="sum", entries="count")
+               return grouped.reset_index()[columns]
+          months = self._whole_months(date_start, date_end, use_monthly)
+          with self.db.cursor() as cursor:
+               if months and set(by) <= {"month", group_key}:
+                    conditions = ["entries > 0"]
+                    params = []
+                    if months[0]:
+                         conditions.append("month >= %s")
+                         params.append(months[0])
+                    if months[1]:
+                         conditions.append("month <= %s")
+                         params.append(months[1])
+                    if key and value:
+                         conditions.append(f"{key} = %s")
+                         params.append(value)
+                    aggregate = "monthly_totals" if table == "expenses" else "monthly_received"
+                    query = (f"SELECT {', '.join(by)}, SUM(total) AS total, SUM(entries) AS entries FROM {aggregate} "
+                             f"WHERE {' AND '.join(conditions)}")
+               else:
+                    select = [{"month": "SUBSTR(date, 1, 7) AS month"}.get(name, name) for name in by]
+                    query = self._build_query(cursor, table, date_start, date_end, key, value, use_monthly,
+                                              select + ["SUM(amount) AS total", "COUNT(*) AS entries"])
+                    if query is None:
+                         return pd.DataFrame(columns=columns)
+                    query, params = query
+               cursor.execute(f"{query} GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}", params)
+               frame = pd.DataFrame(cursor.fetchall(), columns=columns)
+          frame["total"] = frame["total"].astype(float)
+          frame["entries"] = frame["entries"].astype(int)
+          if "date" in frame:
+               frame["date"] = pd.to_datetime(frame["date"])
+          return frame
 
-               try:
-                    df['month'] = df['date'].dt.strftime('%Y-%m')
-                    pivot = df.pivot_table(values='amount', index='month', columns='category', aggfunc='sum', fill_value=0)
-                    plt.figure(figsize=(12, 8))
-                    sns.heatmap(pivot, annot=True, fmt='.2f', cmap='YlGnBu', cbar_kws={'label': 'Total Amount ($)'})
-                    plt.title(f"Spending Heatmap by Category and Month ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.xlabel("Category")
-                    plt.ylabel("Month")
-                    plt.tight_layout()
-                    filename = f"spending_heatmap_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Heatmap saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting heatmap: {e}")
+     def _whole_months(self, date_start, date_end, use_monthly):
+          """Return (first, last) YYYY-MM months (None for open ends) if the filter covers whole months only, else None."""
+          import pandas as pd
+          try:
+               if use_monthly:
+                    if date_start or date_end:
+                         return None
+                    month = pd.to_datetime(use_monthly, format='%Y-%m-%d').strftime('%Y-%m')
+                    return month, month
+               start = pd.Timestamp(date_start) if date_start else None
+               end = pd.Timestamp(date_end) if date_end else None
+          except ValueError:
+               return None
+          if (start is not None and start.day != 1) or (end is not None and not end.is_month_end):
+               return None
+          return (start.strftime('%Y-%m') if start is not None else None,
+                  end.strftime('%Y-%m') if end is not None else None)
 
-               try:
-                    category_totals = df.groupby('category')['amount'].sum()
-                    plt.figure(figsize=(8, 8))
-                    category_totals.plot(kind='pie', autopct='%1.1f%%', startangle=90, colors=sns.color_palette('Set2'))
-                    plt.title(f"Spending Distribution by Category ({date_start or 'Start'} to {date_end or 'End'})")
-                    plt.ylabel("")
-                    plt.tight_layout()
-                    filename = f"category_distribution_filtered_{timestamp}.png"
-                    plt.savefig(filename)
-                    plt.close()
-                    print(f"Pie chart saved as '{filename}'")
-               except Exception as e:
-                    print(f"Error plotting pie chart: {e}")
-
-          except sql.Error as e:
-               print(f"Database error: {e}")
-          except Exception as e:
-               print(f"Error generating graphs: {e}")
+     def _ledger_version(self, *tables):
+          """Return a content fingerprint of the tables for chart cache keys.
+
+          Online it digests the row_hash of every row, so rows written by
+          other clients count too; offline it uses the stores.
+          """
+          if not self.db.available():
+               store = {"expenses": self.expense_store, "received": self.received_store}
+               return ["memory"] + [store[table].fingerprint() for table in tables]
+          dialect = self.db.dialect
+          version = [dialect]
+          with self.db.cursor() as cursor:
+               for table in tables:
+                    cursor.execute(LEDGER_DIGEST[dialect].format(table=table))
+                    digest = hashlib.sha1()
+                    while True:
+                         rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+                         if not rows:
+                              break
+                         digest.update(repr(rows).encode())
+                    version.append(digest.hexdigest())
+          return version
 
      def close(self):
+          spilled = self.writer.close()
+          self.report_writes()
+          if spilled:
+               print(f"Could not write {spilled} entries to the database; they are kept in "
+                     f"'{self.writer.spill_path}' and written on the next start.")
           try:
-               if self.connection and self.connection.is_connected():
-                    self.connection.close()
-                    print("Database connection closed successfully.")
-               plt.close('all')  # Clear all Matplotlib figures
-          except sql.Error as e:
+               self.db.close()
+               print("Database connections closed successfully.")
+               if "matplotlib.pyplot" in sys.modules:
+                    sys.modules["matplotlib.pyplot"].close('all')  # Clear all Matplotlib figures
+          except db_errors() as e:
                print(f"Error closing connection: {e}")
 
 def main():
+     if TRACE_FILE or METRICS_FILE:
+          trace.enable(TRACE_FILE, memory=TRACE_MEMORY)
      print("Welcome to Your Personal Expense Tracker")
      try:
           tracker = Expenses()
@@ -858,6 +1087,9 @@ def main():
                except ValueError:
                     print("Invalid input. Enter a number between 1 and 12.")
                     continue
+               if choice_int >= 3 and choice_int != 12:
+                    # Everything else reads the database, which must include what was just entered.
+                    tracker.sync_writes()
                if choice_int == 1:
                     tracker.enter_expenses()
                elif choice_int == 2:
@@ -867,11 +1099,17 @@ def main():
                elif choice_int == 4:
                     tracker.view_received()
                elif choice_int == 5:
-                    month = input("Enter month to filter (YYYY-MM, or leave blank for all): ").strip() or None
-                    tracker.show_total_expenses(month)
+                    month = input("Enter month to filter (YYYY-MM, several separated by commas, or leave blank for all): ").strip() or None
+                    if month and "," in month:
+                         tracker.show_monthly_totals([m.strip() for m in month.split(",") if m.strip()])
+                    else:
+                         tracker.show_total_expenses(month)
                elif choice_int == 6:
-                    month = input("Enter month to filter (YYYY-MM, or leave blank for all): ").strip() or None
-                    tracker.show_total_received(month)
+                    month = input("Enter month to filter (YYYY-MM, several separated by commas, or leave blank for all): ").strip() or None
+                    if month and "," in month:
+                         tracker.show_monthly_totals([m.strip() for m in month.split(",") if m.strip()])
+                    else:
+                         tracker.show_total_received(month)
                elif choice_int == 7:
                     tracker.calculate_balance()
                elif choice_int == 8:
@@ -890,6 +1128,176 @@ def main():
           print(f"Critical error in main: {e}")
           if 'tracker' in locals():
                tracker.close()
+     if METRICS_FILE:
+          trace.write_metrics(METRICS_FILE)
+
+def _filters(parser):
+     parser.add_argument("--from", dest="date_start", help="First date, YYYY-MM-DD.")
+     parser.add_argument("--to", dest="date_end", help="Last date, YYYY-MM-DD.")
+     parser.add_argument("--category", help="Only expenses in this category.")
+     parser.add_argument("--month", help="Only this month, YYYY-MM, read from the monthly tables.")
+
+def _batch_parser():
+     parser = argparse.ArgumentParser(
+          prog="codewithsqlimplemented.py",
+          description="Run one expense tracker command without prompts. Results are written to stdout as JSON lines "
+                      "and progress messages to stderr. Without a command the interactive menu starts."
+     )
+     commands = parser.add_subparsers(dest="command", required=True)
+     ingest = commands.add_parser("ingest", help="Add records from CSV or JSON-lines files, or stdin, in batches.")
+     ingest.add_argument("files", nargs="*", default=["-"], help="Files to read; '-' (the default) is stdin.")
+     ingest.add_argument("--table", choices=["expenses", "received"], default="expenses")
+     ingest.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto", help="auto goes by file extension; stdin is CSV.")
+     ingest.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+     ingest.add_argument("--date-format", default='%Y-%m-%d')
+     ingest.add_argument("--save", action="store_true", help="Rewrite expenses.csv and received.csv afterwards.")
+     ingest.add_argument("--memory-mb", type=int, default=IMPORT_MEMORY_BYTES // 2**20, help="Working memory for reading CSV files.")
+     ingest.add_argument("--restart", action="store_true", help="Import CSV files from the start even if an earlier import was interrupted.")
+     totals = commands.add_parser("totals", help="Print expense, received and balance totals.")
+     totals.add_argument("--month", nargs="+", help="One or more YYYY-MM months; all time if left out.")
+     export = commands.add_parser("export", help="Write matching rows as CSV or JSON lines, or both tables as a PDF report.")
+     export.add_argument("--format", choices=["csv", "jsonl", "pdf"], default="csv")
+     export.add_argument("--table", choices=["expenses", "received"], default="expenses", help="Table for CSV and JSON lines.")
+     export.add_argument("--output", help="File to write; stdout for CSV and JSON lines, expense_report.pdf for PDF.")
+     export.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE)
+     _filters(export)
+     graphs = commands.add_parser("graphs", help="Render the expense charts.")
+     graphs.add_argument("--workers", type=int, default=CHART_WORKERS)
+     _filters(graphs)
+     sync = commands.add_parser("sync", help="Add rows from expenses.csv and received.csv that the database lacks.")
+     sync.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+     return parser
+
+def _batch_ingest(tracker, args, out):
+     from ledger.ingest import EXPENSE_COLUMNS, RECEIVED_COLUMNS
+     from ledger.batch import conform_columns, read_records, record_format, rejected_records, emit
+     columns = EXPENSE_COLUMNS if args.table == "expenses" else RECEIVED_COLUMNS
+     start = time.perf_counter()
+     result = {"command": "ingest", "table": args.table, "rows": 0, "rejected": 0}
+
+     def report(rejected):
+          for record in rejected_records(source, rejected):
+               emit(record, out)
+
+     try:
+          for source in args.files:
+               if source != "-" and record_format(source, args.format) == "csv":
+                    # CSV files are read in chunks of bounded size, and an
+                    # interrupted import carries on where it stopped.
+                    summary = tracker.import_file(source, args.table, args.memory_mb * 2**20, args.restart, report,
+                                                  args.batch_size, args.date_format, lambda raw: conform_columns(raw, columns))
+                    emit(dict(source=source, **summary), out)
+                    result["rows"] += summary["rows"]
+                    result["rejected"] += summary["rejected"]
+                    continue
+               for _, clean, rejected in read_records([source], columns, args.format, args.batch_size, args.date_format):
+                    result["rows"] += tracker.add_rows(args.table, clean, args.batch_size)
+                    result["rejected"] += len(rejected)
+                    for record in rejected_records(source, rejected):
+                         emit(record, out)
+     except (OSError, ValueError) + db_errors() as e:
+          # Rows reported in "rows" were added before the failure.
+          result["error"] = str(e)
+     result["seconds"] = round(time.perf_counter() - start, 3)
+     if args.save and "error" not in result:
+          result["saved"] = tracker.save_to_a_csv() is not None
+     emit(result, out)
+     return 1 if "error" in result or not result.get("saved", True) else 0
+
+def _batch_totals(tracker, args, out):
+     from ledger.batch import emit
+     for month in args.month or [None]:
+          try:
+               tracker._month_key(month)
+          except ValueError:
+               emit({"command": "totals", "month": month, "error": "Invalid month. Use YYYY-MM."}, out)
+               return 1
+          tracker.show_total_expenses(month)
+          tracker.show_total_received(month)
+          emit({
+               "command": "totals",
+               "month": month,
+               "expenses": round(tracker.total_expenses, 2),
+               "received": round(tracker.total_received, 2),
+               "balance": round(tracker.total_received - tracker.total_expenses, 2)
+          }, out)
+     return 0
+
+def _batch_export(tracker, args, out):
+     from ledger.batch import emit, write_frame, open_output
+     use_monthly = args.month + "-01" if args.month else None
+     if args.format == "pdf":
+          path = args.output or "expense_report.pdf"
+          summaries = tracker.export_pdf(path, args.date_start, args.date_end, args.category, use_monthly, args.chunk_size)
+          if not summaries:
+               emit({"command": "export", "format": "pdf", "error": f"Could not write '{path}'."}, out)
+               return 1
+          emit({"command": "export", "format": "pdf", "path": path,
+                "expenses": summaries[0]["rows"], "received": summaries[1]["rows"]}, out)
+          return 0
+     columns = CSV_EXPORT_COLUMNS[args.table]
+     category = args.category if args.table == "expenses" else None
+     result = {"command": "export", "format": args.format, "table": args.table, "path": args.output or "-", "rows": 0}
+     try:
+          with open_output(args.output, out) as stream:
+               if args.format == "csv":
+                    stream.write(",".join(columns.values()) + "\n")
+               for chunk in tracker.iter_filtered(args.table, args.date_start, args.date_end, "category" if category else None,
+                                                  category, use_monthly, list(columns), args.chunk_size):
+                    write_frame(chunk.rename(columns=columns) if args.format == "csv" else chunk, stream, args.format)
+                    result["rows"] += len(chunk)
+     except (OSError,) + db_errors() as e:
+          result["error"] = str(e)
+     # The rows themselves occupy stdout when no file is given.
+     emit(result, out if args.output else sys.stderr)
+     return 1 if "error" in result else 0
+
+def _batch_graphs(tracker, args, out):
+     from ledger.batch import emit
+     use_monthly = args.month + "-01" if args.month else None
+     results = tracker.export_graphs(args.date_start, args.date_end, args.category, use_monthly, workers=args.workers)
+     emit({"command": "graphs", "charts": results}, out)
+     return 1 if any(result["error"] for result in results) else 0
+
+def _batch_sync(tracker, args, out):
+     from ledger.batch import emit
+     added = tracker.sync_csv_to_sql(args.batch_size)
+     if added is None:
+          emit({"command": "sync", "error": "Nothing was synced; see stderr."}, out)
+          return 1
+     emit({"command": "sync", "expenses": added[0], "received": added[1]}, out)
+     return 0
+
+BATCH_COMMANDS = {
+     "ingest": _batch_ingest,
+     "totals": _batch_totals,
+     "export": _batch_export,
+     "graphs": _batch_graphs,
+     "sync": _batch_sync
+}
+
+def batch(argv):
+     """Run one command from argv without prompting and return the exit status.
+
+     Results go to stdout as JSON lines; everything the tracker prints goes
+     to stderr so scripts can parse stdout directly.
+     """
+     args = _batch_parser().parse_args(argv)
+     if TRACE_FILE or METRICS_FILE:
+          trace.enable(TRACE_FILE, memory=TRACE_MEMORY)
+     out = sys.stdout
+     with contextlib.redirect_stdout(sys.stderr):
+          tracker = Expenses()
+          try:
+               tracker.sync_writes()
+               status = BATCH_COMMANDS[args.command](tracker, args, out)
+          finally:
+               tracker.close()
+     if METRICS_FILE:
+          trace.write_metrics(METRICS_FILE)
+     return status
 
 if __name__ == "__main__":
+     if len(sys.argv) > 1:
+          sys.exit(batch(sys.argv[1:]))
      main()
@@ -8,20 +8,51 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from collections import OrderedDict
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.store import ColumnStore, EXPENSE_SCHEMA, RECEIVED_SCHEMA
+from ledger.ingest import EXPENSE_COLUMNS
+from ledger.importer import import_csv
+from ledger.parquet import PartitionedParquet
+from ledger.chartcache import ChartCache
+from ledger import trace
 
+UPLOAD_RECEIVED_COLUMNS = {"Sender": "sender", "Amount": "amount", "Date": "date"}
+QUERY_CACHE_SIZE = 32
+PARQUET_DIR = "ledger_parquet"
+SORT_KEYS = {"expenses": "category", "received": "sender"}
+CHART_CACHE_DIR = "chart_cache"
+CHART_CACHE_BYTES = 64 * 2**20
+UPLOAD_MEMORY_BYTES = 64 * 2**20
+# Uploads come from any spreadsheet, so each date is parsed on its own rather
+# than in the format pandas infers from a chunk's first value.
+UPLOAD_DATE_FORMAT = "mixed"
+# Set EXPENSES_TRACE (JSON lines) and/or EXPENSES_METRICS before `streamlit run`
+# to trace each operation; the sidebar then shows the metrics.
+TRACE_FILE = os.environ.get("EXPENSES_TRACE")
+METRICS_FILE = os.environ.get("EXPENSES_METRICS")
+TRACE_MEMORY = os.environ.get("EXPENSES_TRACE_MEMORY") == "1"
+VIEW_COLUMNS = {
+    "expenses": {"date": "Date", "amount": "Amount", "category": "Category", "place": "Place", "autopay": "Auto-Pay"},
+    "received": {"date": "Date", "amount": "Amount", "sender": "Sender"}
+}
+
+if TRACE_FILE or METRICS_FILE:
+    trace.enable(TRACE_FILE, memory=TRACE_MEMORY)
+
+@trace.instrument
 class Expenses:
     def __init__(self):
         self.expenses = {}
         self.received = {}
-        self.category = []
-        self.amountspent = []
-        self.datespent = []
-        self.placeofspending = []
-        self.autopay = []
-        self.sender = []
-        self.amount_received = []
-        self.dateofreceiving = []
+        self.expense_store = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+        self.received_store = ColumnStore(RECEIVED_SCHEMA, group_by="sender")
+        self._query_cache = OrderedDict()
+        self._cache_versions = {}
+        self.parquet = PartitionedParquet(PARQUET_DIR)
+        self.chart_cache = ChartCache(CHART_CACHE_DIR, CHART_CACHE_BYTES)
         self.prior_balance = 0.0
         self.total_expenses = 0.0
         self.total_received = 0.0
@@ -39,64 +70,100 @@ class Expenses:
         except ValueError as e:
             return f"Error: {e}"
 
+    def _require_columns(self, upload, columns, message):
+        # Only the header is read; the upload is rewound for the import.
+        header = pd.read_csv(upload, nrows=0).columns
+        upload.seek(0)
+        if set(columns) - set(header):
+            raise ValueError(message)
+
+    def _import_upload(self, upload, columns, store):
+        # Parsed a bounded chunk at a time, so a large upload never exists as one frame of strings.
+        rejected = []
+        summary = import_csv(upload, columns, lambda clean: store.extend({name: clean[name] for name in store.schema}),
+                             date_format=UPLOAD_DATE_FORMAT, memory_limit=UPLOAD_MEMORY_BYTES, on_rejected=rejected.append)
+        return summary["rows"], pd.concat(rejected, ignore_index=True) if rejected else pd.DataFrame()
+
     def load_from_csv(self, expenses_file=None, received_file=None, prior_balance_file=None):
         messages = []
+        rejected = {}
         try:
             if expenses_file is not None:
-                expenses_df = pd.read_csv(expenses_file)
-                required_columns = ['Category', 'Amount', 'Date', 'Place of Spending', 'Auto-Pay']
-                if not all(col in expenses_df.columns for col in required_columns):
-                    raise ValueError("Expenses CSV must contain columns: Category, Amount, Date, Place of Spending, Auto-Pay")
-                for _, row in expenses_df.iterrows():
-                    self.category.append(str(row['Category']))
-                    self.amountspent.append(float(row['Amount']))
-                    self.datespent.append(str(row['Date']))
-                    self.placeofspending.append(str(row['Place of Spending']))
-                    self.autopay.append(bool(row['Auto-Pay']))
-                messages.append(f"Loaded {len(expenses_df)} expense entries from CSV.")
+                self._require_columns(expenses_file, EXPENSE_COLUMNS,
+                                      "Expenses CSV must contain columns: Category, Amount, Date, Place of Spending, Auto-Pay")
+                loaded, rejected_df = self._import_upload(expenses_file, EXPENSE_COLUMNS, self.expense_store)
+                messages.append(f"Loaded {loaded} expense entries from CSV.")
+                if not rejected_df.empty:
+                    rejected['expenses'] = rejected_df
+                    messages.append(f"Skipped {len(rejected_df)} invalid expense rows (see report below).")
             if received_file is not None:
-                received_df = pd.read_csv(received_file)
-                required_columns = ['Sender', 'Amount', 'Date']
-                if not all(col in received_df.columns for col in required_columns):
-                    raise ValueError("Received CSV must contain columns: Sender, Amount, Date")
-                for _, row in received_df.iterrows():
-                    self.sender.append(str(row['Sender']))
-                    self.amount_received.append(float(row['Amount']))
-                    self.dateofreceiving.append(str(row['Date']))
-                messages.append(f"Loaded {len(received_df)} received entries from CSV.")
+                self._require_columns(received_file, UPLOAD_RECEIVED_COLUMNS, "Received CSV must contain columns: Sender, Amount, Date")
+                loaded, rejected_df = self._import_upload(received_file, UPLOAD_RECEIVED_COLUMNS, self.received_store)
+                messages.append(f"Loaded {loaded} received entries from CSV.")
+                if not rejected_df.empty:
+                    rejected['received'] = rejected_df
+                    messages.append(f"Skipped {len(rejected_df)} invalid received rows (see report below).")
             if prior_balance_file is not None:
                 prior_balance_data = prior_balance_file.read().decode('utf-8')
                 self.prior_balance = float(prior_balance_data)
                 messages.append(f"Loaded prior balance: {self.prior_balance:.2f}")
             if not messages:
                 messages.append("No files were uploaded to load.")
-            return messages
+            return messages, rejected
         except Exception as e:
-            return [f"Error loading CSV: {e}"]
+            return [f"Error loading CSV: {e}"], rejected
+
+    def _cached(self, kind, table, args, build):
+        store = self.expense_store if table == "expenses" else self.received_store
+        if self._cache_versions.get(table) != store.version:
+            # New rows were added; every cached result for this table is stale.
+            for cache_key in [k for k in self._query_cache if k[1] == table]:
+                del self._query_cache[cache_key]
+            self._cache_versions[table] = store.version
+        cache_key = (kind, table, args)
+        frame = self._query_cache.get(cache_key)
+        if frame is None:
+            frame = build(store)
+            self._query_cache[cache_key] = frame
+            while len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        else:
+            self._query_cache.move_to_end(cache_key)
+        # Shallow copy so callers can add or replace columns without touching the cache.
+        return frame.copy(deep=False)
 
-    def filter_data(self, table, date_start=None, date_end=None, key=None, value=None):
+    def ledger_version(self, table, source="memory"):
+        # Content fingerprints rather than version counters, so charts stay cached across reruns and restarts.
+        if source == "parquet":
+            return ["parquet", self.parquet.fingerprint(table)]
+        store = self.expense_store if table == "expenses" else self.received_store
+        return ["memory", store.fingerprint()]
+
+    def _source_version(self, table, source):
+        # Parquet files can be rewritten by another session or process; memory is covered by store.version in _cached.
+        return self.parquet.fingerprint(table) if source == "parquet" else None
+
+    def filter_data(self, table, date_start=None, date_end=None, key=None, value=None, source="memory"):
         try:
-            if table == "expenses":
-                df = pd.DataFrame({
-                    'category': self.category,
-                    'amount': self.amountspent,
-                    'date': pd.to_datetime(self.datespent),
-                    'place': self.placeofspending,
-                    'autopay': self.autopay
-                })
+            equals = {key: value} if key and value else {}
+            if source == "parquet":
+                # Date range prunes month directories; the rest is checked against row-group statistics.
+                build = lambda store: self.parquet.read(table, date_start=date_start, date_end=date_end, **equals)
             else:
-                df = pd.DataFrame({
-                    'sender': self.sender,
-                    'amount': self.amount_received,
-                    'date': pd.to_datetime(self.dateofreceiving)
-                })
-            if date_start:
-                df = df[df['date'] >= pd.to_datetime(date_start)]
-            if date_end:
-                df = df[df['date'] <= pd.to_datetime(date_end)]
-            if key and value:
-                df = df[df[key] == value]
-            return df
+                build = lambda store: store.to_frame(mask=store.mask(date_start=date_start, date_end=date_end, **equals))
+            return self._cached("filter", table, (date_start, date_end, key, value, source, self._source_version(table, source)), build)
+        except Exception as e:
+            st.error(f"Error filtering data: {e}")
+            return pd.DataFrame()
+
+    def view_data(self, table, date_start=None, date_end=None, key=None, value=None, source="memory"):
+        try:
+            def build(store):
+                df = self.filter_data(table, date_start, date_end, key, value, source).rename(columns=VIEW_COLUMNS[table])
+                if not df.empty:
+                    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+                return df[list(VIEW_COLUMNS[table].values())] if not df.empty else df
+            return self._cached("view", table, (date_start, date_end, key, value, source, self._source_version(table, source)), build)
         except Exception as e:
             st.error(f"Error filtering data: {e}")
             return pd.DataFrame()
@@ -111,11 +178,7 @@ class Expenses:
             autopay = autopay
             if not category:
                 raise ValueError("Category cannot be empty.")
-            self.category.append(category)
-            self.amountspent.append(amount)
-            self.datespent.append(date)
-            self.placeofspending.append(place)
-            self.autopay.append(autopay)
+            self.expense_store.append(category=category, amount=amount, date=date, place=place, autopay=autopay)
             return f"Expense added: {category}, {currency_symbol}{amount:.2f}, {date}"
         except ValueError as e:
             return f"Error: {e}"
@@ -131,9 +194,7 @@ class Expenses:
             date = date_obj.strftime('%Y-%m-%d')
             if not sender:
                 raise ValueError("Sender cannot be empty.")
-            self.sender.append(sender)
-            self.amount_received.append(amount)
-            self.dateofreceiving.append(date)
+            self.received_store.append(sender=sender, amount=amount, date=date)
             return f"Received added: {sender}, {currency_symbol}{amount:.2f}, {date}"
         except ValueError as e:
             return f"Error: {e}"
@@ -142,15 +203,8 @@ class Expenses:
 
     def show_total_expenses(self, month=None, currency_symbol="₹"):
         try:
-            if month:
-                pd.to_datetime(month + "-01", format='%Y-%m-%d')
-                df = pd.DataFrame({
-                    'amount': self.amountspent,
-                    'date': pd.to_datetime(self.datespent)
-                })
-                self.total_expenses = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-            else:
-                self.total_expenses = sum(self.amountspent)
+            month_key = pd.to_datetime(month + "-01", format='%Y-%m-%d').strftime('%Y-%m') if month else None
+            self.total_expenses = self.expense_store.running_total(month=month_key)
             month_str = f" for {month}" if month else ""
             return f"Total Expenses{month_str}: {currency_symbol}{self.total_expenses:.2f}"
         except ValueError:
@@ -160,15 +214,8 @@ class Expenses:
 
     def show_total_received(self, month=None, currency_symbol="₹"):
         try:
-            if month:
-                pd.to_datetime(month + "-01", format='%Y-%m-%d')
-                df = pd.DataFrame({
-                    'amount': self.amount_received,
-                    'date': pd.to_datetime(self.dateofreceiving)
-                })
-                self.total_received = df[df['date'].dt.strftime('%Y-%m') == month]['amount'].sum()
-            else:
-                self.total_received = sum(self.amount_received)
+            month_key = pd.to_datetime(month + "-01", format='%Y-%m-%d').strftime('%Y-%m') if month else None
+            self.total_received = self.received_store.running_total(month=month_key)
             month_str = f" for {month}" if month else ""
             total_with_prior = self.total_received + self.prior_balance
             return f"Total Received{month_str} (including prior balance {currency_symbol}{self.prior_balance:.2f}): {currency_symbol}{total_with_prior:.2f}"
@@ -193,12 +240,12 @@ class Expenses:
 
     def save_to_csv_by_month(self):
         try:
-            expenses_df = pd.DataFrame({
-                "Category": self.category,
-                "Amount": self.amountspent,
-                "Date": pd.to_datetime(self.datespent),
-                "Place of Spending": self.placeofspending,
-                "Auto-Pay": self.autopay
+            expenses_df = self.expense_store.to_frame().rename(columns={
+                "category": "Category",
+                "amount": "Amount",
+                "date": "Date",
+                "place": "Place of Spending",
+                "autopay": "Auto-Pay"
             })
             messages = []
             saved_files = []
@@ -209,10 +256,10 @@ class Expenses:
                     group[['Category', 'Amount', 'Date', 'Place of Spending', 'Auto-Pay']].to_csv(filename, index=False)
                     messages.append(f"Saved expenses for {month} to '{filename}'")
                     saved_files.append(filename)
-            received_df = pd.DataFrame({
-                "Sender": self.sender,
-                "Amount": self.amount_received,
-                "Date": pd.to_datetime(self.dateofreceiving)
+            received_df = self.received_store.to_frame().rename(columns={
+                "sender": "Sender",
+                "amount": "Amount",
+                "date": "Date"
             })
             if not received_df.empty:
                 received_df['Month'] = received_df['Date'].dt.strftime('%Y_%m')
@@ -232,6 +279,54 @@ class Expenses:
         except Exception as e:
             return [f"Error saving to CSV: {e}"], []
 
+    def save_to_parquet(self):
+        try:
+            messages = []
+            for table, store in (("expenses", self.expense_store), ("received", self.received_store)):
+                written = self.parquet.write(table, store.to_frame(), sort_key=SORT_KEYS[table])
+                if written:
+                    messages.append(f"Saved {written} {table} rows to {len(self.parquet.months(table))} monthly Parquet partitions in '{PARQUET_DIR}'")
+            if not messages:
+                messages.append("No data to save.")
+            return messages
+        except Exception as e:
+            return [f"Error saving to Parquet: {e}"]
+
+    def load_from_parquet(self, month=None):
+        try:
+            month = pd.to_datetime(month + "-01", format='%Y-%m-%d').strftime('%Y-%m') if month else None
+            messages = []
+            for table, store in (("expenses", self.expense_store), ("received", self.received_store)):
+                df = self.parquet.read(table, month=month)
+                if df.empty:
+                    continue
+                loaded = self._not_loaded(store, df, month)
+                if loaded.empty:
+                    messages.append(f"All {len(df)} {table} entries{f' for {month}' if month else ''} are already loaded.")
+                    continue
+                store.extend({name: loaded[name] for name in store.schema})
+                files = len(self.parquet.files(table, month=month))
+                skipped = f" ({len(df) - len(loaded)} already loaded)" if len(loaded) < len(df) else ""
+                messages.append(f"Loaded {len(loaded)} {table} entries from {files} Parquet files{skipped}.")
+            if not messages:
+                messages.append(f"No Parquet data found{f' for {month}' if month else ''}.")
+            return messages
+        except Exception as e:
+            return [f"Error loading Parquet: {e}"]
+
+    def _not_loaded(self, store, df, month):
+        # Rows of df beyond those already in the store, matching identical rows
+        # one for one so genuine repeats of an entry are kept.
+        columns = list(store.schema)
+        present = store.to_frame(mask=store.mask(month=month) if month else None)
+        keys = []
+        for frame in (df, present):
+            key = frame[columns].astype(object)
+            key["copy"] = key.groupby(columns, dropna=False, sort=False).cumcount()
+            keys.append(key)
+        merged = keys[0].merge(keys[1], on=columns + ["copy"], how="left", indicator=True)
+        return df[(merged["_merge"] == "left_only").values].reset_index(drop=True)
+
 if 'tracker' not in st.session_state:
     st.session_state.tracker = Expenses()
 
@@ -258,7 +353,8 @@ page = st.sidebar.selectbox("Choose an option", [
     "View Received",
     "Totals & Balance",
     "Save to Monthly CSVs",
-    "Load from CSVs"
+    "Load from CSVs",
+    "Parquet Storage"
 ])
 
 if page == "Home":
@@ -302,36 +398,36 @@ elif page == "View Expenses":
         date_start = st.date_input("Start Date", None)
         date_end = st.date_input("End Date", None)
         category = st.text_input("Category", "")
+        source = st.radio("Source", ["Memory", "Parquet"], horizontal=True)
         plot = st.checkbox("Generate Plot")
         submit = st.form_submit_button("Filter")
         if submit:
-            df = tracker.filter_data(
+            df = tracker.view_data(
                 "expenses",
                 date_start=str(date_start) if date_start else None,
                 date_end=str(date_end) if date_end else None,
                 key="category" if category else None,
-                value=category
+                value=category,
+                source=source.lower()
             )
             if df.empty:
                 st.warning("No expenses match the filter.")
             else:
-                df = df.rename(columns={
-                    "date": "Date",
-                    "amount": "Amount",
-                    "category": "Category",
-                    "place": "Place",
-                    "autopay": "Auto-Pay"
-                })
-                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-                st.dataframe(df[["Date", "Amount", "Category", "Place", "Auto-Pay"]])
+                st.dataframe(df)
                 if plot:
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    sns.barplot(x='Category', y='Amount', data=df, estimator=sum, palette='muted', ax=ax)
-                    ax.set_title(f"Expenses by Category ({date_start or 'Start'} to {date_end or 'End'})")
-                    ax.set_xlabel("Category")
-                    ax.set_ylabel(f"Total Amount ({currency_symbol})")
-                    plt.xticks(rotation=45)
-                    st.pyplot(fig)
+                    def render(path):
+                        fig, ax = plt.subplots(figsize=(10, 6))
+                        sns.barplot(x='Category', y='Amount', data=df, estimator=sum, palette='muted', ax=ax)
+                        ax.set_title(f"Expenses by Category ({date_start or 'Start'} to {date_end or 'End'})")
+                        ax.set_xlabel("Category")
+                        ax.set_ylabel(f"Total Amount ({currency_symbol})")
+                        plt.xticks(rotation=45)
+                        fig.savefig(path, bbox_inches='tight', dpi=200)
+                        plt.close(fig)
+                    params = {"date_start": str(date_start or ""), "date_end": str(date_end or ""), "category": category, "currency": currency_symbol}
+                    path, _ = tracker.chart_cache.get_or_render(
+                        "view_expenses_barplot", params, tracker.ledger_version("expenses", source.lower()), render)
+                    st.image(path, use_container_width=True)
 
 elif page == "View Received":
     st.header("View Received")
@@ -339,25 +435,21 @@ elif page == "View Received":
         date_start = st.date_input("Start Date", None)
         date_end = st.date_input("End Date", None)
         sender = st.text_input("Sender", "")
+        source = st.radio("Source", ["Memory", "Parquet"], horizontal=True)
         submit = st.form_submit_button("Filter")
         if submit:
-            df = tracker.filter_data(
+            df = tracker.view_data(
                 "received",
                 date_start=str(date_start) if date_start else None,
                 date_end=str(date_end) if date_end else None,
                 key="sender" if sender else None,
-                value=sender
+                value=sender,
+                source=source.lower()
             )
             if df.empty:
                 st.warning("No received amounts match the filter.")
             else:
-                df = df.rename(columns={
-                    "date": "Date",
-                    "amount": "Amount",
-                    "sender": "Sender"
-                })
-                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-                st.dataframe(df[["Date", "Amount", "Sender"]])
+                st.dataframe(df)
 
 elif page == "Totals & Balance":
     st.header("Totals & Balance")
@@ -375,16 +467,22 @@ elif page == "Totals & Balance":
             if results['needed']:
                 st.write(results['needed'])
             if plot:
-                fig, ax = plt.subplots(figsize=(6, 6))
                 balance_data = pd.DataFrame({
                     'Type': ['Expenses', 'Received'],
                     'Amount': [tracker.total_expenses, tracker.total_received + tracker.prior_balance]
                 })
-                sns.barplot(x='Type', y='Amount', data=balance_data, palette='Set2', ax=ax)
-                month_str = f" for {month}" if month else ""
-                ax.set_title(f"Expenses vs Received{month_str}")
-                ax.set_ylabel(f"Amount ({currency_symbol})")
-                st.pyplot(fig)
+                def render(path):
+                    fig, ax = plt.subplots(figsize=(6, 6))
+                    sns.barplot(x='Type', y='Amount', data=balance_data, palette='Set2', ax=ax)
+                    month_str = f" for {month}" if month else ""
+                    ax.set_title(f"Expenses vs Received{month_str}")
+                    ax.set_ylabel(f"Amount ({currency_symbol})")
+                    fig.savefig(path, bbox_inches='tight', dpi=200)
+                    plt.close(fig)
+                # The plot shows nothing but the two totals, so they are the whole key.
+                params = {"month": month, "amounts": [round(a, 2) for a in balance_data['Amount']], "currency": currency_symbol}
+                path, _ = tracker.chart_cache.get_or_render("balance_comparison", params, None, render)
+                st.image(path, use_container_width=True)
 
 elif page == "Save to Monthly CSVs":
     st.header("Save to Monthly CSVs")
@@ -408,12 +506,45 @@ elif page == "Load from CSVs":
         prior_balance_file = st.file_uploader("Upload Prior Balance File (prior_balance.txt)", type="txt")
         submit = st.form_submit_button("Load Data")
         if submit:
-            messages = tracker.load_from_csv(expenses_file, received_file, prior_balance_file)
+            messages, rejected = tracker.load_from_csv(expenses_file, received_file, prior_balance_file)
             for message in messages:
                 if "Error" in message:
                     st.error(message)
+                elif "Skipped" in message:
+                    st.warning(message)
                 else:
                     st.success(message)
+            for table, rejected_df in rejected.items():
+                st.subheader(f"Rejected {table} rows")
+                st.dataframe(rejected_df)
+
+elif page == "Parquet Storage":
+    st.header("Parquet Storage")
+    st.write(f"Expenses and received amounts are stored as one Parquet file per month under '{PARQUET_DIR}'.")
+    if st.button("Save to Parquet"):
+        for message in tracker.save_to_parquet():
+            if "Error" in message:
+                st.error(message)
+            else:
+                st.success(message)
+    with st.form(key='load_parquet_form'):
+        month = st.text_input("Month (YYYY-MM, leave blank for all)", "")
+        submit = st.form_submit_button("Load from Parquet")
+        if submit:
+            for message in tracker.load_from_parquet(month or None):
+                if "Error" in message:
+                    st.error(message)
+                else:
+                    st.success(message)
+
+# After the page so the snapshot includes what it just did.
+if trace.enabled():
+    with st.sidebar.expander("Metrics"):
+        metrics_text = trace.metrics_text()
+        st.code(metrics_text, language=None)
+        st.download_button("Download metrics", metrics_text, file_name="metrics.prom")
+        if METRICS_FILE:
+            trace.write_metrics(METRICS_FILE)
 
 if __name__ == "__main__":
     st.write("Made by Rananjay Singh 'RJ' Chauhan")
@@ -0,0 +1,57 @@
+# Expense-Tracker
+# Benchmark: bulk entry through piped menu keystrokes vs the batch ingest command.
+#
+# Usage: python benchmarks/bench_batch.py [rows]
+# Runs the MySQL CLI on its embedded SQLite backend. "keystrokes" feeds the
+# interactive menu one prompt answer per line, as scripts had to before;
+# "ingest" streams the same rows as CSV into `ingest`. Both start from an
+# empty ledger and write nothing but the database.
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from synthetic import synthetic_expenses
+
+
+def keystrokes(expenses):
+    lines = ["1", str(len(expenses))]
+    for row in expenses.itertuples(index=False):
+        lines += [row.category, f"{row.amount:.2f}", row.date.strftime('%Y-%m-%d'), row.place, str(row.autopay)]
+    return "\n".join(lines + ["12"]) + "\n"
+
+
+def run(label, stdin, func, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        sys.stdin = io.StringIO(stdin)
+        try:
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+        finally:
+            sys.stdin = sys.__stdin__
+            os.chdir(os.path.dirname(tmp))
+    print(f"{label:<11} {rows:>7} rows  {elapsed:8.2f}s  {rows / elapsed:10.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    expenses = synthetic_expenses(rows)
+    typed = run("keystrokes", keystrokes(expenses), codewithsqlimplemented.main, rows)
+    streamed = expenses.rename(columns=codewithsqlimplemented.CSV_EXPORT_COLUMNS["expenses"]).to_csv(index=False, date_format='%Y-%m-%d')
+    ingested = run("ingest", streamed, lambda: codewithsqlimplemented.batch(["ingest"]), rows)
+    print(f"ingest is {typed / ingested:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
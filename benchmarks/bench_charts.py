@@ -0,0 +1,54 @@
+# Expense-Tracker
+# Benchmark: the six expense charts drawn serially in-process vs in a process pool.
+#
+# Usage: python benchmarks/bench_charts.py [rows] [workers]
+# Prints the aggregate time and per-chart drawing times for each mode. The
+# parallel wall time is bounded by the slowest chart (usually the violin plot),
+# so the speed-up tops out near the CPU count or six, whichever is lower.
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.charts import chart_data, render_charts
+
+
+def synthetic_expenses(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": np.datetime64('2020-01-01') + rng.integers(0, 5 * 365, rows).astype('timedelta64[D]'),
+        "amount": rng.gamma(2.0, 40.0, rows).round(2),
+        "category": rng.choice(["Food", "Rent", "Travel", "Bills", "Fun"], rows)
+    })
+
+
+def run(label, frame, out_dir, workers):
+    start = time.perf_counter()
+    results = render_charts(frame, out_dir, label, workers=workers)
+    elapsed = time.perf_counter() - start
+    timings = "  ".join(f"{result['chart']} {result['seconds']:.2f}s" for result in results)
+    failed = [result["chart"] for result in results if result["error"]]
+    print(f"{label:<10} {elapsed:7.2f}s  {timings}{'  FAILED ' + ', '.join(failed) if failed else ''}")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    frame = synthetic_expenses(rows)
+    start = time.perf_counter()
+    chart_data(frame)
+    print(f"aggregates {time.perf_counter() - start:7.2f}s  ({rows} rows, {workers} workers)")
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = run("serial", frame, tmp, 1)
+        parallel = run("parallel", frame, tmp, workers)
+    print(f"speed-up   {serial / parallel:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Expense-Tracker
+# Benchmark: peak memory of reading a whole ledger CSV vs the chunked importer, and resuming an import.
+#
+# Usage: python benchmarks/bench_import.py [max_rows] [memory_mb]
+# Writes synthetic expenses.csv files of growing size and parses each one
+# with read_ledger_csv (one frame) and import_csv (chunks sized for
+# memory_mb), measuring peak memory with tracemalloc. Parsed rows are
+# counted and dropped, so only the pipeline's working memory is measured:
+# the importer's peak should stay flat while the file grows. Finally an
+# import is interrupted halfway and resumed from its checkpoint.
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.importer import ImportCheckpoint, import_csv
+from ledger.ingest import EXPENSE_COLUMNS, read_ledger_csv
+from synthetic import synthetic_ledger, write_sql_cli_files
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, seconds, peak
+
+
+def whole():
+    return len(read_ledger_csv("expenses.csv", EXPENSE_COLUMNS)[0])
+
+
+def chunked(memory_limit, checkpoint=None, stop_after=None):
+    written = []
+
+    def write(clean):
+        if stop_after is not None and len(written) == stop_after:
+            raise KeyboardInterrupt
+        written.append(len(clean))
+
+    try:
+        import_csv("expenses.csv", EXPENSE_COLUMNS, write, memory_limit=memory_limit, checkpoint=checkpoint)
+    except KeyboardInterrupt:
+        pass
+    return sum(written)
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 800000
+    memory_limit = (int(sys.argv[2]) if len(sys.argv) > 2 else 16) * 2**20
+    sizes = [max_rows // 16, max_rows // 4, max_rows]
+    print(f"{'rows':>9} {'file MiB':>9} {'whole peak':>11} {'chunked peak':>13} {'whole s':>8} {'chunked s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for rows in sizes:
+            write_sql_cli_files(".", *synthetic_ledger(rows))
+            size = os.path.getsize("expenses.csv")
+            whole_rows, whole_seconds, whole_peak = measure(whole)
+            chunked_rows, chunked_seconds, chunked_peak = measure(lambda: chunked(memory_limit))
+            assert whole_rows == chunked_rows
+            print(f"{rows:>9} {size / 2**20:>9.1f} {whole_peak / 2**20:>9.1f} MiB {chunked_peak / 2**20:>9.1f} MiB "
+                  f"{whole_seconds:>8.2f} {chunked_seconds:>10.2f}")
+
+        checkpoint = ImportCheckpoint("checkpoints", "expenses.csv", "expenses")
+        first = chunked(memory_limit, checkpoint, stop_after=2)
+        checkpoint = ImportCheckpoint("checkpoints", "expenses.csv", "expenses")
+        resumed_at = checkpoint.line + 1
+        rest = chunked(memory_limit, checkpoint)
+        print(f"\nInterrupted after {first} rows, resumed at line {resumed_at} and imported {rest} more: "
+              f"{first + rest} of {whole_rows} rows, none repeated.")
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
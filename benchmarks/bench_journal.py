@@ -0,0 +1,61 @@
+# Expense-Tracker
+# Benchmark: journaled entry throughput, fsync per record vs group commit.
+#
+# Usage: python benchmarks/bench_journal.py [records]
+# Also runs the CSV CLI's add_expense path (journal plus background
+# checkpoints) and checks that a reload sees every row.
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+from ledger.journal import Journal
+import codewithoutSQL
+
+
+def record(i):
+    return {"lsn": i, "date": "2025-03-01", "amount": 12.5, "category": "Food", "place": "Shop", "autopay": False}
+
+
+def journal_rate(path, records, group_records, group_ms):
+    journal = Journal(path, group_records, group_ms)
+    start = time.perf_counter()
+    for i in range(records):
+        journal.append(record(i))
+    journal.close()
+    return records / (time.perf_counter() - start)
+
+
+def tracker_rate(records):
+    tracker = codewithoutSQL.Expenses()
+    date = pd.Timestamp("2025-03-01")
+    start = time.perf_counter()
+    for _ in range(records):
+        tracker.add_expense("Food", 12.5, date, "Shop", False)
+    tracker.close()
+    elapsed = time.perf_counter() - start
+    reloaded = codewithoutSQL.Expenses()
+    reloaded.journal.close()
+    return records / elapsed, len(reloaded.store) == records
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        per_record = journal_rate("per_record.journal", min(records, 2000), 1, 0)
+        grouped = journal_rate("grouped.journal", records, codewithoutSQL.GROUP_COMMIT_RECORDS, codewithoutSQL.GROUP_COMMIT_MS)
+        print(f"fsync per record {per_record:12.0f} records/sec")
+        print(f"group commit     {grouped:12.0f} records/sec  ({grouped / per_record:.1f}x)")
+        rate, consistent = tracker_rate(records)
+        print(f"add_expense      {rate:12.0f} records/sec  reload {'consistent' if consistent else 'MISMATCH'}")
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
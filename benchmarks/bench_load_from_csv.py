@@ -0,0 +1,111 @@
+# Expense-Tracker
+# Benchmark: row-by-row CSV import (the old load_from_csv loop) vs the bulk loader.
+#
+# Usage: python benchmarks/bench_load_from_csv.py [rows] [batch_size]
+# Set MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD and MYSQL_DATABASE to include the
+# insert phase; without them only CSV parsing and validation are timed.
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.ingest import EXPENSE_COLUMNS, read_ledger_csv, insert_batches
+
+TABLE_DDL = '''CREATE TABLE IF NOT EXISTS bench_expenses (
+     id INT AUTO_INCREMENT PRIMARY KEY,
+     category VARCHAR(32) NOT NULL,
+     amount DECIMAL(10,2) NOT NULL,
+     date DATE NOT NULL,
+     place VARCHAR(32),
+     autopay BOOLEAN NOT NULL DEFAULT FALSE
+)'''
+
+
+def write_csv(path, rows):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "Category": rng.choice(["Food", "Rent", "Travel", "Bills", "Fun"], rows),
+        "Amount": rng.gamma(2.0, 40.0, rows).round(2),
+        "Date": (np.datetime64('2020-01-01') + rng.integers(0, 5 * 365, rows)).astype(str),
+        "Place of Spending": rng.choice(["Market", "Online", "Mall", "Station"], rows),
+        "Auto-Pay": rng.choice(["True", "False"], rows)
+    })
+    frame.to_csv(path, index=False)
+
+
+def legacy_load(path, cursor=None):
+    with open(path, 'r') as f:
+        for row in csv.DictReader(f):
+            category = row["Category"].strip()
+            amount = float(row["Amount"])
+            date = pd.to_datetime(row["Date"], format='%Y-%m-%d', errors='coerce')
+            if pd.isna(date):
+                continue
+            date = date.strftime('%Y-%m-%d')
+            place = row["Place of Spending"].strip()
+            autopay = row["Auto-Pay"].lower() == 'true'
+            if cursor is not None:
+                cursor.execute(
+                    "INSERT IGNORE INTO bench_expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)",
+                    (category, amount, date, place, autopay)
+                )
+
+
+def bulk_load(path, cursor=None, batch_size=5000):
+    frame, rejected = read_ledger_csv(path, EXPENSE_COLUMNS)
+    if cursor is not None:
+        insert_batches(cursor, "bench_expenses", frame, batch_size)
+    return len(frame), len(rejected)
+
+
+def connect():
+    if not os.environ.get("MYSQL_HOST"):
+        return None
+    import mysql.connector
+    return mysql.connector.connect(
+        host=os.environ["MYSQL_HOST"],
+        user=os.environ.get("MYSQL_USER", ""),
+        password=os.environ.get("MYSQL_PASSWORD", ""),
+        database=os.environ.get("MYSQL_DATABASE", "")
+    )
+
+
+def timed(label, rows, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.2f}s  {rows / elapsed:12.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    connection = connect()
+    cursor = connection.cursor() if connection else None
+    if cursor:
+        cursor.execute(TABLE_DDL)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.csv")
+        write_csv(path, rows)
+        print(f"{rows} rows, batch size {batch_size}, {'MySQL' if cursor else 'parse only'}")
+        legacy = timed("row-by-row", rows, legacy_load, path, cursor)
+        if connection:
+            connection.commit()
+            cursor.execute("TRUNCATE TABLE bench_expenses")
+        bulk = timed("bulk", rows, bulk_load, path, cursor, batch_size)
+        if connection:
+            connection.commit()
+            cursor.execute("DROP TABLE bench_expenses")
+            connection.close()
+    print(f"speedup      {legacy / bulk:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Expense-Tracker
+# Benchmark: streaming PDF export time and peak Python memory by row count.
+#
+# Usage: python benchmarks/bench_pdf_export.py [rows ...]
+# Loads synthetic expenses into the embedded SQLite backend and exports them
+# with Expenses.export_pdf. Peak memory is measured with tracemalloc, so the
+# memory pass runs slower than the timed one.
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from bench_load_from_csv import write_csv
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 200000]
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            write_csv("expenses.csv", rows)
+            pd.DataFrame(columns=["Sender", "Amount", "Date of Receiving"]).to_csv("received.csv", index=False)
+            tracker = codewithsqlimplemented.Expenses()
+            start = time.perf_counter()
+            summaries = tracker.export_pdf("report.pdf")
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            tracker.export_pdf("report.pdf")
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = os.path.getsize("report.pdf")
+            print(f"{summaries[0]['rows']:>8} rows  {elapsed:7.1f}s  {summaries[0]['rows'] / elapsed:8.0f} rows/sec  "
+                  f"peak {peak / 2**20:7.1f} MiB  pdf {size / 2**20:6.1f} MiB")
+            tracker.close()
+            os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
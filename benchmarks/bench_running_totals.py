@@ -0,0 +1,60 @@
+# Expense-Tracker
+# Benchmark: cached running totals vs a full recompute as the ledger grows.
+#
+# Usage: python benchmarks/bench_running_totals.py [max_rows]
+# Each size also checks the cache against a full recompute.
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ledger.store import ColumnStore, EXPENSE_SCHEMA
+
+CATEGORIES = ["Food", "Rent", "Travel", "Bills", "Fun", "Health", "Gifts"]
+PLACES = ["Market", "Online", "Mall", "Station"]
+
+
+def fill(store, rows, rng, chunk=1000000):
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        store.extend({
+            'category': rng.choice(CATEGORIES, n),
+            'amount': rng.gamma(2.0, 40.0, n).round(2),
+            'date': np.datetime64('2015-01-01') + rng.integers(0, 10 * 365, n),
+            'place': rng.choice(PLACES, n),
+            'autopay': rng.random(n) < 0.2
+        })
+
+
+def best_of(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    rng = np.random.default_rng(0)
+    store = ColumnStore(EXPENSE_SCHEMA, capacity=max_rows, group_by='category')
+    print(f"{'rows':>10} {'cached (us)':>12} {'recompute (ms)':>15} {'consistent':>11}")
+    size = 1000
+    while size <= max_rows:
+        fill(store, size - len(store), rng)
+        month = '2020-06'
+        cached = best_of(lambda: (store.running_total(), store.running_total(month=month),
+                                  store.running_total(month=month, key='Food')))
+        full = best_of(lambda: (store.total(), store.total(mask=store.mask(month=month)),
+                                store.total(mask=store.mask(month=month, category='Food'))), repeat=3)
+        consistent = not store.check_totals()
+        print(f"{size:>10} {cached * 1e6:>12.1f} {full * 1e3:>15.2f} {str(consistent):>11}")
+        size *= 10
+
+
+if __name__ == "__main__":
+    main()
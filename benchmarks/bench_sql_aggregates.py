@@ -0,0 +1,65 @@
+# Expense-Tracker
+# Benchmark: chart aggregates computed by the database vs fetched rows aggregated in pandas.
+#
+# Usage: python benchmarks/bench_sql_aggregates.py [rows]
+# Runs against the embedded SQLite backend. "rows" fetches every matching
+# row and aggregates in pandas (the old path); "pushdown" uses
+# Expenses.chart_aggregates, which fetches one row per group, plus the raw
+# amounts only when box or violin plots are requested.
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from bench_load_from_csv import write_csv
+from ledger.charts import chart_data
+
+FILTERS = {
+    "everything": {},
+    "one year": {"date_start": "2021-01-01", "date_end": "2021-12-31"},
+    "mid-month range": {"date_start": "2021-01-15", "date_end": "2021-06-14"},
+    "one month, one category": {"use_monthly": "2022-03-01", "category": "Food"}
+}
+
+
+def timed(func, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        write_csv("expenses.csv", rows)
+        pd.DataFrame(columns=["Sender", "Amount", "Date of Receiving"]).to_csv("received.csv", index=False)
+        tracker = codewithsqlimplemented.Expenses()
+        for charts in (("bar", "line", "heatmap", "pie"), ("box", "violin")):
+            print(f"\ncharts: {', '.join(charts)}")
+            for label, filters in FILTERS.items():
+                key = "category" if filters.get("category") else None
+
+                def fetch_rows():
+                    frame = tracker.filter_data("expenses", filters.get("date_start"), filters.get("date_end"), key,
+                                                filters.get("category"), filters.get("use_monthly"))
+                    return chart_data(frame, charts)
+
+                _, rows_time = timed(fetch_rows)
+                data, pushdown_time = timed(lambda: tracker.chart_aggregates(charts, **filters))
+                print(f"{label:<24} {data['rows']:>8} rows  rows {rows_time * 1000:9.1f} ms  "
+                      f"pushdown {pushdown_time * 1000:9.1f} ms  ({rows_time / pushdown_time:5.1f}x)")
+        tracker.close()
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Expense-Tracker
+# Benchmark: the MySQL CLI's SQL code path on the embedded SQLite backend.
+#
+# Usage: python benchmarks/bench_sqlite_backend.py [rows]
+# Bulk-loads a synthetic expenses.csv through Expenses.load_from_csv, then
+# times indexed filter_data queries and aggregate totals against the in-memory
+# store, and checks that both agree.
+
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from bench_load_from_csv import write_csv
+
+
+def timed(label, func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<28} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        write_csv("expenses.csv", rows)
+        pd.DataFrame(columns=["Sender", "Amount", "Date of Receiving"]).to_csv("received.csv", index=False)
+        tracker = codewithsqlimplemented.Expenses()
+        store = tracker.expense_store
+        month_start, month_end = "2022-06-01", "2022-06-30"
+        sql = timed("SQLite month + category", lambda: tracker.filter_data(
+            "expenses", month_start, month_end, "category", "Food"))
+        memory = timed("in-memory month + category", lambda: store.to_frame(
+            mask=store.mask(date_start=month_start, date_end=month_end, category="Food")))
+        total = timed("SQLite monthly total", lambda: tracker._aggregate_total("monthly_totals", "2022-06", store))
+        expected = store.running_total(month="2022-06")
+        # Identical generated rows are separate entries in SQL as in memory, so these agree.
+        print(f"rows {len(sql)} vs {len(memory)}, total {total:.2f} vs {expected:.2f}")
+        tracker.close()
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
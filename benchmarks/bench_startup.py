@@ -0,0 +1,74 @@
+# Expense-Tracker
+# Benchmark: CLI import time from `python -X importtime`, checked against a budget.
+#
+# Usage: python benchmarks/bench_startup.py [runs] [budget scale]
+# Imports each CLI module in a fresh interpreter several times and reports
+# the median cumulative import time and the slowest top-level imports.
+# Exits with status 1 if a median exceeds its budget (scaled by the optional
+# factor for slower machines) or if a lazily loaded dependency such as
+# pandas or matplotlib is imported at startup.
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+CLI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation")
+
+# Milliseconds. codewithsqlimplemented imports little beyond the standard
+# library (about 10 ms), so pandas (about 200 ms) or mysql.connector (about
+# 25 ms) coming back at startup takes it past its budget even without the
+# LAZY_MODULES check. codewithoutSQL still imports pandas at the top.
+STARTUP_BUDGET_MS = {
+    "codewithsqlimplemented": 30,
+    "codewithoutSQL": 450
+}
+
+GRAPHICS_MODULES = ("matplotlib", "seaborn", "reportlab", "tkinter")
+LAZY_MODULES = {
+    "codewithsqlimplemented": GRAPHICS_MODULES + ("pandas", "numpy", "pyarrow", "mysql.connector"),
+    "codewithoutSQL": GRAPHICS_MODULES
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """Return {top-level import: cumulative microseconds} and the set of loaded modules for one fresh import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; print(' '.join(sys.modules))"],
+        cwd=CLI_DIR, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        # Direct imports of the module sit at depth 1, the module itself at depth 0.
+        if match and len(match.group(3)) <= 3:
+            times[match.group(4)] = int(match.group(2))
+    return times, set(result.stdout.split())
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    failed = False
+    for module, budget in STARTUP_BUDGET_MS.items():
+        profiles = [import_profile(module) for _ in range(runs)]
+        total = statistics.median(times[module] for times, _ in profiles) / 1000
+        limit = budget * scale
+        status = "ok" if total <= limit else "OVER BUDGET"
+        print(f"{module:<24} {total:7.1f} ms  (budget {limit:.0f} ms)  {status}")
+        slowest = sorted(((statistics.median(times.get(name, 0) for times, _ in profiles), name)
+                          for name in profiles[0][0] if name != module), reverse=True)[:5]
+        for micros, name in slowest:
+            print(f"    {name:<20} {micros / 1000:7.1f} ms")
+        eager = sorted(name for name in LAZY_MODULES[module] if name in profiles[0][1])
+        if eager:
+            print(f"    imported at startup but should be lazy: {', '.join(eager)}")
+        failed = failed or total > limit or bool(eager)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Expense-Tracker
+# Benchmark: peak memory of viewing every expense, one fetchall() frame vs streamed chunks.
+#
+# Usage: python benchmarks/bench_streaming.py [rows ...]
+# Runs against the embedded SQLite backend with output sent to /dev/null.
+# "fetchall" is the old filter_data + to_string path; "streamed" is
+# iter_filtered feeding _print_rows, whose peak should stay flat as the
+# number of matching rows grows.
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from bench_load_from_csv import write_csv
+
+COLUMNS = {"date": "Date", "amount": "Amount", "category": "Category", "place": "Place", "autopay": "Auto-Pay"}
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50000, 200000]
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            write_csv("expenses.csv", rows)
+            pd.DataFrame(columns=["Sender", "Amount", "Date of Receiving"]).to_csv("received.csv", index=False)
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+                tracker = codewithsqlimplemented.Expenses()
+
+            def fetchall():
+                df = tracker.filter_data("expenses").rename(columns=COLUMNS)
+                print(df[list(COLUMNS.values())].to_string(index=False))
+
+            def streamed():
+                tracker._print_rows("Filtered Expenses", tracker.iter_filtered("expenses", columns=list(COLUMNS)), COLUMNS)
+
+            for label, func in (("fetchall", fetchall), ("streamed", streamed)):
+                elapsed, peak = measure(func)
+                print(f"{rows:>8} rows  {label:<9} {elapsed:7.2f}s  peak {peak / 2**20:8.1f} MiB")
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+                tracker.close()
+            os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
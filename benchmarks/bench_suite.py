@@ -0,0 +1,245 @@
+# Expense-Tracker
+# Benchmark suite: core operations of all three implementations on synthetic ledgers, written to JSON.
+#
+# Usage: python benchmarks/bench_suite.py [--rows 1000 10000 100000] [--output results.json]
+#                                         [--only csv_cli sql_cli streamlit] [--repeat 3]
+#                                         [--no-limits] [--baseline old.json] [--tolerance 1.25]
+#
+# Each implementation runs in a fresh temporary directory with a ledger from
+# benchmarks/synthetic.py written in its own CSV format. The MySQL CLI runs
+# on its embedded SQLite backend. Console output from the implementations is
+# discarded. Operations an implementation does not have are left out; slow
+# operations are skipped past a row limit unless --no-limits is given, and
+# the JSON records why. With --baseline, every timing is compared against an
+# earlier results file and the script exits with status 1 if any became
+# slower than the tolerance allows.
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "CLI Implementation"))
+sys.path.append(os.path.join(ROOT, "GUI Implementation"))
+from synthetic import synthetic_ledger, write_sql_cli_files, write_csv_cli_file, write_upload_files
+
+# (implementation, operation) -> largest row count run by default. The CSV
+# CLI parses its file row by row, and PDF pages are laid out one by one.
+ROW_LIMITS = {
+    ("csv_cli", "load"): 1000000,
+    ("sql_cli", "save_to_a_pdf"): 100000
+}
+
+# A month, a category and a year that every synthetic ledger covers.
+MONTH = "2020-06"
+CATEGORY = "Food"
+YEAR = ("2020-01-01", "2020-12-31")
+
+# Timings below this are timer and scheduler noise and are never flagged as regressions.
+MIN_COMPARE_SECONDS = 0.005
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def timed(func, repeat, setup=None):
+    """Run func repeat times after setup() each time and return the wall-clock seconds of every run."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def csv_cli_operations(expenses, received):
+    import codewithoutSQL
+    write_csv_cli_file(".", expenses)
+
+    def load():
+        codewithoutSQL.Expenses().close()
+
+    with quiet():
+        tracker = codewithoutSQL.Expenses()
+    yield "load", "Expenses() / load_from_csv", load, None
+    yield "show_total_expenses", "total_expense", tracker.total_expense, None
+    yield "save_to_csv", "compact_csv", tracker.compact_csv, None
+    yield "generate_graphs", "generate_graphs", tracker.generate_graphs, None
+    with quiet():
+        tracker.close()
+
+
+def sql_cli_operations(expenses, received):
+    import codewithsqlimplemented
+    from ledger.chartcache import ChartCache
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    write_sql_cli_files(".", expenses, received)
+
+    def fresh_database():
+        if os.path.exists(codewithsqlimplemented.SQLITE_PATH):
+            os.remove(codewithsqlimplemented.SQLITE_PATH)
+
+    def load():
+        tracker = codewithsqlimplemented.Expenses()
+        # The database is given the CSV rows when it is first connected.
+        with tracker.db.cursor():
+            pass
+        tracker.close()
+
+    yield "load", "Expenses() / load_from_csv", load, fresh_database
+    with quiet():
+        tracker = codewithsqlimplemented.Expenses()
+    caches = iter(range(1000000))
+
+    def fresh_chart_cache():
+        tracker.chart_cache = ChartCache(f"chart_cache_{next(caches)}")
+
+    yield "filter_data", "filter_data month + category", lambda: tracker.filter_data(
+        "expenses", use_monthly=MONTH + "-01", key="category", value=CATEGORY), None
+    yield "filter_data_year", "filter_data one year", lambda: tracker.filter_data(
+        "expenses", date_start=YEAR[0], date_end=YEAR[1]), None
+    yield "show_total_expenses", "show_total_expenses month and all", lambda: (
+        tracker.show_total_expenses(MONTH), tracker.show_total_expenses()), None
+    yield "save_to_csv", "save_to_a_csv", tracker.save_to_a_csv, None
+    yield "save_to_a_pdf", "export_pdf", lambda: tracker.export_pdf("expense_report.pdf"), None
+    yield "generate_graphs", "export_graphs, cold chart cache", tracker.export_graphs, fresh_chart_cache
+    with quiet():
+        tracker.close()
+
+
+def streamlit_operations(expenses, received):
+    with quiet():
+        import app
+    expenses_path, received_path = write_upload_files(".", expenses, received)
+
+    def load():
+        app.Expenses().load_from_csv(expenses_path, received_path)
+
+    tracker = app.Expenses()
+    tracker.load_from_csv(expenses_path, received_path)
+
+    def clear_query_cache():
+        tracker._query_cache.clear()
+
+    yield "load", "load_from_csv", load, None
+    yield "filter_data", "filter_data month + category, uncached", lambda: tracker.filter_data(
+        "expenses", date_start=MONTH + "-01", date_end=MONTH + "-30", key="category", value=CATEGORY), clear_query_cache
+    yield "filter_data_year", "filter_data one year, uncached", lambda: tracker.filter_data(
+        "expenses", date_start=YEAR[0], date_end=YEAR[1]), clear_query_cache
+    yield "show_total_expenses", "show_total_expenses month and all", lambda: (
+        tracker.show_total_expenses(MONTH), tracker.show_total_expenses()), None
+    yield "save_to_csv_by_month", "save_to_csv_by_month", tracker.save_to_csv_by_month, None
+
+
+IMPLEMENTATIONS = {
+    "csv_cli": csv_cli_operations,
+    "sql_cli": sql_cli_operations,
+    "streamlit": streamlit_operations
+}
+
+
+def run(rows, implementations, repeat, limits, seed):
+    expenses, received = synthetic_ledger(rows, seed)
+    results = []
+    for implementation in implementations:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                for operation, method, func, setup in IMPLEMENTATIONS[implementation](expenses, received):
+                    result = {"implementation": implementation, "operation": operation, "method": method, "rows": rows}
+                    limit = limits.get((implementation, operation))
+                    if limit is not None and rows > limit:
+                        result["skipped"] = f"above the default row limit of {limit}"
+                    else:
+                        samples = timed(func, repeat, setup)
+                        result["seconds"] = statistics.median(samples)
+                        result["samples"] = samples
+                        result["rows_per_sec"] = rows / max(result["seconds"], 1e-9)
+                    print(format_result(result))
+                    results.append(result)
+            finally:
+                os.chdir(ROOT)
+    return results
+
+
+def format_result(result):
+    label = f"{result['implementation']:<10} {result['operation']:<22} {result['rows']:>9}"
+    if "skipped" in result:
+        return f"{label}  skipped ({result['skipped']})"
+    return f"{label}  {result['seconds'] * 1000:10.1f} ms  {result['rows_per_sec']:12.0f} rows/sec"
+
+
+def compare(results, baseline_path, tolerance):
+    """Print each timing against the baseline and return the number that regressed past tolerance."""
+    with open(baseline_path) as f:
+        baseline = {(r["implementation"], r["operation"], r["rows"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.2f}x):")
+    for result in results:
+        before = baseline.get((result["implementation"], result["operation"], result["rows"]))
+        if before is None or "seconds" not in before or "seconds" not in result:
+            continue
+        ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        regressed = ratio > tolerance and result["seconds"] >= MIN_COMPARE_SECONDS
+        regressions += regressed
+        print(f"{format_result(result)}  {ratio:5.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark all three implementations on synthetic ledgers.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--only", nargs="+", choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--no-limits", action="store_true")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    limits = {} if args.no_limits else ROW_LIMITS
+    results = []
+    for rows in args.rows:
+        results.extend(run(rows, args.only, args.repeat, limits, args.seed))
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
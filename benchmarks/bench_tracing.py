@@ -0,0 +1,76 @@
+# Expense-Tracker
+# Benchmark: cost of ledger.trace when disabled, enabled, and enabled with peak memory.
+#
+# Usage: python benchmarks/bench_tracing.py [rows] [repeat]
+# Runs a mix of MySQL CLI operations on the embedded SQLite backend with a
+# synthetic ledger: small queries, where per-call overhead shows most, and a
+# full view of every expense. "disabled" should match "baseline", the same
+# run before ledger.trace was ever enabled. The trace file and the
+# Prometheus snapshot of the last enabled run are summarised at the end.
+
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from ledger import trace
+from synthetic import synthetic_ledger, write_sql_cli_files
+
+
+def workload(tracker):
+    for month in ("2020-01", "2020-02", "2020-03", "2020-04"):
+        tracker.show_total_expenses(month)
+        tracker.filter_data("expenses", use_monthly=month + "-01", key="category", value="Food")
+        tracker.aggregate("expenses", ["category"], date_start=month + "-01", date_end=month + "-28")
+    tracker._print_rows("Expenses", tracker.iter_filtered("expenses"), codewithsqlimplemented.CSV_EXPORT_COLUMNS["expenses"])
+
+
+def timed(tracker, repeat):
+    samples = []
+    for _ in range(repeat):
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            start = time.perf_counter()
+            workload(tracker)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        write_sql_cli_files(".", *synthetic_ledger(rows))
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            tracker = codewithsqlimplemented.Expenses()
+        baseline = timed(tracker, repeat)
+        print(f"{'baseline':<18} {baseline * 1000:9.1f} ms")
+        for label, memory in (("enabled", False), ("enabled + memory", True)):
+            trace.reset()
+            trace.enable("trace.jsonl", memory=memory)
+            seconds = timed(tracker, repeat)
+            trace.disable()
+            print(f"{label:<18} {seconds * 1000:9.1f} ms  ({seconds / baseline - 1:+6.1%})")
+        seconds = timed(tracker, repeat)
+        print(f"{'disabled':<18} {seconds * 1000:9.1f} ms  ({seconds / baseline - 1:+6.1%})")
+
+        with open("trace.jsonl") as f:
+            events = [json.loads(line) for line in f]
+        print(f"\n{len(events)} spans traced; slowest operations of the last enabled run:")
+        for name, metric in sorted(trace.metrics().items(), key=lambda item: -item[1]["seconds"])[:6]:
+            print(f"  {name:<32} {metric['count']:>5} calls {metric['seconds'] * 1000:9.1f} ms  "
+                  f"{metric['sql_statements']:>5} SQL  {metric['rows_fetched']:>8} rows  peak {metric['peak_bytes'] / 2**20:6.1f} MiB")
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            tracker.close()
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
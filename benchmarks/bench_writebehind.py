@@ -0,0 +1,110 @@
+# Expense-Tracker
+# Benchmark: interactive entry committing each row vs the write-behind queue, over a slow database link.
+#
+# Usage: python benchmarks/bench_writebehind.py [entries] [latency_ms]
+# Runs on the MySQL CLI's embedded SQLite backend, with latency_ms added to
+# every statement and every commit to stand in for a distant MySQL server.
+# "per-entry commit" inserts and commits each entry before the next prompt,
+# as enter_expenses used to; "write-behind" queues it with WriteBehind.put.
+# "waits" is the time the prompt is held up per entry; "drained" is when the
+# last entry is committed.
+
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI Implementation"))
+import codewithsqlimplemented
+from ledger.writebehind import WriteBehind
+from synthetic import synthetic_expenses
+
+
+class SlowCursor:
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, *args):
+        time.sleep(self._latency)
+        return self._cursor.execute(*args)
+
+    def executemany(self, *args):
+        time.sleep(self._latency)
+        return self._cursor.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SlowPool:
+    def __init__(self, db, latency):
+        self._db = db
+        self._latency = latency
+
+    @contextlib.contextmanager
+    def cursor(self, **kwargs):
+        with self._db.cursor(**kwargs) as cursor:
+            yield SlowCursor(cursor, self._latency)
+        # The commit's round trip.
+        time.sleep(self._latency)
+
+
+def entries(rows):
+    expenses = synthetic_expenses(rows)
+    return [(row.category, row.amount, row.date.strftime('%Y-%m-%d'), row.place, bool(row.autopay))
+            for row in expenses.itertuples(index=False)]
+
+
+def per_entry_commit(db, rows):
+    waits = []
+    for row in rows:
+        start = time.perf_counter()
+        with db.cursor() as cursor:
+            cursor.execute(codewithsqlimplemented.ENTRY_INSERTS["expenses"], row)
+        waits.append(time.perf_counter() - start)
+    return waits
+
+
+def write_behind(db, rows):
+    writer = WriteBehind(db, codewithsqlimplemented.ENTRY_INSERTS, "pending_writes.jsonl",
+                         codewithsqlimplemented.WRITE_BEHIND_RECORDS, codewithsqlimplemented.WRITE_BEHIND_MS)
+    waits = []
+    for row in rows:
+        start = time.perf_counter()
+        writer.put("expenses", row)
+        waits.append(time.perf_counter() - start)
+    writer.close()
+    return waits
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    codewithsqlimplemented.DB_BACKEND = "sqlite"
+    data = entries(rows)
+    print(f"{rows} entries, {latency * 1000:.0f} ms per round trip")
+    for label, func in (("per-entry commit", per_entry_commit), ("write-behind", write_behind)):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+                tracker = codewithsqlimplemented.Expenses()
+                db = SlowPool(tracker.db, latency)
+                start = time.perf_counter()
+                waits = func(db, data)
+                drained = time.perf_counter() - start
+            with tracker.db.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM expenses")
+                stored = cursor.fetchone()[0]
+            with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+                tracker.close()
+            print(f"  {label:<17} waits median {statistics.median(waits) * 1000:7.2f} ms  max {max(waits) * 1000:7.2f} ms  "
+                  f"drained {drained:6.2f} s  {stored} rows stored")
+            os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
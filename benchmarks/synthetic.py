@@ -0,0 +1,139 @@
+# Expense-Tracker
+# Deterministic synthetic ledgers for the benchmarks, in each implementation's CSV format.
+#
+# The same rows and seed always give the same ledger. Categories, places and
+# senders follow skewed, household-like mixes: many small food and transport
+# expenses, a monthly rent on the 1st, bills that are mostly on auto-pay, and
+# a salary that dominates the received side.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+START_DATE = np.datetime64('2015-01-01')
+DAYS = 10 * 365
+
+# category: (share of expenses, median amount, log-normal spread, places, auto-pay share)
+CATEGORIES = {
+    "Food": (0.30, 18.0, 0.6, ["Supermarket", "Cafe", "Restaurant", "Bakery", "Online"], 0.0),
+    "Transport": (0.16, 12.0, 0.7, ["Metro", "Fuel Station", "Taxi", "Parking"], 0.1),
+    "Shopping": (0.12, 45.0, 0.9, ["Mall", "Online", "Market"], 0.0),
+    "Misc": (0.10, 15.0, 1.1, ["Market", "Online", "Kiosk"], 0.0),
+    "Entertainment": (0.09, 30.0, 0.8, ["Streaming", "Cinema", "Concert Hall"], 0.3),
+    "Bills": (0.08, 80.0, 0.5, ["Electric Co", "Telecom", "Internet", "Water Board"], 0.85),
+    "Health": (0.06, 40.0, 1.0, ["Pharmacy", "Gym", "Clinic"], 0.2),
+    "Travel": (0.04, 220.0, 0.9, ["Airline", "Hotel", "Rail"], 0.0),
+    "Education": (0.03, 60.0, 0.8, ["Bookstore", "Online Course"], 0.1),
+    "Rent": (0.02, 1200.0, 0.15, ["Landlord"], 0.9)
+}
+
+# sender: (share of received entries, median amount, log-normal spread)
+SENDERS = {
+    "Employer": (0.45, 3000.0, 0.1),
+    "Freelance": (0.20, 400.0, 0.6),
+    "Family": (0.15, 150.0, 0.5),
+    "Refund": (0.15, 35.0, 0.8),
+    "Interest": (0.05, 8.0, 0.5)
+}
+
+# Categories and senders whose entries land on the 1st of the month.
+MONTHLY = {"Rent", "Employer"}
+
+
+def _dates(rng, n, monthly):
+    dates = START_DATE + rng.integers(0, DAYS, n).astype('timedelta64[D]')
+    if monthly.any():
+        dates[monthly] = dates[monthly].astype('datetime64[M]').astype('datetime64[D]')
+    return dates
+
+
+def _zipf_choice(rng, options, n):
+    """Pick from options with probability falling off as 1/rank, so the first is the most common."""
+    weights = 1.0 / np.arange(1, len(options) + 1)
+    return rng.choice(len(options), n, p=weights / weights.sum())
+
+
+def synthetic_expenses(rows, seed=0):
+    """Return a DataFrame of expenses with the ledger column names, sorted by date."""
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    shares = np.array([CATEGORIES[name][0] for name in names])
+    codes = rng.choice(len(names), rows, p=shares / shares.sum())
+    amount = np.empty(rows)
+    place = np.empty(rows, dtype=object)
+    autopay = np.zeros(rows, dtype=bool)
+    for code, name in enumerate(names):
+        _, median, spread, places, autopay_share = CATEGORIES[name]
+        rows_here = np.flatnonzero(codes == code)
+        amount[rows_here] = np.round(median * rng.lognormal(0.0, spread, len(rows_here)), 2)
+        place[rows_here] = np.asarray(places, dtype=object)[_zipf_choice(rng, places, len(rows_here))]
+        autopay[rows_here] = rng.random(len(rows_here)) < autopay_share
+    category = pd.Categorical.from_codes(codes, categories=names)
+    frame = pd.DataFrame({
+        "category": category,
+        "amount": amount,
+        "date": _dates(rng, rows, np.isin(codes, [names.index(name) for name in MONTHLY if name in names])),
+        "place": pd.Categorical(place),
+        "autopay": autopay
+    })
+    return frame.sort_values("date", kind="stable", ignore_index=True)
+
+
+def synthetic_received(rows, seed=0):
+    """Return a DataFrame of received amounts with the ledger column names, sorted by date."""
+    rng = np.random.default_rng(seed + 1)
+    names = list(SENDERS)
+    shares = np.array([SENDERS[name][0] for name in names])
+    codes = rng.choice(len(names), rows, p=shares / shares.sum())
+    amount = np.empty(rows)
+    for code, name in enumerate(names):
+        _, median, spread = SENDERS[name]
+        rows_here = np.flatnonzero(codes == code)
+        amount[rows_here] = np.round(median * rng.lognormal(0.0, spread, len(rows_here)), 2)
+    frame = pd.DataFrame({
+        "sender": pd.Categorical.from_codes(codes, categories=names),
+        "amount": amount,
+        "date": _dates(rng, rows, np.isin(codes, [names.index(name) for name in MONTHLY if name in names]))
+    })
+    return frame.sort_values("date", kind="stable", ignore_index=True)
+
+
+def synthetic_ledger(rows, seed=0, received_ratio=0.05):
+    """Return (expenses, received): rows expenses and received_ratio as many received entries."""
+    return synthetic_expenses(rows, seed), synthetic_received(max(1, int(rows * received_ratio)), seed)
+
+
+def write_sql_cli_files(directory, expenses, received):
+    """Write expenses.csv and received.csv as the MySQL CLI loads them."""
+    expenses.rename(columns={
+        "category": "Category", "amount": "Amount", "date": "Date", "place": "Place of Spending", "autopay": "Auto-Pay"
+    }).to_csv(os.path.join(directory, "expenses.csv"), index=False, date_format='%Y-%m-%d')
+    received.rename(columns={
+        "sender": "Sender", "amount": "Amount", "date": "Date of Receiving"
+    }).to_csv(os.path.join(directory, "received.csv"), index=False, date_format='%Y-%m-%d')
+
+
+def write_csv_cli_file(directory, expenses):
+    """Write expenses.csv as the CSV CLI loads it: DD-MM-YYYY dates and 0/1 auto-pay flags."""
+    frame = pd.DataFrame({
+        "Date": expenses["date"].dt.strftime('%d-%m-%Y'),
+        "Amount Spent": expenses["amount"],
+        "Category": expenses["category"],
+        "Place": expenses["place"],
+        "Autopay": expenses["autopay"].astype(int)
+    })
+    frame.to_csv(os.path.join(directory, "expenses.csv"), index=False)
+
+
+def write_upload_files(directory, expenses, received):
+    """Write the expense and received files the Streamlit app accepts as uploads; returns their paths."""
+    expenses_path = os.path.join(directory, "upload_expenses.csv")
+    received_path = os.path.join(directory, "upload_received.csv")
+    expenses.rename(columns={
+        "category": "Category", "amount": "Amount", "date": "Date", "place": "Place of Spending", "autopay": "Auto-Pay"
+    }).to_csv(expenses_path, index=False, date_format='%Y-%m-%d')
+    received.rename(columns={
+        "sender": "Sender", "amount": "Amount", "date": "Date"
+    }).to_csv(received_path, index=False, date_format='%Y-%m-%d')
+    return expenses_path, received_path
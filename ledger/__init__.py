@@ -0,0 +1,14 @@
+# Expense-Tracker
+# Shared building blocks for the CLI and Streamlit implementations.
+
+# ColumnStore needs pandas and numpy; it is imported on first access so that
+# importing a pandas-free submodule such as ledger.trace or ledger.db does not
+# import them too.
+_STORE_NAMES = ("ColumnStore", "EXPENSE_SCHEMA", "RECEIVED_SCHEMA")
+
+
+def __getattr__(name):
+    if name in _STORE_NAMES:
+        from . import store
+        return getattr(store, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
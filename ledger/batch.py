@@ -0,0 +1,152 @@
+# Expense-Tracker
+# Non-interactive command mode helpers: records streamed in as CSV or JSON lines, results out as JSON lines.
+
+import datetime
+import decimal
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .ingest import normalize_frame
+
+BATCH_SIZE = 5000
+JSONL_EXTENSIONS = (".jsonl", ".ndjson", ".json")
+# Ledger columns a record may leave out: no place, not on auto-pay.
+OPTIONAL_COLUMNS = ("place", "autopay")
+
+
+def record_format(source, fmt="auto"):
+    """Return "csv" or "jsonl" for a source path; "auto" goes by extension and reads stdin ("-") as CSV."""
+    if fmt != "auto":
+        return fmt
+    return "jsonl" if source != "-" and source.lower().endswith(JSONL_EXTENSIONS) else "csv"
+
+
+def _raw_batches(stream, fmt, batch_size):
+    """Yield (raw frame, [(line, reason)] for lines that are not JSON objects) per batch_size records."""
+    if fmt == "csv":
+        for chunk in pd.read_csv(stream, dtype=str, keep_default_na=False, chunksize=batch_size):
+            yield chunk, []
+        return
+    records, index, bad = [], [], []
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            bad.append((number, "invalid JSON object"))
+            continue
+        records.append(record)
+        # normalize_frame reports index + 2 as the line, which suits CSV's header row.
+        index.append(number - 2)
+        if len(records) >= batch_size:
+            yield pd.DataFrame(records, index=index, dtype=object), bad
+            records, index, bad = [], [], []
+    if records or bad:
+        yield pd.DataFrame(records, index=index, dtype=object), bad
+
+
+def conform_columns(raw, columns):
+    """Rename ledger-name fields in raw to the headers in columns, and add missing optional columns empty."""
+    for name, target in columns.items():
+        if target in raw and target != name:
+            # JSON records in one batch may mix both spellings.
+            raw[name] = raw[name].combine_first(raw[target]) if name in raw else raw[target]
+            raw = raw.drop(columns=target)
+        if target in OPTIONAL_COLUMNS and name not in raw:
+            raw[name] = ""
+    return raw
+
+
+def read_records(sources, columns, fmt="auto", batch_size=BATCH_SIZE, date_format='%Y-%m-%d'):
+    """Yield (source, clean, rejected) for every batch of records in sources, in order.
+
+    sources are paths, or "-" for stdin, read batch_size records at a time
+    so input of any length streams through. Records may use either the CSV
+    headers in columns or the ledger names they map to, and may leave out
+    place and auto-pay. clean and rejected are as from normalize_frame;
+    rejected line numbers count from the start of each source. Raises
+    ValueError if a source lacks a required column.
+    """
+    for source in sources:
+        kind = record_format(source, fmt)
+        stream = sys.stdin if source == "-" else open(source, newline="" if kind == "csv" else None)
+        try:
+            for raw, bad in _raw_batches(stream, kind, batch_size):
+                raw = conform_columns(raw, columns)
+                if len(raw):
+                    try:
+                        clean, rejected = normalize_frame(raw, columns, date_format)
+                    except ValueError as e:
+                        raise ValueError(f"{source}: {e}")
+                else:
+                    clean = pd.DataFrame(columns=list(columns.values()))
+                    rejected = pd.DataFrame(columns=["line", "reason"])
+                if bad:
+                    unparsed = pd.DataFrame(bad, columns=["line", "reason"])
+                    rejected = unparsed if rejected.empty else pd.concat([rejected, unparsed]).sort_values("line", ignore_index=True)
+                yield source, clean, rejected
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def emit(record, out):
+    """Write one result as a JSON line and flush it, so a reading script sees it at once."""
+    out.write(json.dumps(record, default=_json_default) + "\n")
+    out.flush()
+
+
+def rejected_records(source, rejected):
+    """Yield one JSON-ready dict per rejected row: where it came from, why, and its original fields."""
+    fields = [name for name in rejected.columns if name not in ("line", "reason")]
+    for row in rejected.to_dict(orient="records"):
+        yield {
+            "rejected": source,
+            "line": int(row["line"]),
+            "reason": row["reason"],
+            "record": {name: row[name] for name in fields if not pd.isna(row[name])}
+        }
+
+
+def write_frame(frame, out, fmt):
+    """Write a frame's rows to an open text stream as headerless CSV or as JSON lines."""
+    if fmt == "csv":
+        frame.to_csv(out, index=False, header=False, date_format='%Y-%m-%d')
+    else:
+        for record in frame.to_dict(orient="records"):
+            out.write(json.dumps(record, default=_json_default) + "\n")
+
+
+@contextmanager
+def open_output(path, stdout):
+    """Yield stdout for no path or "-", else a file that only replaces path once the block completes."""
+    if path in (None, "-"):
+        yield stdout
+        stdout.flush()
+        return
+    temp = path + ".tmp"
+    try:
+        with open(temp, "w", newline="") as f:
+            yield f
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
@@ -0,0 +1,107 @@
+# Expense-Tracker
+# On-disk PNG cache for charts, addressed by what they show and bounded in size.
+
+import hashlib
+import json
+import os
+import tempfile
+
+from .trace import instrument
+
+
+@instrument
+class ChartCache:
+    """Directory of rendered charts named by a hash of (chart, parameters, ledger version).
+
+    A hit serves the PNG already on disk. A miss renders into a temporary
+    file in the same directory, which is renamed into place, so a crash
+    never leaves a half-written chart behind. Every hit touches the file,
+    and once the directory grows past max_bytes the least recently used
+    charts are deleted.
+    """
+
+    def __init__(self, root, max_bytes=64 * 2**20):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, chart, params, version=None):
+        """Return the file name for a chart of this kind, these parameters and this ledger version."""
+        blob = json.dumps([chart, params, version], sort_keys=True, default=str)
+        return f"{chart}_{hashlib.sha256(blob.encode()).hexdigest()[:24]}.png"
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Return the cached chart's path and mark it recently used, or None on a miss."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def temp_path(self):
+        """Return a fresh hidden .png path in the cache directory to render into."""
+        fd, path = tempfile.mkstemp(prefix=".", suffix=".png", dir=self.root)
+        os.close(fd)
+        return path
+
+    def commit(self, key, temp_path):
+        """Move a rendered temporary file into place under key, evict, and return its path."""
+        path = self.path(key)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def discard(self, temp_path):
+        """Remove a temporary file whose render failed."""
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+
+    def get_or_render(self, chart, params, version, render):
+        """Return (path, hit) for a chart, calling render(path) to draw it on a miss."""
+        key = self.key(chart, params, version)
+        path = self.get(key)
+        if path is not None:
+            return path, True
+        temp = self.temp_path()
+        try:
+            render(temp)
+        except BaseException:
+            self.discard(temp)
+            raise
+        return self.commit(key, temp), False
+
+    def evict(self, keep=None):
+        """Delete least recently used charts until the directory fits max_bytes; returns how many went."""
+        entries = []
+        total = 0
+        with os.scandir(self.root) as scan:
+            for entry in scan:
+                # Hidden files are renders still in progress.
+                if entry.name.startswith(".") or not entry.name.endswith(".png"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, entry.path, stat.st_size))
+                total += stat.st_size
+        removed = 0
+        for _, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
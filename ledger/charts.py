@@ -0,0 +1,206 @@
+# Expense-Tracker
+# Expense charts: shared aggregates computed once, figures rendered in parallel worker processes.
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from .trace import traced
+
+CHART_NAMES = ("bar", "box", "line", "violin", "heatmap", "pie")
+
+# chart -> (label printed when saved, output file prefix, aggregate it draws from)
+CHARTS = {
+    "bar": ("Bar chart", "spending_by_category_filtered", "totals"),
+    "box": ("Box plot", "expense_distribution_by_category", "distribution"),
+    "line": ("Line plot", "spending_over_time", "daily"),
+    "violin": ("Violin plot", "expense_violin_by_category", "distribution"),
+    "heatmap": ("Heatmap", "spending_heatmap", "pivot"),
+    "pie": ("Pie chart", "category_distribution_filtered", "totals")
+}
+
+
+@traced("charts.chart_data")
+def chart_data(frame, charts=CHART_NAMES):
+    """Compute the aggregates the requested charts draw from, each exactly once.
+
+    frame needs 'amount' and 'category' columns, and 'date' for the line and
+    heatmap charts. Returns a dict with
+    'rows' (the row count), 'totals' (sum per category), 'daily' (sum per
+    date), 'pivot' (month by category sums) and 'distribution' (categories,
+    row counts and the amounts ordered by category), limited to what the
+    charts need. Only 'distribution' grows with the number of rows.
+    """
+    needed = {CHARTS[name][2] for name in charts}
+    amounts = frame["amount"].to_numpy(dtype=float)
+    codes, categories = pd.factorize(frame["category"].astype(str), sort=True)
+    categories = list(categories)
+    data = {"rows": len(frame)}
+    if "totals" in needed:
+        data["totals"] = pd.Series(np.bincount(codes, weights=amounts, minlength=len(categories)), index=categories)
+    if "distribution" in needed:
+        order = np.argsort(codes, kind="stable")
+        data["distribution"] = (categories, np.bincount(codes, minlength=len(categories)), amounts[order])
+    if "daily" in needed or "pivot" in needed:
+        dates = pd.to_datetime(frame["date"]).to_numpy(dtype='datetime64[D]')
+        if "daily" in needed:
+            data["daily"] = pd.Series(amounts).groupby(dates).sum()
+        if "pivot" in needed:
+            months = np.datetime_as_string(dates.astype('datetime64[M]'), unit='M')
+            pivot = pd.Series(amounts).groupby([months, np.asarray(categories, dtype=object)[codes]]).sum()
+            data["pivot"] = pivot.unstack(fill_value=0)
+    return data
+
+
+def _distribution_frame(distribution):
+    categories, counts, amounts = distribution
+    return pd.DataFrame({"category": np.repeat(categories, counts), "amount": amounts})
+
+
+def _draw_bar(totals, span):
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=totals.index, y=totals.values, hue=totals.index, palette='viridis', legend=False)
+    plt.title(f"Spending by Category ({span})")
+    plt.xlabel("Category")
+    plt.ylabel("Total Amount ($)")
+    plt.xticks(rotation=45)
+
+
+def _draw_box(distribution, span):
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(x='category', y='amount', hue='category', data=_distribution_frame(distribution), palette='pastel', legend=False)
+    plt.title(f"Expense Distribution by Category ({span})")
+    plt.xlabel("Category")
+    plt.ylabel("Amount ($)")
+    plt.xticks(rotation=45)
+
+
+def _draw_line(daily, span):
+    plt.figure(figsize=(12, 6))
+    sns.lineplot(x=daily.index, y=daily.values, marker='o', color='teal')
+    plt.title(f"Spending Over Time ({span})")
+    plt.xlabel("Date")
+    plt.ylabel("Total Amount ($)")
+    plt.xticks(rotation=45)
+
+
+def _draw_violin(distribution, span):
+    plt.figure(figsize=(10, 6))
+    sns.violinplot(x='category', y='amount', hue='category', data=_distribution_frame(distribution), palette='muted', inner='quartile', legend=False)
+    plt.title(f"Expense Distribution by Category (Violin) ({span})")
+    plt.xlabel("Category")
+    plt.ylabel("Amount ($)")
+    plt.xticks(rotation=45)
+
+
+def _draw_heatmap(pivot, span):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(pivot, annot=True, fmt='.2f', cmap='YlGnBu', cbar_kws={'label': 'Total Amount ($)'})
+    plt.title(f"Spending Heatmap by Category and Month ({span})")
+    plt.xlabel("Category")
+    plt.ylabel("Month")
+
+
+def _draw_pie(totals, span):
+    plt.figure(figsize=(8, 8))
+    totals.plot(kind='pie', autopct='%1.1f%%', startangle=90, colors=sns.color_palette('Set2'))
+    plt.title(f"Spending Distribution by Category ({span})")
+    plt.ylabel("")
+
+
+_DRAW = {
+    "bar": _draw_bar,
+    "box": _draw_box,
+    "line": _draw_line,
+    "violin": _draw_violin,
+    "heatmap": _draw_heatmap,
+    "pie": _draw_pie
+}
+
+
+def _render(name, aggregate, span, path):
+    """Draw one chart and save it; runs in a worker process, so errors come back as text."""
+    start = time.perf_counter()
+    try:
+        _DRAW[name](aggregate, span)
+        plt.tight_layout()
+        plt.savefig(path)
+        error = None
+    except Exception as e:
+        path, error = None, str(e)
+    finally:
+        plt.close('all')
+    return {"chart": name, "path": path, "seconds": time.perf_counter() - start, "error": error}
+
+
+@traced("charts.render_charts")
+def render_charts(source, out_dir="", suffix="", span="Start to End", charts=CHART_NAMES, workers=None, min_parallel_rows=0, cache=None, cache_key=None):
+    """Render expense charts to PNG files and return one result dict per chart, in charts order.
+
+    Aggregates are computed once in this process and only the one each chart
+    draws from is sent to its worker. workers defaults to one process per
+    chart up to the CPU count; with a single worker, or fewer rows than
+    min_parallel_rows, everything is drawn in-process. Each result holds the chart name, the saved path (None on
+    failure), the seconds spent drawing it, the error message if any and
+    whether it came from the cache.
+
+    source is a DataFrame of rows, or a callable that takes the charts
+    still to draw and returns their aggregates as chart_data would (None
+    when no rows match), so a caller can compute them elsewhere, such as in
+    the database, and only when a chart is missing from the cache.
+
+    With a ChartCache, charts already cached under cache_key (the filter and
+    ledger version) are served from disk and new ones are saved into the
+    cache instead of out_dir. Returns [] when there is nothing to draw.
+    """
+    results = {}
+    jobs = []
+    for name in charts:
+        if cache is None:
+            key, path = None, os.path.join(out_dir, f"{CHARTS[name][1]}{'_' + suffix if suffix else ''}.png")
+        else:
+            key = cache.key(name, cache_key)
+            path = cache.get(key)
+            if path is not None:
+                results[name] = {"chart": name, "path": path, "seconds": 0.0, "error": None, "cached": True}
+                continue
+            path = cache.temp_path()
+        jobs.append((name, key, path))
+    if jobs:
+        names = [name for name, _, _ in jobs]
+        if callable(source):
+            data = source(names)
+        else:
+            data = chart_data(source, names) if not source.empty else None
+        if data is None:
+            for _, key, path in jobs:
+                if key is not None:
+                    cache.discard(path)
+            return []
+        work = [(name, data[CHARTS[name][2]], span, path) for name, _, path in jobs]
+        workers = min(workers or os.cpu_count() or 1, len(work))
+        if workers <= 1 or data.get("rows", min_parallel_rows) < min_parallel_rows:
+            rendered = [_render(*job) for job in work]
+        else:
+            # Spawned, not forked: a fork copies locks held by the caller's other
+            # threads (the write-behind writer, Streamlit's) and can deadlock.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_render, *job) for job in work]
+                rendered = [future.result() for future in futures]
+        for result, (name, key, path) in zip(rendered, jobs):
+            if key is not None:
+                if result["error"]:
+                    cache.discard(path)
+                else:
+                    result["path"] = cache.commit(key, path)
+            result["cached"] = False
+            results[name] = result
+    return [results[name] for name in charts]
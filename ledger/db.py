@@ -0,0 +1,202 @@
+# Expense-Tracker
+# Lazily created, pooled MySQL connections with retry, backoff and health checks.
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from .trace import traced_cursor
+
+
+def _connector():
+    """Import mysql.connector on first use, so startup does not pay for it."""
+    import mysql.connector
+    import mysql.connector.pooling
+    return mysql.connector
+
+
+def db_errors():
+    """Return the errors either database backend (this pool or ledger.sqlite.SQLitePool) can raise.
+
+    Meant for except clauses, which only evaluate it once an exception is
+    being matched, so a session that never fails never imports mysql.connector.
+    """
+    return (_connector().Error, sqlite3.Error)
+
+
+class ConnectionPool:
+    """Hand out pooled MySQL connections, creating the pool on first use.
+
+    Creating the pool is retried with exponential backoff. If every attempt
+    fails the pool stays offline for offline_for seconds before the next
+    operation tries again, so callers can fall back to in-memory data without
+    paying the retry cost on every call.
+    """
+
+    dialect = "mysql"
+
+    def __init__(self, config, pool_size=4, retries=3, backoff=0.5, offline_for=30.0, checkout_timeout=10.0, on_connect=None):
+        self.config = dict(config)
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.offline_for = offline_for
+        self.checkout_timeout = checkout_timeout
+        self.on_connect = on_connect
+        self._pool = None
+        self._offline_until = 0.0
+        self._lock = threading.Lock()
+
+    def _create_pool(self):
+        sql = _connector()
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            try:
+                pool = sql.pooling.MySQLConnectionPool(
+                    pool_name=f"expenses_{id(self)}",
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    **self.config
+                )
+                if self.on_connect:
+                    connection = pool.get_connection()
+                    try:
+                        self.on_connect(connection)
+                    finally:
+                        connection.close()
+                return pool
+            except sql.Error as e:
+                print(f"Database connection failed: {e}. Retries left: {self.retries - attempt}")
+                if attempt < self.retries:
+                    time.sleep(delay)
+                    delay *= 2
+        print(f"Database unreachable; not retrying for the next {self.offline_for:.0f}s.")
+        return None
+
+    def available(self):
+        """Return True when a pool exists or could be created now; never raises."""
+        if self._pool is not None:
+            return True
+        if time.monotonic() < self._offline_until:
+            return False
+        with self._lock:
+            if self._pool is None and time.monotonic() >= self._offline_until:
+                self._pool = self._create_pool()
+                if self._pool is None:
+                    self._offline_until = time.monotonic() + self.offline_for
+        return self._pool is not None
+
+    def _mark_offline(self):
+        with self._lock:
+            self._pool = None
+            self._offline_until = time.monotonic() + self.offline_for
+
+    def _checkout(self):
+        sql = _connector()
+        deadline = time.monotonic() + self.checkout_timeout
+        delay = 0.01
+        while True:
+            try:
+                connection = self._pool.get_connection()
+                break
+            except sql.PoolError:
+                # Every pooled connection is in use; wait for one to be returned.
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        try:
+            # Health check; reconnects a connection the server has dropped.
+            connection.ping(reconnect=True, attempts=self.retries, delay=1)
+        except sql.Error:
+            connection.close()
+            self._mark_offline()
+            raise
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool for the duration of a with-block."""
+        if not self.available():
+            raise _connector().InterfaceError("Database unavailable.")
+        connection = self._checkout()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """Yield a fresh cursor on a pooled connection; commits on success and rolls back on error."""
+        with self.connection() as connection:
+            cursor = connection.cursor(**kwargs)
+            try:
+                yield traced_cursor(cursor)
+                connection.commit()
+            except BaseException:
+                try:
+                    connection.rollback()
+                except _connector().Error:
+                    pass
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        """Close every idle pooled connection."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool._remove_connections()
+            self._pool = None
+
+
+class FallbackPool:
+    """Use primary while it can be reached and a fallback pool otherwise, choosing per operation.
+
+    Nothing connects until the first operation, and open_fallback() creates
+    the fallback only when primary is first found unreachable. A session
+    that starts while MySQL is down goes back to it once it can be reached
+    again; dialect names whichever pool the next operation would use.
+    """
+
+    def __init__(self, primary, open_fallback):
+        self.primary = primary
+        self.open_fallback = open_fallback
+        self._fallback = None
+        self._lock = threading.Lock()
+
+    def _active(self):
+        if self.primary.available():
+            return self.primary
+        with self._lock:
+            if self._fallback is None:
+                self._fallback = self.open_fallback()
+        return self._fallback
+
+    @property
+    def dialect(self):
+        return self._active().dialect
+
+    def available(self):
+        """Return True when primary or the fallback can be used."""
+        return self._active().available()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection from whichever pool is usable now."""
+        with self._active().connection() as connection:
+            yield connection
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """Yield a cursor from whichever pool is usable now; commits on success and rolls back on error."""
+        with self._active().cursor(**kwargs) as cursor:
+            yield cursor
+
+    def close(self):
+        """Close both pools."""
+        self.primary.close()
+        with self._lock:
+            if self._fallback is not None:
+                self._fallback.close()
@@ -0,0 +1,164 @@
+# Expense-Tracker
+# Resumable, bounded-memory import of large ledger CSV files.
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from .ingest import normalize_frame
+from .trace import traced
+
+MEMORY_LIMIT = 64 * 2**20
+# Bytes of working memory per byte of CSV in a chunk: the raw bytes, the
+# frame of strings, normalize_frame's typed copy and the rows sent to the
+# database. Measured at up to 12 for ledger files; the rest is headroom.
+PARSE_EXPANSION = 16
+MIN_CHUNK_BYTES = 64 * 2**10
+
+
+def chunk_bytes(memory_limit=MEMORY_LIMIT):
+    """Return how many bytes of CSV to read per chunk to stay within memory_limit."""
+    return max(MIN_CHUNK_BYTES, memory_limit // PARSE_EXPANSION)
+
+
+def iter_csv_chunks(source, columns, date_format='%Y-%m-%d', size=None, offset=0, line=1, prepare=None, normalize=normalize_frame):
+    """Yield (clean, rejected, offset, line) for each chunk of about size bytes of a ledger CSV.
+
+    source is a path or a seekable binary file. Chunks end on a line
+    boundary, so fields must not contain newlines. offset is the byte
+    position just past the chunk and line the number of lines read so far,
+    counting the header; passing both back in resumes after that chunk.
+    clean and rejected are as from normalize_frame, with rejected line
+    numbers counted from the top of the file. prepare, if given, is applied
+    to each chunk's frame of strings before normalize, which has
+    normalize_frame's signature and results.
+    """
+    size = size or chunk_bytes()
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        f.seek(0)
+        header = f.readline()
+        if offset:
+            f.seek(offset)
+        else:
+            offset = f.tell()
+        while True:
+            data = f.read(size)
+            if not data:
+                break
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            raw = pd.read_csv(io.BytesIO(header + data), dtype=str, keep_default_na=False)
+            # normalize_frame reports index + 2 as a row's line number.
+            raw.index = raw.index + (line - 1)
+            if prepare is not None:
+                raw = prepare(raw)
+            clean, rejected = normalize(raw, columns, date_format)
+            offset += len(data)
+            line += data.count(b"\n") + (not data.endswith(b"\n"))
+            yield clean, rejected, offset, line
+    finally:
+        if f is not source:
+            f.close()
+
+
+def _identity(path):
+    """Size, modification time and a hash of the first 64 KiB: enough to notice a replaced file."""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        head = hashlib.sha1(f.read(64 * 2**10)).hexdigest()
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "head": head}
+
+
+class ImportCheckpoint:
+    """Progress of importing one file into one table, kept as a small JSON file in directory.
+
+    The saved position is always just past a chunk that has been written, so
+    a resumed import skips no rows; it repeats at most the chunk being
+    written when it was interrupted. If the file has changed since the
+    checkpoint was saved, the import starts over.
+    """
+
+    def __init__(self, directory, source, table):
+        self.directory = directory
+        key = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{table}-{key}.json")
+        self.identity = _identity(source)
+        self.offset = 0
+        self.line = 1
+        self.rows = 0
+        self.rejected = 0
+        self.complete = False
+        self.stale = False
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("identity") != self.identity:
+            self.stale = True
+            return
+        self.offset = state["offset"]
+        self.line = state["line"]
+        self.rows = state["rows"]
+        self.rejected = state["rejected"]
+        self.complete = state["complete"]
+
+    def save(self, offset, line, rows, rejected, complete=False):
+        """Record progress atomically."""
+        self.offset, self.line, self.rows, self.rejected, self.complete = offset, line, rows, rejected, complete
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".checkpoint-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"identity": self.identity, "offset": offset, "line": line, "rows": rows,
+                           "rejected": rejected, "complete": complete}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def clear(self):
+        """Forget all progress, so the next import reads the file from the start."""
+        self.offset, self.line, self.rows, self.rejected, self.complete = 0, 1, 0, 0, False
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@traced("importer.import_csv")
+def import_csv(source, columns, write, date_format='%Y-%m-%d', memory_limit=MEMORY_LIMIT, checkpoint=None, on_rejected=None,
+               prepare=None, normalize=normalize_frame):
+    """Stream a ledger CSV through normalize_frame into write(clean), one chunk at a time.
+
+    Working memory stays near memory_limit whatever the file size. write
+    must have stored a chunk durably when it returns. With a checkpoint,
+    progress is saved after every chunk and the import continues from the
+    last saved chunk; a file already imported completely is skipped.
+    on_rejected(rejected) is called with each chunk's invalid rows; prepare
+    and normalize are passed on to iter_csv_chunks. Returns
+    {"rows", "rejected", "resumed_at_line", "already_imported"} for this
+    call; the checkpoint keeps the totals over every call.
+    """
+    offset, line, rows, rejected_rows = 0, 1, 0, 0
+    if checkpoint is not None:
+        if checkpoint.complete:
+            return {"rows": 0, "rejected": 0, "resumed_at_line": None, "already_imported": True}
+        offset, line = checkpoint.offset, checkpoint.line
+    resumed_at_line = line + 1 if offset else None
+    for clean, rejected, offset, line in iter_csv_chunks(source, columns, date_format, chunk_bytes(memory_limit), offset, line, prepare, normalize):
+        write(clean)
+        rows += len(clean)
+        rejected_rows += len(rejected)
+        if on_rejected is not None and not rejected.empty:
+            on_rejected(rejected)
+        if checkpoint is not None:
+            checkpoint.save(offset, line, checkpoint.rows + len(clean), checkpoint.rejected + len(rejected))
+    if checkpoint is not None:
+        checkpoint.save(checkpoint.offset, checkpoint.line, checkpoint.rows, checkpoint.rejected, complete=True)
+    return {"rows": rows, "rejected": rejected_rows, "resumed_at_line": resumed_at_line, "already_imported": False}
@@ -0,0 +1,100 @@
+# Expense-Tracker
+# Vectorized parsing and batched database inserts for ledger CSV files.
+
+import numpy as np
+import pandas as pd
+
+from .trace import traced
+
+EXPENSE_COLUMNS = {
+    "Category": "category",
+    "Amount": "amount",
+    "Date": "date",
+    "Place of Spending": "place",
+    "Auto-Pay": "autopay"
+}
+
+RECEIVED_COLUMNS = {
+    "Sender": "sender",
+    "Amount": "amount",
+    "Date of Receiving": "date"
+}
+
+_TRUE = {"true", "1", "yes", "1.0"}
+_FALSE = {"false", "0", "no", "0.0", "", "nan", "none"}
+
+
+@traced("ingest.normalize_frame")
+def normalize_frame(raw, columns, date_format='%Y-%m-%d'):
+    """Validate and coerce a raw CSV frame column-wise.
+
+    Returns (clean, rejected): clean uses the ledger column names with typed
+    values, rejected keeps the original row plus its 1-based CSV line number
+    and a 'reason' column.
+    """
+    missing = set(columns) - set(raw.columns)
+    if missing:
+        raise ValueError(f"missing required columns: {missing}")
+    clean = pd.DataFrame(index=raw.index)
+    reason = np.full(len(raw), None, dtype=object)
+    for source, target in columns.items():
+        values = raw[source]
+        if target == "amount":
+            amount = pd.to_numeric(values, errors='coerce')
+            reason = np.where(pd.isna(reason) & amount.isna().values, "invalid amount", reason)
+            reason = np.where(pd.isna(reason) & (amount < 0).values, "negative amount", reason)
+            clean[target] = amount.astype(float)
+        elif target == "date":
+            dates = pd.to_datetime(values, format=date_format, errors='coerce')
+            reason = np.where(pd.isna(reason) & dates.isna().values, "invalid date", reason)
+            clean[target] = dates.values.astype('datetime64[s]')
+        elif target == "autopay":
+            flags = values.astype(str).str.strip().str.lower()
+            valid = flags.isin(_TRUE | _FALSE)
+            reason = np.where(pd.isna(reason) & ~valid.values, "invalid auto-pay flag", reason)
+            clean[target] = flags.isin(_TRUE)
+        else:
+            text = values.fillna("").astype(str).str.strip()
+            if target in ("category", "sender"):
+                reason = np.where(pd.isna(reason) & (text == "").values, f"empty {target}", reason)
+            clean[target] = text
+    bad = ~pd.isna(reason)
+    rejected = raw[bad].copy()
+    rejected.insert(0, "line", rejected.index + 2)
+    rejected["reason"] = reason[bad]
+    return clean[~bad].reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+@traced("ingest.read_ledger_csv")
+def read_ledger_csv(path, columns, date_format='%Y-%m-%d'):
+    """Read a ledger CSV as strings and normalise it in one vectorized pass."""
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return normalize_frame(raw, columns, date_format)
+
+
+def frame_to_rows(frame):
+    """Convert a normalised frame into plain Python tuples for a DB-API driver."""
+    data = []
+    for name in frame.columns:
+        values = frame[name]
+        if name == "date":
+            data.append(values.dt.strftime('%Y-%m-%d').tolist())
+        else:
+            data.append(values.tolist())
+    return list(zip(*data))
+
+
+def insert_batches(cursor, table, frame, batch_size=5000, ignore=True, placeholder="%s"):
+    """Insert a normalised frame with one executemany call per batch; returns rows sent."""
+    if frame.empty:
+        return 0
+    columns = ", ".join(frame.columns)
+    values = ", ".join([placeholder] * len(frame.columns))
+    verb = "INSERT IGNORE" if ignore else "INSERT"
+    query = f"{verb} INTO {table} ({columns}) VALUES ({values})"
+    sent = 0
+    for start in range(0, len(frame), batch_size):
+        rows = frame_to_rows(frame.iloc[start:start + batch_size])
+        cursor.executemany(query, rows)
+        sent += len(rows)
+    return sent
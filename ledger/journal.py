@@ -0,0 +1,108 @@
+# Expense-Tracker
+# Write-ahead journal with group commit for the CSV-backed tracker.
+
+import json
+import os
+import threading
+import time
+
+
+class Journal:
+    """Append-only JSON-lines log of new rows.
+
+    Records are handed to the OS as they are written, so a crashed process
+    loses nothing, but they are fsynced in groups: once group_records records
+    are pending or group_ms milliseconds have passed, whichever comes first. A
+    background thread commits stragglers, so a power loss costs at most one
+    group. rotate() hands the current segment to a checkpoint, which calls
+    discard_rotated() once its rows are safely in the main file.
+    """
+
+    def __init__(self, path, group_records=64, group_ms=200):
+        self.path = path
+        self.rotated_path = path + ".old"
+        self.group_records = group_records
+        self.group_ms = group_ms
+        self.records = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    @staticmethod
+    def replay(path):
+        """Yield committed records from the rotated and current segments, oldest first.
+
+        Reading a segment stops at the first torn or corrupt line, which can
+        only be the tail of a write that never finished.
+        """
+        for segment in (path + ".old", path):
+            try:
+                with open(segment, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            break
+            except FileNotFoundError:
+                continue
+
+    def append(self, record):
+        """Write one record; fsyncs when the current group is full or old enough."""
+        with self._lock:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._file.flush()
+            self._pending += 1
+            self.records += 1
+            if self._pending >= self.group_records or (time.monotonic() - self._last_commit) * 1000 >= self.group_ms:
+                self._commit()
+
+    def commit(self):
+        """Force pending records to disk."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.group_ms / 1000):
+            self.commit()
+
+    def rotate(self):
+        """Move the current segment aside for a checkpoint and start a new one."""
+        with self._lock:
+            self._commit()
+            self._file.close()
+            if os.path.exists(self.rotated_path):
+                # An earlier checkpoint never finished; keep its records in front.
+                with open(self.rotated_path, "a", encoding="utf-8") as old, open(self.path, "r", encoding="utf-8") as new:
+                    old.write(new.read())
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.records = 0
+
+    def discard_rotated(self):
+        """Delete the rotated segment once a checkpoint has persisted its rows."""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """Stop the background flusher and commit anything pending."""
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._commit()
+            self._file.close()
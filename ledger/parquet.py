@@ -0,0 +1,126 @@
+# Expense-Tracker
+# Month-partitioned Parquet storage with partition pruning and row-group pushdown.
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+_PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+
+def months_between(date_start, date_end):
+    """Return every YYYY-MM month from date_start to date_end inclusive."""
+    first = np.datetime64(pd.Timestamp(date_start), 'M')
+    last = np.datetime64(pd.Timestamp(date_end), 'M')
+    return [str(month) for month in np.arange(first, last + 1)]
+
+
+class PartitionedParquet:
+    """One Parquet dataset per table under root, split into month=YYYY-MM directories.
+
+    Rows are sorted by (month, sort key, date) before writing, so each file's
+    row-group min/max statistics on the key and on date are tight. Reads turn
+    date ranges into the list of matching month directories and push every
+    other predicate down to row-group statistics. String columns are stored
+    dictionary-encoded and come back as Categoricals, dates as timestamps, so
+    nothing is parsed from text.
+    """
+
+    def __init__(self, root, row_group_size=65536):
+        self.root = root
+        self.row_group_size = row_group_size
+
+    def _path(self, table):
+        return os.path.join(self.root, table)
+
+    def write(self, table, frame, sort_key=None):
+        """Write a frame with a 'date' column, replacing the month partitions it covers."""
+        if frame.empty:
+            return 0
+        frame = frame.assign(month=np.datetime_as_string(
+            frame["date"].values.astype('datetime64[M]'), unit='M'))
+        for name in frame.columns:
+            if frame[name].dtype == object:
+                frame[name] = frame[name].astype("category")
+        frame = frame.sort_values(["month"] + ([sort_key] if sort_key else []) + ["date"], kind="stable")
+        ds.write_dataset(
+            pa.Table.from_pandas(frame, preserve_index=False),
+            self._path(table),
+            format="parquet",
+            partitioning=_PARTITIONING,
+            existing_data_behavior="delete_matching",
+            basename_template="part-{i}.parquet",
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, 1024),
+            max_partitions=100000
+        )
+        return len(frame)
+
+    def months(self, table):
+        """Return the months stored for a table, oldest first."""
+        try:
+            entries = os.listdir(self._path(table))
+        except FileNotFoundError:
+            return []
+        return sorted(entry.split("=", 1)[1] for entry in entries if entry.startswith("month="))
+
+    def fingerprint(self, table):
+        """Return a digest of the table's files, sizes and modification times."""
+        stats = []
+        for directory, _, names in os.walk(self._path(table)):
+            for name in names:
+                stat = os.stat(os.path.join(directory, name))
+                stats.append((os.path.relpath(os.path.join(directory, name), self.root), stat.st_size, stat.st_mtime_ns))
+        return hashlib.sha1(repr(sorted(stats)).encode()).hexdigest()
+
+    def _filter(self, table, date_start=None, date_end=None, month=None, **equals):
+        months = None
+        if month is not None:
+            months = [month]
+        elif date_start is not None or date_end is not None:
+            stored = self.months(table)
+            if not stored:
+                return None, []
+            months = months_between(date_start or stored[0] + "-01", date_end or stored[-1] + "-01")
+        expression = None
+        conditions = []
+        if months is not None:
+            conditions.append(ds.field("month").isin(months))
+        if date_start is not None:
+            conditions.append(ds.field("date") >= pd.Timestamp(date_start))
+        if date_end is not None:
+            conditions.append(ds.field("date") <= pd.Timestamp(date_end))
+        for name, value in equals.items():
+            if value is not None:
+                conditions.append(ds.field(name) == value)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression, months
+
+    def files(self, table, date_start=None, date_end=None, month=None, **equals):
+        """Return the files a read with these filters would open."""
+        if not os.path.isdir(self._path(table)):
+            return []
+        expression, months = self._filter(table, date_start, date_end, month, **equals)
+        if months == []:
+            return []
+        dataset = ds.dataset(self._path(table), format="parquet", partitioning=_PARTITIONING)
+        return [fragment.path for fragment in dataset.get_fragments(filter=expression)]
+
+    def read(self, table, columns=None, date_start=None, date_end=None, month=None, **equals):
+        """Read rows matching an inclusive date range, a YYYY-MM month and equality filters."""
+        if not os.path.isdir(self._path(table)):
+            return pd.DataFrame(columns=columns)
+        expression, months = self._filter(table, date_start, date_end, month, **equals)
+        dataset = ds.dataset(self._path(table), format="parquet", partitioning=_PARTITIONING)
+        columns = columns or [name for name in dataset.schema.names if name != "month"]
+        if months == []:
+            return dataset.schema.empty_table().select(columns).to_pandas()
+        frame = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        if "date" in frame:
+            frame["date"] = frame["date"].values.astype('datetime64[s]')
+        return frame
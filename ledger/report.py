@@ -0,0 +1,129 @@
+# Expense-Tracker
+# Streaming PDF report: rows arrive in chunks and leave as one table per page.
+
+from collections import defaultdict
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from .trace import traced
+
+ROWS_PER_PAGE = 32
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+SUBTOTAL_STYLE = TableStyle(TABLE_STYLE.getCommands() + [
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold')
+])
+
+
+class _FlowableStream(list):
+    """List that refills itself from a generator as reportlab consumes it from the front.
+
+    SimpleDocTemplate.build only ever looks at the head of its list, so at
+    most lookahead flowables (a few pages of rows) exist at any time.
+    """
+
+    def __init__(self, source, lookahead=4):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def _format_chunk(chunk):
+    """Render a chunk of rows as lists of strings for a Table."""
+    columns = []
+    for name in chunk.columns:
+        values = chunk[name]
+        if name == "Date":
+            columns.append(pd.to_datetime(values).dt.strftime('%Y-%m-%d'))
+        elif name == "Amount":
+            columns.append(values.astype(float).map('{:.2f}'.format))
+        elif name == "Auto-Pay":
+            columns.append(values.astype(bool).map({True: "Yes", False: "No"}))
+        else:
+            columns.append(values.astype(str))
+    return [list(row) for row in zip(*columns)]
+
+
+def _section(heading, group_column, chunks, rows_per_page, summary):
+    styles = getSampleStyleSheet()
+    yield Paragraph(heading, styles['Heading2'])
+    subtotals = defaultdict(float)
+    counts = defaultdict(int)
+    header = None
+    pending = []
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        header = list(chunk.columns)
+        # Subtotals are accumulated chunk by chunk, in the same pass as the rows.
+        grouped = chunk.groupby(chunk[group_column].astype(str))["Amount"].agg(["sum", "count"])
+        for group, row in grouped.iterrows():
+            subtotals[group] += float(row["sum"])
+            counts[group] += int(row["count"])
+        pending.extend(_format_chunk(chunk))
+        while len(pending) >= rows_per_page:
+            yield Table([header] + pending[:rows_per_page], repeatRows=1, style=TABLE_STYLE)
+            del pending[:rows_per_page]
+    if pending:
+        yield Table([header] + pending, repeatRows=1, style=TABLE_STYLE)
+    summary["rows"] = sum(counts.values())
+    summary["subtotals"] = pd.Series(subtotals, dtype=float).sort_index()
+    if not counts:
+        yield Paragraph(f"No {heading.lower()} match the filter.", styles['Normal'])
+    else:
+        yield Spacer(1, 12)
+        yield Paragraph(f"{heading} by {group_column}", styles['Heading3'])
+        rows = [[group, str(counts[group]), f"{subtotals[group]:.2f}"] for group in sorted(subtotals)]
+        rows.append(["Total", str(summary["rows"]), f"{sum(subtotals.values()):.2f}"])
+        yield Table([[group_column, "Entries", "Subtotal"]] + rows, repeatRows=1, style=SUBTOTAL_STYLE)
+    yield Spacer(1, 12)
+
+
+@traced("report.write_pdf_report")
+def write_pdf_report(path, title, sections, rows_per_page=ROWS_PER_PAGE):
+    """Write a PDF from (heading, group_column, chunks) sections and return a summary per section.
+
+    chunks yields DataFrames with display column names including 'Amount' and
+    group_column. Rows are laid out rows_per_page to a table, each table
+    repeating the header, and every section ends with per-group subtotals.
+    The summary for each section holds its row count and subtotals Series.
+    """
+    summaries = [{} for _ in sections]
+
+    def flowables():
+        yield Paragraph(title, getSampleStyleSheet()['Heading1'])
+        yield Spacer(1, 12)
+        for (heading, group_column, chunks), summary in zip(sections, summaries):
+            yield from _section(heading, group_column, chunks, rows_per_page, summary)
+
+    SimpleDocTemplate(path, pagesize=letter, pageCompression=1).build(_FlowableStream(flowables()))
+    return summaries
@@ -0,0 +1,352 @@
+# Expense-Tracker
+# Versioned schema migrations for the expenses/received tables, in MySQL and
+# SQLite dialects.
+
+from datetime import datetime
+
+# Content fingerprint of a row. Stored as a generated column so every insert
+# path (single INSERT, executemany, LOAD DATA) gets it without extra code.
+# It is indexed but not unique: two identical coffees on one day are two
+# entries. Loads and syncs compare how many copies of each row exist instead.
+ROW_HASH = {
+    "expenses": "UNHEX(MD5(CONCAT_WS('|', category, amount, date, IFNULL(place, ''), autopay)))",
+    "received": "UNHEX(MD5(CONCAT_WS('|', sender, amount, date)))"
+}
+
+# SQLite has no MD5/UNHEX; the joined column values themselves serve as the fingerprint.
+SQLITE_ROW_HASH = {
+    "expenses": "category || '|' || amount || '|' || date || '|' || IFNULL(place, '') || '|' || autopay",
+    "received": "sender || '|' || amount || '|' || date"
+}
+
+BASE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS expenses (
+     id INT AUTO_INCREMENT PRIMARY KEY,
+     category VARCHAR(32) NOT NULL,
+     amount DECIMAL(10,2) NOT NULL,
+     date DATE NOT NULL,
+     place VARCHAR(32),
+     autopay BOOLEAN NOT NULL DEFAULT FALSE
+)''',
+    '''CREATE TABLE IF NOT EXISTS received (
+     id INT AUTO_INCREMENT PRIMARY KEY,
+     date DATE NOT NULL,
+     amount DECIMAL(10,2) NOT NULL,
+     sender VARCHAR(32) NOT NULL
+)'''
+]
+
+SQLITE_BASE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS expenses (
+     id INTEGER PRIMARY KEY AUTOINCREMENT,
+     category VARCHAR(32) NOT NULL,
+     amount DECIMAL(10,2) NOT NULL,
+     date DATE NOT NULL,
+     place VARCHAR(32),
+     autopay BOOLEAN NOT NULL DEFAULT FALSE
+)''',
+    '''CREATE TABLE IF NOT EXISTS received (
+     id INTEGER PRIMARY KEY AUTOINCREMENT,
+     date DATE NOT NULL,
+     amount DECIMAL(10,2) NOT NULL,
+     sender VARCHAR(32) NOT NULL
+)'''
+]
+
+SCHEMA_VERSION_DDL = '''CREATE TABLE IF NOT EXISTS schema_version (
+     version INT NOT NULL PRIMARY KEY,
+     description VARCHAR(128) NOT NULL,
+     applied_at DATETIME NOT NULL
+)'''
+
+
+# A migration is a list of steps: a statement, or a (check, statement) pair
+# whose statement is skipped when the check query returns a non-zero count.
+# A statement can also be a function of the cursor, for changes that depend
+# on what the database holds.
+# MySQL commits DDL implicitly, so a migration that fails partway stays
+# partly applied; the checks let it be re-run from the start.
+
+def _mysql_has_column(table, column):
+    return ("SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+            f"AND TABLE_NAME = '{table}' AND COLUMN_NAME = '{column}'")
+
+
+def _mysql_has_index(table, *names):
+    quoted = ", ".join(f"'{name}'" for name in names)
+    return ("SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            f"AND TABLE_NAME = '{table}' AND INDEX_NAME IN ({quoted})")
+
+
+def _mysql_lacks_index(table, name):
+    return ("SELECT COUNT(*) = 0 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            f"AND TABLE_NAME = '{table}' AND INDEX_NAME = '{name}'")
+
+
+def _mysql_has_trigger(name):
+    return f"SELECT COUNT(*) FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = '{name}'"
+
+
+# Before monthly_totals, every month's expenses were also copied into a table
+# of their own, named expenses_YYYY_MM.
+LEGACY_MONTH_TABLES = "TABLE_NAME REGEXP '^expenses_[0-9]{4}_[0-9]{2}$'"
+SQLITE_LEGACY_MONTH_TABLES = "name GLOB 'expenses_[0-9][0-9][0-9][0-9]_[0-9][0-9]'"
+
+
+def _mysql_lacks_month_tables():
+    return ("SELECT COUNT(*) = 0 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() "
+            f"AND {LEGACY_MONTH_TABLES}")
+
+
+def _sqlite_lacks_month_tables():
+    return f"SELECT COUNT(*) = 0 FROM sqlite_master WHERE type = 'table' AND {SQLITE_LEGACY_MONTH_TABLES}"
+
+
+def _fold_month_tables(list_tables):
+    """Return a step function moving rows found only in expenses_YYYY_MM tables into expenses, then dropping them.
+
+    The old startup copied each month's rows into its table again on every
+    start, so a table can hold many copies of one expense; rows are compared
+    by content and each missing one is added once.
+    """
+    def fold(cursor):
+        cursor.execute(list_tables)
+        for (table,) in cursor.fetchall():
+            cursor.execute(
+                "INSERT INTO expenses (category, amount, date, place, autopay) "
+                f"SELECT DISTINCT m.category, m.amount, m.date, m.place, m.autopay FROM {table} m "
+                "WHERE NOT EXISTS (SELECT 1 FROM expenses e WHERE e.category = m.category AND e.amount = m.amount "
+                "AND e.date = m.date AND IFNULL(e.place, '') = IFNULL(m.place, '') AND e.autopay = m.autopay)"
+            )
+            cursor.execute(f"DROP TABLE {table}")
+    return fold
+
+
+def _sqlite_has_column(table, column):
+    # table_xinfo, unlike table_info, lists generated columns.
+    return f"SELECT COUNT(*) FROM pragma_table_xinfo('{table}') WHERE name = '{column}'"
+
+
+def _fingerprint_and_indexes(table, indexes):
+    """Steps adding and indexing the row_hash column, and indexing the table."""
+    steps = [
+        (_mysql_has_column(table, "row_hash"),
+         f"ALTER TABLE {table} ADD COLUMN row_hash BINARY(16) AS ({ROW_HASH[table]}) STORED"),
+        (_mysql_has_index(table, f"idx_{table}_row_hash"),
+         f"ALTER TABLE {table} ADD INDEX idx_{table}_row_hash (row_hash)")
+    ]
+    for name, columns in indexes.items():
+        steps.append((_mysql_has_index(table, f"idx_{table}_{name}"),
+                      f"ALTER TABLE {table} ADD INDEX idx_{table}_{name} ({columns})"))
+    return steps
+
+
+def _plain_row_hash_index(table):
+    """Steps replacing the unique row_hash key of databases migrated before it was dropped."""
+    return [
+        (_mysql_has_index(table, f"idx_{table}_row_hash"),
+         f"ALTER TABLE {table} ADD INDEX idx_{table}_row_hash (row_hash)"),
+        (_mysql_lacks_index(table, f"uq_{table}_row_hash"),
+         f"ALTER TABLE {table} DROP INDEX uq_{table}_row_hash")
+    ]
+
+
+def _monthly_recompute(aggregate, table, key):
+    """Statements rebuilding a monthly aggregate from its source table."""
+    return [
+        f"DELETE FROM {aggregate}",
+        f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+        f"SELECT DATE_FORMAT(date, '%Y-%m'), {key}, SUM(amount), COUNT(*) FROM {table} "
+        f"GROUP BY DATE_FORMAT(date, '%Y-%m'), {key}"
+    ]
+
+
+def _monthly_aggregate(aggregate, table, key):
+    """Steps creating a per-month, per-key totals table that triggers keep current.
+
+    Every insert path updates it, so totals and startup never have to scan the
+    source table. Re-running the steps recomputes the table from scratch.
+    """
+    return [
+        f'''CREATE TABLE IF NOT EXISTS {aggregate} (
+     month CHAR(7) NOT NULL,
+     {key} VARCHAR(32) NOT NULL,
+     total DECIMAL(14,2) NOT NULL DEFAULT 0,
+     entries INT NOT NULL DEFAULT 0,
+     PRIMARY KEY (month, {key})
+)''',
+        *_monthly_recompute(aggregate, table, key),
+        (_mysql_has_trigger(f"{table}_{aggregate}_insert"),
+         f"CREATE TRIGGER {table}_{aggregate}_insert AFTER INSERT ON {table} FOR EACH ROW "
+         f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+         f"VALUES (DATE_FORMAT(NEW.date, '%Y-%m'), NEW.{key}, NEW.amount, 1) "
+         f"ON DUPLICATE KEY UPDATE total = total + NEW.amount, entries = entries + 1"),
+        (_mysql_has_trigger(f"{table}_{aggregate}_delete"),
+         f"CREATE TRIGGER {table}_{aggregate}_delete AFTER DELETE ON {table} FOR EACH ROW "
+         f"UPDATE {aggregate} SET total = total - OLD.amount, entries = entries - 1 "
+         f"WHERE month = DATE_FORMAT(OLD.date, '%Y-%m') AND {key} = OLD.{key}")
+    ]
+
+
+def _monthly_update_trigger(aggregate, table, key):
+    """Steps keeping a monthly aggregate right when a row's amount, date or key is corrected.
+
+    The old row is taken out of its month and the new one added, which also
+    moves it between months or keys. The aggregate is rebuilt first, since
+    updates made before the trigger existed were never counted.
+    """
+    return [
+        *_monthly_recompute(aggregate, table, key),
+        (_mysql_has_trigger(f"{table}_{aggregate}_update"),
+         f"CREATE TRIGGER {table}_{aggregate}_update AFTER UPDATE ON {table} FOR EACH ROW BEGIN "
+         f"UPDATE {aggregate} SET total = total - OLD.amount, entries = entries - 1 "
+         f"WHERE month = DATE_FORMAT(OLD.date, '%Y-%m') AND {key} = OLD.{key}; "
+         f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+         f"VALUES (DATE_FORMAT(NEW.date, '%Y-%m'), NEW.{key}, NEW.amount, 1) "
+         f"ON DUPLICATE KEY UPDATE total = total + NEW.amount, entries = entries + 1; END")
+    ]
+
+
+def _sqlite_fingerprint_and_indexes(table, indexes):
+    """SQLite version of _fingerprint_and_indexes; ALTER TABLE can only add a virtual column."""
+    steps = [
+        (_sqlite_has_column(table, "row_hash"),
+         f"ALTER TABLE {table} ADD COLUMN row_hash TEXT AS ({SQLITE_ROW_HASH[table]}) VIRTUAL"),
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_row_hash ON {table} (row_hash)"
+    ]
+    for name, columns in indexes.items():
+        steps.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_{name} ON {table} ({columns})")
+    return steps
+
+
+def _sqlite_plain_row_hash_index(table):
+    """SQLite version of _plain_row_hash_index."""
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_row_hash ON {table} (row_hash)",
+        f"DROP INDEX IF EXISTS uq_{table}_row_hash"
+    ]
+
+
+def _sqlite_monthly_recompute(aggregate, table, key):
+    """SQLite version of _monthly_recompute."""
+    return [
+        f"DELETE FROM {aggregate}",
+        f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+        f"SELECT strftime('%Y-%m', date), {key}, SUM(amount), COUNT(*) FROM {table} "
+        f"GROUP BY strftime('%Y-%m', date), {key}"
+    ]
+
+
+def _sqlite_monthly_aggregate(aggregate, table, key):
+    """SQLite version of _monthly_aggregate, using strftime and an upsert in the insert trigger."""
+    return [
+        f'''CREATE TABLE IF NOT EXISTS {aggregate} (
+     month CHAR(7) NOT NULL,
+     {key} VARCHAR(32) NOT NULL,
+     total DECIMAL(14,2) NOT NULL DEFAULT 0,
+     entries INT NOT NULL DEFAULT 0,
+     PRIMARY KEY (month, {key})
+)''',
+        *_sqlite_monthly_recompute(aggregate, table, key),
+        f"CREATE TRIGGER IF NOT EXISTS {table}_{aggregate}_insert AFTER INSERT ON {table} FOR EACH ROW BEGIN "
+        f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+        f"VALUES (strftime('%Y-%m', NEW.date), NEW.{key}, NEW.amount, 1) "
+        f"ON CONFLICT (month, {key}) DO UPDATE SET total = total + excluded.total, entries = entries + 1; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_{aggregate}_delete AFTER DELETE ON {table} FOR EACH ROW BEGIN "
+        f"UPDATE {aggregate} SET total = total - OLD.amount, entries = entries - 1 "
+        f"WHERE month = strftime('%Y-%m', OLD.date) AND {key} = OLD.{key}; END"
+    ]
+
+
+def _sqlite_monthly_update_trigger(aggregate, table, key):
+    """SQLite version of _monthly_update_trigger."""
+    return [
+        *_sqlite_monthly_recompute(aggregate, table, key),
+        f"CREATE TRIGGER IF NOT EXISTS {table}_{aggregate}_update AFTER UPDATE ON {table} FOR EACH ROW BEGIN "
+        f"UPDATE {aggregate} SET total = total - OLD.amount, entries = entries - 1 "
+        f"WHERE month = strftime('%Y-%m', OLD.date) AND {key} = OLD.{key}; "
+        f"INSERT INTO {aggregate} (month, {key}, total, entries) "
+        f"VALUES (strftime('%Y-%m', NEW.date), NEW.{key}, NEW.amount, 1) "
+        f"ON CONFLICT (month, {key}) DO UPDATE SET total = total + excluded.total, entries = entries + 1; END"
+    ]
+
+
+MIGRATIONS = [
+    (1, "expenses row fingerprint and date indexes", _fingerprint_and_indexes(
+        "expenses", {"date": "date", "category_date": "category, date"})),
+    (2, "received row fingerprint and date indexes", _fingerprint_and_indexes(
+        "received", {"date": "date", "sender_date": "sender, date"})),
+    (3, "monthly_totals aggregate replacing expenses_YYYY_MM tables",
+        [(_mysql_lacks_month_tables(), _fold_month_tables(
+            f"SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND {LEGACY_MONTH_TABLES}"))]
+        + _monthly_aggregate("monthly_totals", "expenses", "category")),
+    (4, "monthly_received aggregate for received totals",
+        _monthly_aggregate("monthly_received", "received", "sender")),
+    (5, "monthly aggregates follow updated rows",
+        _monthly_update_trigger("monthly_totals", "expenses", "category")
+        + _monthly_update_trigger("monthly_received", "received", "sender")),
+    (6, "row_hash indexes no longer unique, so repeated entries are kept",
+        _plain_row_hash_index("expenses") + _plain_row_hash_index("received"))
+]
+
+# Same versions and end state as MIGRATIONS, for the embedded SQLite backend.
+SQLITE_MIGRATIONS = [
+    (1, "expenses row fingerprint and date indexes", _sqlite_fingerprint_and_indexes(
+        "expenses", {"date": "date", "category_date": "category, date"})),
+    (2, "received row fingerprint and date indexes", _sqlite_fingerprint_and_indexes(
+        "received", {"date": "date", "sender_date": "sender, date"})),
+    (3, "monthly_totals aggregate replacing expenses_YYYY_MM tables",
+        [(_sqlite_lacks_month_tables(), _fold_month_tables(
+            f"SELECT name FROM sqlite_master WHERE type = 'table' AND {SQLITE_LEGACY_MONTH_TABLES}"))]
+        + _sqlite_monthly_aggregate("monthly_totals", "expenses", "category")),
+    (4, "monthly_received aggregate for received totals",
+        _sqlite_monthly_aggregate("monthly_received", "received", "sender")),
+    (5, "monthly aggregates follow updated rows",
+        _sqlite_monthly_update_trigger("monthly_totals", "expenses", "category")
+        + _sqlite_monthly_update_trigger("monthly_received", "received", "sender")),
+    (6, "row_hash indexes no longer unique, so repeated entries are kept",
+        _sqlite_plain_row_hash_index("expenses") + _sqlite_plain_row_hash_index("received"))
+]
+
+
+def current_version(cursor):
+    """Return the highest applied migration version, or 0 for an unmigrated database."""
+    cursor.execute(SCHEMA_VERSION_DDL)
+    cursor.execute("SELECT MAX(version) FROM schema_version")
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+def migrate(connection, migrations=MIGRATIONS):
+    """Apply every migration newer than the recorded schema version; returns the versions applied.
+
+    MySQL commits implicitly around DDL, so each migration is recorded as soon
+    as all of its steps have succeeded, and steps check whether their change
+    is already in place before making it.
+    """
+    cursor = connection.cursor()
+    try:
+        applied = []
+        version = current_version(cursor)
+        for number, description, steps in migrations:
+            if number <= version:
+                continue
+            for step in steps:
+                check, statement = step if isinstance(step, tuple) else (None, step)
+                if check is not None:
+                    cursor.execute(check)
+                    if cursor.fetchone()[0]:
+                        continue
+                if callable(statement):
+                    statement(cursor)
+                else:
+                    cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)",
+                (number, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            connection.commit()
+            applied.append(number)
+        return applied
+    finally:
+        cursor.close()
@@ -0,0 +1,137 @@
+# Expense-Tracker
+# Embedded SQLite database with the same interface as the pooled MySQL connections.
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .trace import traced_cursor
+
+
+def _translate(query):
+    """Rewrite the MySQL-flavoured statements the trackers issue into SQLite syntax."""
+    return (query.replace("%s", "?")
+                 .replace("INSERT IGNORE", "INSERT OR IGNORE")
+                 .replace("DROP TEMPORARY TABLE", "DROP TABLE"))
+
+
+class _Cursor:
+    """sqlite3 cursor that accepts %s placeholders and the MySQL statements above."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        return self._cursor.execute(_translate(query), tuple(params))
+
+    def executemany(self, query, rows):
+        return self._cursor.executemany(_translate(query), rows)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection:
+    """sqlite3 connection handing out translating cursors."""
+
+    dialect = "sqlite"
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, **kwargs):
+        return _Cursor(self._connection.cursor())
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+
+class SQLitePool:
+    """Drop-in replacement for ledger.db.ConnectionPool backed by one SQLite file.
+
+    Each thread gets its own connection. The database runs in WAL mode so
+    readers never block the writer, with synchronous=FULL so a committed
+    entry survives a power loss. on_connect runs once, on the first
+    connection, to create and migrate the schema.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path, on_connect=None, busy_timeout=5.0):
+        self.path = path
+        self.on_connect = on_connect
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._prepared = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        return _Connection(connection)
+
+    def available(self):
+        """Return True; the file is created on first use and never goes away."""
+        return True
+
+    def _checkout(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+                if not self._prepared and self.on_connect:
+                    self.on_connect(connection)
+                self._prepared = True
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Yield this thread's connection for the duration of a with-block."""
+        yield self._checkout()
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """Yield a cursor on this thread's connection; commits on success and rolls back on error."""
+        with self.connection() as connection:
+            cursor = connection.cursor(**kwargs)
+            try:
+                yield traced_cursor(cursor)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        """Close every connection opened by this pool."""
+        with self._lock:
+            for connection in self._connections:
+                connection._connection.close()
+            self._connections = []
+            self._prepared = False
+        self._local = threading.local()
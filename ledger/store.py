@@ -0,0 +1,241 @@
+# Expense-Tracker
+# Columnar, array-backed storage for expense and received rows.
+# Shared by the CLI (CSV and MySQL) and Streamlit implementations.
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .totals import RunningTotals
+
+EXPENSE_SCHEMA = {
+    'category': 'str',
+    'amount': 'float',
+    'date': 'date',
+    'place': 'str',
+    'autopay': 'bool'
+}
+
+RECEIVED_SCHEMA = {
+    'sender': 'str',
+    'amount': 'float',
+    'date': 'date'
+}
+
+# Dates are kept at second resolution, the coarsest unit pandas 2 can wrap
+# without converting, so frames built from the store do not copy the column.
+_DTYPES = {
+    'str': np.int32,
+    'float': np.float64,
+    'date': 'datetime64[s]',
+    'bool': np.bool_
+}
+
+
+class ColumnStore:
+    """Append-only table holding one typed NumPy array per column.
+
+    Amounts are float64, dates datetime64 and strings are dictionary-encoded
+    as int32 codes into a per-column list of distinct values. When group_by
+    names a string column, running totals of 'amount' by month and by that
+    column are kept up to date on every append.
+    """
+
+    def __init__(self, schema, capacity=1024, group_by=None):
+        self.schema = dict(schema)
+        self.group_by = group_by
+        self.totals = RunningTotals() if group_by else None
+        self.version = 0
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._arrays = {name: np.empty(self._capacity, dtype=_DTYPES[kind]) for name, kind in self.schema.items()}
+        self._codes = {name: {} for name, kind in self.schema.items() if kind == 'str'}
+        self._values = {name: [] for name, kind in self.schema.items() if kind == 'str'}
+        self._digests = {name: hashlib.sha1() for name in self.schema}
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+        self._capacity = capacity
+
+    def _encode(self, name, value):
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = len(self._values[name])
+            codes[value] = code
+            self._values[name].append(value)
+        return code
+
+    def append(self, **row):
+        """Append a single row given as column=value keyword arguments."""
+        self._reserve(1)
+        i = self._size
+        for name, kind in self.schema.items():
+            value = row[name]
+            if kind == 'str':
+                self._arrays[name][i] = self._encode(name, str(value))
+            elif kind == 'date':
+                self._arrays[name][i] = np.datetime64(pd.Timestamp(value), 's')
+            else:
+                self._arrays[name][i] = value
+        if self.totals is not None:
+            month = int(self._arrays['date'][i].astype('datetime64[M]').astype(np.int64))
+            self.totals.add(float(self._arrays['amount'][i]), month, int(self._arrays[self.group_by][i]))
+        self._digest_rows(i, i + 1)
+        self._size += 1
+        self.version += 1
+
+    def extend(self, columns):
+        """Append many rows at once from a mapping of column -> array-like."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        if n == 0:
+            return 0
+        encoded = {}
+        for name, kind in self.schema.items():
+            values = columns[name]
+            if len(values) != n:
+                raise ValueError(f"Column '{name}' has {len(values)} values, expected {n}.")
+            if kind == 'str' and isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+                # Already dictionary-encoded (e.g. read from Parquet): remap the codes only.
+                categorical = pd.Series(values).cat
+                mapping = np.array([self._encode(name, str(value)) for value in categorical.categories], dtype=np.int32)
+                encoded[name] = mapping[categorical.codes.to_numpy()]
+            elif kind == 'str':
+                local_codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype(str), sort=False)
+                mapping = np.array([self._encode(name, value) for value in uniques], dtype=np.int32)
+                encoded[name] = mapping[local_codes]
+            elif kind == 'date':
+                encoded[name] = pd.to_datetime(values).values.astype('datetime64[s]')
+            else:
+                encoded[name] = np.asarray(values, dtype=_DTYPES[kind])
+        self._reserve(n)
+        for name, values in encoded.items():
+            self._arrays[name][self._size:self._size + n] = values
+        if self.totals is not None:
+            months = encoded['date'].astype('datetime64[M]').astype(np.int64)
+            self.totals.add_many(encoded['amount'], months, encoded[self.group_by])
+        self._digest_rows(self._size, self._size + n)
+        self._size += n
+        self.version += 1
+        return n
+
+    def _digest_rows(self, start, end):
+        # Strings are hashed decoded, as their codes depend on the order values were first seen.
+        for name, digest in self._digests.items():
+            values = self._arrays[name][start:end]
+            if self.schema[name] == 'str':
+                strings = self._values[name]
+                digest.update("".join(strings[code] + "\x1f" for code in values.tolist()).encode())
+            else:
+                digest.update(values.tobytes())
+
+    def column(self, name):
+        """Return a read-only, zero-copy view of a column's raw array."""
+        view = self._arrays[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def values(self, name):
+        """Return a column decoded for display; strings come back as a Categorical."""
+        if self.schema[name] == 'str':
+            return pd.Categorical.from_codes(self.column(name), categories=self._values[name], validate=False)
+        return self.column(name)
+
+    def code_of(self, name, value):
+        """Return the dictionary code for a string value, or -1 if it was never stored."""
+        return self._codes[name].get(str(value), -1)
+
+    def mask(self, date_start=None, date_end=None, month=None, **equals):
+        """Build a boolean row mask from an inclusive date range, a YYYY-MM month and equality filters."""
+        mask = np.ones(self._size, dtype=bool)
+        dates = self.column('date') if 'date' in self.schema else None
+        if date_start:
+            mask &= dates >= np.datetime64(pd.Timestamp(date_start), 's')
+        if date_end:
+            mask &= dates <= np.datetime64(pd.Timestamp(date_end), 's')
+        if month:
+            mask &= dates.astype('datetime64[M]') == np.datetime64(month, 'M')
+        for name, value in equals.items():
+            if value is None:
+                continue
+            if self.schema[name] == 'str':
+                mask &= self.column(name) == self.code_of(name, value)
+            else:
+                mask &= self.column(name) == value
+        return mask
+
+    def total(self, column='amount', mask=None):
+        """Sum a numeric column, optionally restricted to a row mask."""
+        values = self.column(column)
+        if mask is not None:
+            values = values[mask]
+        return float(values.sum())
+
+    def running_total(self, month=None, key=None):
+        """Return a cached total for a YYYY-MM month and/or group_by value without scanning."""
+        month_id = int(np.datetime64(month, 'M').astype(np.int64)) if month else None
+        code = self.code_of(self.group_by, key) if key is not None else None
+        return self.totals.get(month_id, code)
+
+    def fingerprint(self):
+        """Return a digest of every stored row, cheap enough to take on every lookup.
+
+        Each column keeps a running SHA-1 of its values in row order, updated
+        as rows are appended, so the same rows give the same fingerprint
+        however they were loaded and any other content gives a different one.
+        """
+        combined = hashlib.sha1(str(self._size).encode())
+        for digest in self._digests.values():
+            combined.update(digest.digest())
+        return combined.hexdigest()
+
+    def recompute_totals(self):
+        """Rebuild running totals from the stored arrays, for consistency checks."""
+        fresh = RunningTotals()
+        months = self.column('date').astype('datetime64[M]').astype(np.int64)
+        fresh.add_many(self.column('amount'), months, self.column(self.group_by))
+        return fresh
+
+    def check_totals(self, tolerance=0.005):
+        """Return the entries where the running totals disagree with a full recompute."""
+        return self.totals.mismatches(self.recompute_totals(), tolerance)
+
+    def monthly_totals(self, column='amount', mask=None):
+        """Sum a numeric column per calendar month in one pass; returns a Series indexed by YYYY-MM."""
+        months = self.column('date').astype('datetime64[M]')
+        values = self.column(column)
+        if mask is not None:
+            months, values = months[mask], values[mask]
+        keys, inverse = np.unique(months, return_inverse=True)
+        sums = np.bincount(inverse, weights=values, minlength=len(keys))
+        return pd.Series(sums, index=pd.Index(keys.astype(str), name='month'), dtype=float)
+
+    def to_frame(self, mask=None, columns=None):
+        """Return the table as a DataFrame.
+
+        Without a mask the frame wraps the stored arrays without copying;
+        with a mask (a boolean array or a slice) only the matching rows are
+        materialised.
+        """
+        data = {}
+        for name in columns or self.schema:
+            values = self.values(name)
+            if mask is not None:
+                values = values[mask]
+                if isinstance(values, pd.Categorical):
+                    values = values.remove_unused_categories()
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
@@ -0,0 +1,65 @@
+# Expense-Tracker
+# Running totals maintained on insert, so balance queries never scan the ledger.
+
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+class RunningTotals:
+    """Running sums of an amount column overall, by month, by key and by (month, key).
+
+    Months and keys can be any hashable values; ColumnStore uses integer month
+    numbers and dictionary codes so updates and lookups stay O(1).
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self.by_month = defaultdict(float)
+        self.by_key = defaultdict(float)
+        self.by_month_key = defaultdict(float)
+
+    def add(self, amount, month, key):
+        """Account for one new row."""
+        self.total += amount
+        self.count += 1
+        self.by_month[month] += amount
+        self.by_key[key] += amount
+        self.by_month_key[(month, key)] += amount
+
+    def add_many(self, amounts, months, keys):
+        """Account for a batch of rows with one groupby; cost grows with distinct (month, key) pairs."""
+        if len(amounts) == 0:
+            return
+        frame = pd.DataFrame({'month': months, 'key': keys, 'amount': amounts})
+        sums = frame.groupby(['month', 'key'], sort=False)['amount'].sum()
+        for (month, key), amount in sums.items():
+            self.by_month[month] += amount
+            self.by_key[key] += amount
+            self.by_month_key[(month, key)] += amount
+        self.total += float(np.sum(amounts))
+        self.count += len(amounts)
+
+    def get(self, month=None, key=None):
+        """Return the total for a month, a key, both, or everything when neither is given."""
+        if month is not None and key is not None:
+            return self.by_month_key.get((month, key), 0.0)
+        if month is not None:
+            return self.by_month.get(month, 0.0)
+        if key is not None:
+            return self.by_key.get(key, 0.0)
+        return self.total
+
+    def mismatches(self, expected, tolerance=0.005):
+        """Compare against a freshly recomputed RunningTotals; returns (bucket, label, cached, expected) tuples."""
+        found = []
+        if abs(self.total - expected.total) > tolerance or self.count != expected.count:
+            found.append(("total", None, self.total, expected.total))
+        for bucket in ("by_month", "by_key", "by_month_key"):
+            cached, fresh = getattr(self, bucket), getattr(expected, bucket)
+            for label in set(cached) | set(fresh):
+                if abs(cached.get(label, 0.0) - fresh.get(label, 0.0)) > tolerance:
+                    found.append((bucket, label, cached.get(label, 0.0), fresh.get(label, 0.0)))
+        return found
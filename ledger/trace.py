@@ -0,0 +1,365 @@
+# Expense-Tracker
+# Opt-in timing spans, SQL counters and peak memory per tracker operation.
+
+import functools
+import inspect
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Counted per span and included in the enclosing span when it finishes.
+# The SQL counters are filled in by cursors wrapped with traced_cursor().
+COUNTERS = ("sql_statements", "sql_seconds", "rows_fetched", "rows_written")
+
+METRIC_PREFIX = "expense_tracker"
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+_trace_file = None
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_metrics = {}
+_classes = {}
+_originals = {}
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Span:
+    """One timed operation on the current thread.
+
+    Counters include those of the spans nested inside it. Peak memory is
+    what the operation allocated above what was in use when it started; it
+    is only measured with enable(memory=True), and spans running on other
+    threads at the same time count towards it too.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.id = None
+        self.parent = None
+        self._peak = 0
+        self._base = 0
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        self.id = next(_ids)
+        if _memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent._peak = max(self.parent._peak, peak)
+            tracemalloc.reset_peak()
+            self._base = current
+        stack.append(self)
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        stack = _stack()
+        # A traced generator can finish after spans opened while it was suspended.
+        if stack and stack[-1] is self:
+            stack.pop()
+        elif self in stack:
+            stack.remove(self)
+        peak = None
+        if _memory:
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            if self.parent is not None:
+                self.parent._peak = max(self.parent._peak, self._peak)
+            peak = max(0, self._peak - self._base)
+        if self.parent is not None:
+            for name, value in self.counters.items():
+                self.parent.counters[name] += value
+        _record(self, seconds, peak, exc_type.__name__ if exc_type else None)
+        return False
+
+
+class _NullSpan:
+    counters = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Return a context manager timing the block as name; does nothing while tracing is disabled."""
+    return Span(name) if _enabled else _NULL_SPAN
+
+
+def count(name, value=1):
+    """Add value to a counter of the innermost open span on this thread."""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].counters[name] += value
+
+
+def _record(span, seconds, peak, error):
+    with _lock:
+        metric = _metrics.get(span.name)
+        if metric is None:
+            metric = _metrics[span.name] = dict(count=0, seconds=0.0, errors=0, peak_bytes=0, **dict.fromkeys(COUNTERS, 0))
+        metric["count"] += 1
+        metric["seconds"] += seconds
+        metric["errors"] += error is not None
+        for name, value in span.counters.items():
+            metric[name] += value
+        if peak is not None:
+            metric["peak_bytes"] = max(metric["peak_bytes"], peak)
+        if _trace_file is not None:
+            event = {
+                "id": span.id,
+                "parent": span.parent.id if span.parent is not None else None,
+                "name": span.name,
+                "thread": threading.current_thread().name,
+                "start": round(span._wall, 6),
+                "seconds": round(seconds, 6),
+                "error": error
+            }
+            event.update(span.counters)
+            event["sql_seconds"] = round(event["sql_seconds"], 6)
+            if peak is not None:
+                event["peak_bytes"] = peak
+            _trace_file.write(json.dumps(event) + "\n")
+
+
+def traced(name):
+    """Decorate a function so each call is a span called name while tracing is enabled."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _wrap_method(name, func):
+    if inspect.isgeneratorfunction(func):
+        # The span stays open until the caller has consumed (or closed) the generator.
+        @functools.wraps(func)
+        def generator(*args, **kwargs):
+            with Span(name):
+                return (yield from func(*args, **kwargs))
+        return generator
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _patch(cls):
+    if cls in _originals:
+        return
+    originals = {}
+    for attr, value in list(vars(cls).items()):
+        if inspect.isfunction(value) and (attr == "__init__" or not attr.startswith("__")):
+            originals[attr] = value
+            setattr(cls, attr, _wrap_method(f"{cls.__name__}.{attr}", value))
+    _originals[cls] = originals
+
+
+def _unpatch(cls):
+    for attr, value in _originals.pop(cls, {}).items():
+        setattr(cls, attr, value)
+
+
+def instrument(cls):
+    """Class decorator: time every method of cls as a span while tracing is enabled.
+
+    Methods are only wrapped from enable() until disable(), so a disabled
+    tracer adds no call overhead. Re-defining the class (as Streamlit does on
+    every rerun) replaces the earlier registration; instances of the earlier
+    class stay traced until disable().
+    """
+    with _lock:
+        _classes[(cls.__module__, cls.__qualname__)] = cls
+    if _enabled:
+        _patch(cls)
+    return cls
+
+
+class _TracedCursor:
+    """DB-API cursor proxy counting statements, time spent and rows fetched or written."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _run(self, method, query, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return method(query, *args, **kwargs)
+        finally:
+            count("sql_seconds", time.perf_counter() - start)
+            count("sql_statements")
+            rowcount = getattr(self._cursor, "rowcount", -1) or 0
+            if rowcount > 0 and not query.lstrip()[:6].upper() == "SELECT":
+                count("rows_written", rowcount)
+
+    def execute(self, query, *args, **kwargs):
+        return self._run(self._cursor.execute, query, args, kwargs)
+
+    def executemany(self, query, *args, **kwargs):
+        return self._run(self._cursor.executemany, query, args, kwargs)
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        rows = method(*args)
+        count("sql_seconds", time.perf_counter() - start)
+        return rows
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if row is not None:
+            count("rows_fetched")
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetch(self._cursor.fetchmany, *args)
+        count("rows_fetched", len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        count("rows_fetched", len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            count("rows_fetched")
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def traced_cursor(cursor):
+    """Return cursor wrapped to feed the SQL counters while tracing is enabled, else cursor itself."""
+    return _TracedCursor(cursor) if _enabled else cursor
+
+
+def enable(trace_path=None, memory=False):
+    """Start tracing; finished spans are appended to trace_path as JSON lines if given.
+
+    memory=True also records peak memory per span with tracemalloc, which
+    makes traced operations several times slower. Calling enable() again
+    while tracing is on does nothing.
+    """
+    global _enabled, _memory, _started_tracemalloc, _trace_file
+    with _lock:
+        if _enabled:
+            return
+        if trace_path:
+            _trace_file = open(trace_path, "a", buffering=1)
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _memory = memory
+        _enabled = True
+        classes = list(_classes.values())
+    for cls in classes:
+        _patch(cls)
+
+
+def disable():
+    """Stop tracing, restore the instrumented methods and close the trace file. Metrics are kept."""
+    global _enabled, _memory, _started_tracemalloc, _trace_file
+    with _lock:
+        if not _enabled:
+            return
+        _enabled = False
+        for cls in list(_originals):
+            _unpatch(cls)
+        if _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+        _memory = False
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    """Forget the metrics collected so far."""
+    with _lock:
+        _metrics.clear()
+
+
+def metrics():
+    """Return {span name: totals} for every span finished since the last reset()."""
+    with _lock:
+        return {name: dict(metric) for name, metric in _metrics.items()}
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# (metric family, type, help, [(sample suffix, value key)]); values include nested spans.
+_EXPOSITION = (
+    ("operation_seconds", "summary", "Wall-clock seconds spent in each traced operation.", [("_count", "count"), ("_sum", "seconds")]),
+    ("operation_errors_total", "counter", "Calls of each traced operation that raised.", [("", "errors")]),
+    ("sql_statements_total", "counter", "SQL statements executed within each operation.", [("", "sql_statements")]),
+    ("sql_seconds_total", "counter", "Seconds spent executing and fetching SQL within each operation.", [("", "sql_seconds")]),
+    ("sql_rows_fetched_total", "counter", "Rows fetched from the database within each operation.", [("", "rows_fetched")]),
+    ("sql_rows_written_total", "counter", "Rows inserted or changed in the database within each operation.", [("", "rows_written")]),
+    ("operation_peak_bytes", "gauge", "Largest memory peak of each operation above its starting usage.", [("", "peak_bytes")])
+)
+
+
+def metrics_text():
+    """Return the metrics in the Prometheus text exposition format."""
+    snapshot = metrics()
+    lines = []
+    for family, kind, description, samples in _EXPOSITION:
+        if family == "operation_peak_bytes" and not any(metric["peak_bytes"] for metric in snapshot.values()):
+            continue
+        lines.append(f"# HELP {METRIC_PREFIX}_{family} {description}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{family} {kind}")
+        for operation, metric in sorted(snapshot.items()):
+            for suffix, key in samples:
+                value = metric[key]
+                value = f"{value:.6f}" if isinstance(value, float) else str(value)
+                lines.append(f'{METRIC_PREFIX}_{family}{suffix}{{operation="{_label(operation)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path):
+    """Write metrics_text() to path atomically, for a textfile collector or a later look."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(metrics_text())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
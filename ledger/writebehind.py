@@ -0,0 +1,196 @@
+# Expense-Tracker
+# Write-behind queue: interactive inserts committed in batches by a background thread.
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .trace import span
+
+
+class WriteBehind:
+    """Queue rows for the database and insert them from a background thread.
+
+    Pending rows are committed together, in one transaction, once
+    batch_records of them are waiting or flush_ms milliseconds after the
+    oldest was queued, and on flush() and close(). statements maps each table
+    to its parameterised INSERT. At most max_pending rows wait at a time;
+    put() blocks until the writer catches up. A batch that fails stays queued
+    and is retried after retry_ms, doubling up to max_retry_ms; what went
+    wrong is collected for reports(). Rows close() could not write are saved
+    to spill_path and queued again by the next WriteBehind opened on it.
+    """
+
+    def __init__(self, db, statements, spill_path, batch_records=256, flush_ms=200, max_pending=10000, retry_ms=500, max_retry_ms=30000):
+        self.db = db
+        self.statements = statements
+        self.spill_path = spill_path
+        self.batch_records = batch_records
+        self.flush_ms = flush_ms
+        self.max_pending = max_pending
+        self.retry_ms = retry_ms
+        self.max_retry_ms = max_retry_ms
+        self.written = 0
+        self._pending = [(table, tuple(row)) for table, row in self.replay(spill_path)]
+        self._oldest = time.monotonic() if self._pending else None
+        self._in_flight = 0
+        self._failures = 0
+        self._delay = retry_ms
+        self._retry_at = 0.0
+        self._flushing = 0
+        self._closing = False
+        self._reports = []
+        if self._pending:
+            self._reports.append(f"Retrying {len(self._pending)} entries left unwritten last time.")
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, name="write-behind", daemon=True)
+        self._writer.start()
+        # Daemon threads die at exit; make sure the queue is drained or spilled first.
+        atexit.register(self.close)
+
+    @staticmethod
+    def replay(path):
+        """Yield the (table, row) pairs a previous close() spilled, stopping at a torn line."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    yield record["table"], record["row"]
+        except FileNotFoundError:
+            return
+
+    def put(self, table, row):
+        """Queue one row of JSON-serialisable values; waits while max_pending rows are outstanding."""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("write-behind queue is closed")
+            while len(self._pending) + self._in_flight >= self.max_pending:
+                self._cond.wait()
+            self._pending.append((table, tuple(row)))
+            if self._oldest is None:
+                # The writer may be waiting with no deadline; give it one.
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._pending) >= self.batch_records:
+                self._cond.notify_all()
+
+    def pending(self):
+        """Return how many rows are queued or being written."""
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def flush(self):
+        """Write everything queued now; returns True once it is committed, False if a write failed."""
+        with self._cond:
+            failures = self._failures
+            self._flushing += 1
+            # Asked for explicitly, so skip any backoff after an earlier failure.
+            self._retry_at = 0.0
+            self._cond.notify_all()
+            try:
+                while (self._pending or self._in_flight) and self._failures == failures and self._writer.is_alive():
+                    self._cond.wait()
+                return not (self._pending or self._in_flight)
+            finally:
+                self._flushing -= 1
+
+    def reports(self):
+        """Return and forget the messages about failed writes since the last call."""
+        with self._cond:
+            reports, self._reports = self._reports, []
+        return reports
+
+    def _due(self, now):
+        if not self._pending:
+            return False
+        if self._closing:
+            return True
+        if now < self._retry_at:
+            return False
+        return self._flushing or len(self._pending) >= self.batch_records or (now - self._oldest) * 1000 >= self.flush_ms
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._due(time.monotonic()):
+                    if self._closing:
+                        return
+                    wake = None
+                    if self._pending:
+                        # A full or flushed batch only waits out the retry delay.
+                        ready = self._flushing or len(self._pending) >= self.batch_records
+                        wake = self._retry_at if ready else max(self._retry_at, self._oldest + self.flush_ms / 1000)
+                    self._cond.wait(None if wake is None else max(0.0, wake - time.monotonic()))
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+                closing = self._closing
+            try:
+                self._write(batch)
+                error = None
+            except Exception as e:
+                error = e
+            with self._cond:
+                self._in_flight = 0
+                if error is None:
+                    self.written += len(batch)
+                    self._delay = self.retry_ms
+                    self._retry_at = 0.0
+                    if not self._pending and os.path.exists(self.spill_path):
+                        # Everything recovered from the spill file is committed now.
+                        os.remove(self.spill_path)
+                else:
+                    self._pending = batch + self._pending
+                    self._failures += 1
+                    self._retry_at = time.monotonic() + self._delay / 1000
+                    self._delay = min(self._delay * 2, self.max_retry_ms)
+                    self._reports.append(f"Database error writing {len(batch)} queued entries: {error}. They stay queued and will be retried.")
+                self._oldest = time.monotonic() if self._pending else None
+                self._cond.notify_all()
+                if error is not None and closing:
+                    # Shutting down: one last attempt only, then close() spills the rest.
+                    return
+
+    def _write(self, batch):
+        """Insert a batch in one transaction, one executemany per table."""
+        by_table = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+        with span("writebehind.write"):
+            with self.db.cursor() as cursor:
+                for table, rows in by_table.items():
+                    cursor.executemany(self.statements[table], rows)
+
+    def _spill(self, rows):
+        directory = os.path.dirname(self.spill_path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".spill-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for table, row in rows:
+                    f.write(json.dumps({"table": table, "row": list(row)}, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spill_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def close(self):
+        """Write what is queued and stop the writer; returns how many rows had to be spilled instead."""
+        with self._cond:
+            if self._closing:
+                return 0
+            self._closing = True
+            self._cond.notify_all()
+        self._writer.join()
+        atexit.unregister(self.close)
+        with self._cond:
+            rows, self._pending = self._pending, []
+        if rows:
+            self._spill(rows)
+        return len(rows)
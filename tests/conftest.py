@@ -0,0 +1,71 @@
+# Expense-Tracker
+# Shared pytest fixtures: embedded SQLite ledger databases and trackers.
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(1, os.path.join(ROOT, "CLI Implementation"))
+
+from ledger.schema import SQLITE_BASE_TABLES
+from ledger.sqlite import SQLitePool
+
+
+@pytest.fixture
+def connection(tmp_path):
+    """A SQLite connection holding the base expenses and received tables, with no migrations applied."""
+    pool = SQLitePool(str(tmp_path / "ledger.db"))
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        for statement in SQLITE_BASE_TABLES:
+            cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+        yield connection
+    pool.close()
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    """Point the MySQL CLI at its embedded SQLite backend, in an empty working directory."""
+    import codewithsqlimplemented
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(codewithsqlimplemented, "DB_BACKEND", "sqlite")
+    return codewithsqlimplemented
+
+
+@pytest.fixture
+def sql_tracker(sqlite_backend):
+    """The MySQL CLI's Expenses on its embedded SQLite backend, in an empty working directory."""
+    tracker = quietly(sqlite_backend.Expenses)
+    yield tracker
+    quietly(tracker.close)
+
+
+def quietly(call, *args, **kwargs):
+    """Return call(*args, **kwargs), discarding what it prints."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return call(*args, **kwargs)
+
+
+def query(connection, sql, params=()):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def execute(connection, sql, params=()):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        connection.commit()
+    finally:
+        cursor.close()
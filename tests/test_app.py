@@ -0,0 +1,69 @@
+# Expense-Tracker
+# The Streamlit app, driven headless through streamlit.testing.
+
+import io
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+from ledger.store import ColumnStore, EXPENSE_SCHEMA
+
+APP = os.path.join(ROOT, "GUI Implementation", "app.py")
+
+
+def test_load_from_parquet_skips_rows_already_loaded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = AppTest.from_file(APP, default_timeout=30).run()
+    tracker = app.session_state["tracker"]
+    tracker.expense_store.extend({
+        "category": ["Food", "Food", "Rent"],
+        "amount": [10.0, 10.0, 500.0],
+        "date": pd.to_datetime(["2024-03-05", "2024-03-05", "2024-04-01"]),
+        "place": ["Cafe", "Cafe", "Home"],
+        "autopay": [False, False, True]
+    })
+    tracker.save_to_parquet()
+    assert tracker.load_from_parquet("2024-03") == ["All 2 expenses entries for 2024-03 are already loaded."]
+    assert len(tracker.expense_store) == 3
+    tracker.expense_store.append(category="Food", amount=10.0, date="2024-03-05", place="Cafe", autopay=False)
+    tracker.save_to_parquet()
+    # A new session that has entered one of the three identical March rows itself.
+    tracker.expense_store = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    tracker.expense_store.append(category="Food", amount=10.0, date="2024-03-05", place="Cafe", autopay=False)
+    assert tracker.load_from_parquet("2024-03")[0] == "Loaded 2 expenses entries from 1 Parquet files (1 already loaded)."
+    assert tracker.load_from_parquet()[0] == "Loaded 1 expenses entries from 2 Parquet files (3 already loaded)."
+    assert len(tracker.expense_store) == 4
+    assert tracker.expense_store.check_totals() == []
+
+
+def test_uploaded_dates_are_parsed_one_by_one(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = AppTest.from_file(APP, default_timeout=30).run()
+    tracker = app.session_state["tracker"]
+    upload = io.BytesIO(b"Category,Amount,Date,Place of Spending,Auto-Pay\n"
+                        b"Food,10.5,2024-03-05,Cafe,False\n"
+                        b"Rent,500,6 March 2024,Home,True\n"
+                        b"Food,3,someday,Cafe,False\n")
+    messages, rejected = tracker.load_from_csv(expenses_file=upload)
+    assert messages[0] == "Loaded 2 expense entries from CSV."
+    assert list(rejected["expenses"]["reason"]) == ["invalid date"]
+    assert list(tracker.expense_store.to_frame()["date"]) == list(pd.to_datetime(["2024-03-05", "2024-03-06"]))
+    messages, _ = tracker.load_from_csv(received_file=io.BytesIO(b"Sender,Amount\nMom,100\n"))
+    assert messages == ["Error loading CSV: Received CSV must contain columns: Sender, Amount, Date"]
+
+
+def test_parquet_results_follow_files_written_by_another_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = AppTest.from_file(APP, default_timeout=30).run()
+    tracker = app.session_state["tracker"]
+    other = type(tracker)()
+    other.expense_store.append(category="Food", amount=10.0, date="2024-03-05", place="Cafe", autopay=False)
+    other.save_to_parquet()
+    assert list(tracker.filter_data("expenses", source="parquet")["amount"]) == [10.0]
+    other.expense_store.append(category="Rent", amount=500.0, date="2024-03-01", place="Home", autopay=True)
+    other.save_to_parquet()
+    assert sorted(tracker.filter_data("expenses", source="parquet")["amount"]) == [10.0, 500.0]
+    assert len(tracker.view_data("expenses", source="parquet")) == 2
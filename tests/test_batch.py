@@ -0,0 +1,98 @@
+# Expense-Tracker
+# The batch (non-interactive) command lines of both CLIs.
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+EXPENSES_CSV = ("Category,Amount,Date,Place of Spending,Auto-Pay\n"
+                "Food,10.50,2024-03-05,Cafe,False\n"
+                "Rent,500,2024-03-01,Home,True\n"
+                "Food,-3,2024-03-07,Cafe,False\n")
+
+
+def run(module, argv, capsys):
+    """Run module.batch(argv); return its status and the JSON lines on stdout, with stderr."""
+    status = module.batch(argv)
+    captured = capsys.readouterr()
+    return status, [json.loads(line) for line in captured.out.splitlines()], captured.err
+
+
+def test_sql_batch_arguments(sqlite_backend):
+    parser = sqlite_backend._batch_parser()
+    args = parser.parse_args(["ingest"])
+    assert (args.files, args.table, args.format, args.date_format) == (["-"], "expenses", "auto", "%Y-%m-%d")
+    args = parser.parse_args(["ingest", "a.csv", "b.jsonl", "--table", "received", "--batch-size", "10", "--restart"])
+    assert (args.files, args.table, args.batch_size, args.restart) == (["a.csv", "b.jsonl"], "received", 10, True)
+    args = parser.parse_args(["export", "--format", "jsonl", "--from", "2024-03-01", "--to", "2024-03-31", "--category", "Food"])
+    assert (args.format, args.date_start, args.date_end, args.category, args.month) == ("jsonl", "2024-03-01", "2024-03-31", "Food", None)
+    assert parser.parse_args(["totals", "--month", "2024-03", "2024-04"]).month == ["2024-03", "2024-04"]
+
+
+def test_sql_batch_writes_json_lines_to_stdout_and_messages_to_stderr(sqlite_backend, capsys):
+    with open("upload.csv", "w") as f:
+        f.write(EXPENSES_CSV)
+    status, lines, err = run(sqlite_backend, ["ingest", "upload.csv"], capsys)
+    assert status == 0
+    assert lines[0] == {"rejected": "upload.csv", "line": 4, "reason": "negative amount",
+                        "record": {"Category": "Food", "Amount": "-3", "Date": "2024-03-07", "Place of Spending": "Cafe", "Auto-Pay": "False"}}
+    assert lines[1]["source"] == "upload.csv" and (lines[1]["rows"], lines[1]["rejected"]) == (2, 1)
+    assert lines[-1]["command"] == "ingest" and (lines[-1]["rows"], lines[-1]["rejected"]) == (2, 1)
+    assert "Database connection established successfully." in err
+
+    status, lines, _ = run(sqlite_backend, ["totals", "--month", "2024-03"], capsys)
+    assert status == 0
+    assert lines == [{"command": "totals", "month": "2024-03", "expenses": 510.5, "received": 0, "balance": -510.5}]
+
+    status, lines, err = run(sqlite_backend, ["export", "--format", "jsonl", "--category", "Food"], capsys)
+    assert status == 0
+    assert [(line["category"], line["amount"]) for line in lines] == [("Food", 10.5)]
+    sqlite_backend.batch(["export", "--format", "csv"])
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == ["Category,Amount,Date,Place of Spending,Auto-Pay",
+                                         "Rent,500.0,2024-03-01,Home,True", "Food,10.5,2024-03-05,Cafe,False"]
+    summary = [json.loads(line) for line in captured.err.splitlines() if line.startswith("{")]
+    assert summary == [{"command": "export", "format": "csv", "table": "expenses", "path": "-", "rows": 2}]
+
+
+def test_sql_batch_exit_codes_on_bad_input(sqlite_backend, capsys):
+    status, lines, _ = run(sqlite_backend, ["totals", "--month", "2024-13"], capsys)
+    assert status == 1 and lines == [{"command": "totals", "month": "2024-13", "error": "Invalid month. Use YYYY-MM."}]
+    status, lines, _ = run(sqlite_backend, ["ingest", "missing.csv"], capsys)
+    assert status == 1 and lines[-1]["rows"] == 0 and "missing.csv" in lines[-1]["error"]
+    with open("wrong.csv", "w") as f:
+        f.write("Who,What\nme,that\n")
+    status, lines, _ = run(sqlite_backend, ["ingest", "wrong.csv"], capsys)
+    assert status == 1 and "missing required columns" in lines[-1]["error"]
+    with pytest.raises(SystemExit) as exit:
+        sqlite_backend.batch(["refund"])
+    assert exit.value.code == 2
+    with pytest.raises(SystemExit) as exit:
+        sqlite_backend.batch(["ingest", "--table", "savings"])
+    assert exit.value.code == 2
+
+
+def test_csv_batch_needs_the_login_from_the_environment(tmp_path, monkeypatch, capsys):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("EXPENSES_ID", raising=False)
+    monkeypatch.delenv("EXPENSES_PASSWORD", raising=False)
+    status, lines, _ = run(codewithoutSQL, ["totals"], capsys)
+    assert status == 1 and lines == [{"command": "totals", "error": "Invalid ID or Password."}]
+    monkeypatch.setenv("EXPENSES_ID", "4321")
+    assert run(codewithoutSQL, ["totals"], capsys)[0] == 1
+    assert not os.path.exists(codewithoutSQL.CSV_FILE)
+
+    monkeypatch.setenv("EXPENSES_ID", "1234")
+    monkeypatch.setattr(sys, "stdin", io.StringIO("Date,Amount Spent,Category,Place,Autopay\n"
+                                                  "05-03-2024,10.5,Food,Cafe,0\n"
+                                                  "someday,3,Food,Cafe,0\n"))
+    status, lines, err = run(codewithoutSQL, ["ingest"], capsys)
+    assert status == 0
+    assert lines[0]["rejected"] == "-" and lines[0]["reason"] == "invalid date"
+    assert lines[-1] == {"command": "ingest", "rows": 1, "rejected": 1}
+    status, lines, _ = run(codewithoutSQL, ["totals", "--month", "2024-03"], capsys)
+    assert status == 0 and lines == [{"command": "totals", "month": "2024-03", "expenses": 10.5}]
@@ -0,0 +1,35 @@
+# Expense-Tracker
+# Chart rendering in worker processes.
+
+import os
+import threading
+
+import pandas as pd
+
+from ledger.charts import render_charts
+
+
+def test_charts_render_in_workers_while_another_thread_runs(tmp_path):
+    frame = pd.DataFrame({
+        "category": ["Food", "Rent", "Food", "Bills"],
+        "amount": [12.5, 500.0, 7.5, 60.25],
+        "date": pd.to_datetime(["2024-01-05", "2024-01-01", "2024-02-09", "2024-02-11"])
+    })
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def busy():
+        # Holds a lock most of the time, as the write-behind writer does mid-flush.
+        while not stop.is_set():
+            with lock:
+                stop.wait(0.01)
+
+    thread = threading.Thread(target=busy, daemon=True)
+    thread.start()
+    try:
+        results = render_charts(frame, out_dir=str(tmp_path), charts=("bar", "line", "pie"), workers=2)
+    finally:
+        stop.set()
+        thread.join()
+    assert [result["chart"] for result in results] == ["bar", "line", "pie"]
+    assert all(result["error"] is None and os.path.getsize(result["path"]) > 0 for result in results)
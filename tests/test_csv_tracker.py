@@ -0,0 +1,104 @@
+# Expense-Tracker
+# The CSV CLI: CSV files saved by older versions, journal recovery and checkpoints.
+
+import contextlib
+import csv
+import io
+
+import pandas as pd
+
+
+def load(codewithoutSQL):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tracker = codewithoutSQL.Expenses()
+    return tracker, output.getvalue()
+
+
+def test_legacy_dates_are_read_and_unreadable_rows_kept(tmp_path, monkeypatch):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    with open(codewithoutSQL.CSV_FILE, "w") as f:
+        # Older versions saved the date as typed.
+        f.write("Date,Amount Spent,Category,Place,Autopay\n"
+                "05-03-2024,10.0,Food,Cafe,0\n"
+                "6/3/2024,20.0,Food,Shop,0\n"
+                "2024-03-07,30.0,Rent,Home,1\n"
+                "someday,40.0,Fun,Park,0\n")
+    tracker, output = load(codewithoutSQL)
+    assert "Skipped 1 unreadable rows" in output
+    assert list(tracker.store.to_frame()["date"]) == list(pd.to_datetime(["2024-03-05", "2024-03-06", "2024-03-07"]))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.compact_csv()
+        tracker.close()
+    with open(codewithoutSQL.REJECTED_FILE) as f:
+        assert list(csv.reader(f)) == [codewithoutSQL.CSV_HEADER, ["someday", "40.0", "Fun", "Park", "0"]]
+    with open(codewithoutSQL.CSV_FILE) as f:
+        assert [row[0] for row in csv.reader(f)] == ["Date", "05-03-2024", "06-03-2024", "07-03-2024"]
+    reloaded, output = load(codewithoutSQL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded.close()
+    assert "unreadable" not in output
+    assert len(reloaded.store) == 3
+
+
+def test_journaled_expenses_are_recovered_after_a_crash(tmp_path, monkeypatch):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    tracker, _ = load(codewithoutSQL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.add_expense("Rent", 500.0, pd.Timestamp("2024-03-01"), "Home", True)
+        tracker.save_to_csv()
+        tracker.add_expense("Food", 10.5, pd.Timestamp("2024-03-05"), "Cafe", False)
+        tracker.add_expense("Food", 10.5, pd.Timestamp("2024-03-05"), "Cafe", False)
+    # The process dies: the journal is on disk but the last two rows never reached the CSV.
+    tracker.journal.close()
+    with open(codewithoutSQL.JOURNAL_FILE, "a") as f:
+        f.write('{"lsn":3,"date":"2024-03-')
+    recovered, output = load(codewithoutSQL)
+    assert "Recovered 2 expenses" in output
+    assert list(recovered.store.to_frame()["amount"]) == [500.0, 10.5, 10.5]
+    with contextlib.redirect_stdout(io.StringIO()):
+        recovered.close()
+    reloaded, output = load(codewithoutSQL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded.close()
+    assert "Recovered" not in output
+    assert len(reloaded.store) == 3
+
+
+def test_rows_appended_after_a_torn_last_line_are_kept(tmp_path, monkeypatch):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    with open(codewithoutSQL.CSV_FILE, "w") as f:
+        f.write("Date,Amount Spent,Category,Place,Autopay\n01-03-2024,500.0,Rent,Home,1\n02-03-2024,7")
+    tracker, output = load(codewithoutSQL)
+    assert "Skipped 1 unreadable rows" in output
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.add_expense("Food", 10.5, pd.Timestamp("2024-03-05"), "Cafe", False)
+        tracker.close()
+    with open(codewithoutSQL.CSV_FILE) as f:
+        assert list(csv.reader(f))[-2:] == [["02-03-2024", "7"], ["05-03-2024", "10.5", "Food", "Cafe", "0"]]
+    reloaded, _ = load(codewithoutSQL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded.close()
+    assert list(reloaded.store.to_frame()["amount"]) == [500.0, 10.5]
+
+
+def test_background_checkpoints_save_every_row(tmp_path, monkeypatch):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(codewithoutSQL, "CHECKPOINT_RECORDS", 50)
+    tracker, _ = load(codewithoutSQL)
+    categories = ["Food", "Rent", "Bills"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        # New categories keep arriving while checkpoints copy rows on their own thread.
+        for i in range(2000):
+            tracker.add_expense(f"{categories[i % 3]}{i // 100}", 1.0, pd.Timestamp("2024-03-01"), "Shop", False)
+        tracker.close()
+    reloaded, _ = load(codewithoutSQL)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded.close()
+    frame = reloaded.store.to_frame()
+    assert len(frame) == 2000
+    assert list(frame["category"].astype(str)) == [f"{categories[i % 3]}{i // 100}" for i in range(2000)]
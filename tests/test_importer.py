@@ -0,0 +1,72 @@
+# Expense-Tracker
+# Resumable imports of large ledger CSV files.
+
+import pytest
+
+from ledger.importer import ImportCheckpoint, import_csv
+from ledger.ingest import EXPENSE_COLUMNS
+
+ROWS = 6000
+
+
+def write_ledger(path, rows=ROWS):
+    with open(path, "w") as f:
+        f.write("Category,Amount,Date,Place of Spending,Auto-Pay\n")
+        for i in range(rows):
+            f.write(f"Food,{i}.25,2024-03-{i % 28 + 1:02d},Cafe number {i},False\n")
+
+
+class Interrupted(Exception):
+    pass
+
+
+def collect(amounts, fail_after=None):
+    """A write callback storing the amounts, interrupted once fail_after chunks are stored."""
+    def write(clean):
+        if fail_after is not None and len(amounts) >= fail_after:
+            raise Interrupted()
+        amounts.append(list(clean["amount"]))
+    return write
+
+
+def test_interrupted_import_resumes_after_the_last_stored_chunk(tmp_path):
+    path = str(tmp_path / "big.csv")
+    write_ledger(path)
+    directory = str(tmp_path / "checkpoints")
+    first = []
+    with pytest.raises(Interrupted):
+        import_csv(path, EXPENSE_COLUMNS, collect(first, fail_after=1), memory_limit=0,
+                   checkpoint=ImportCheckpoint(directory, path, "expenses"))
+    assert 0 < len(first[0]) < ROWS
+
+    checkpoint = ImportCheckpoint(directory, path, "expenses")
+    assert not checkpoint.stale and checkpoint.rows == len(first[0])
+    rest = []
+    summary = import_csv(path, EXPENSE_COLUMNS, collect(rest), memory_limit=0, checkpoint=checkpoint)
+    assert summary["resumed_at_line"] == len(first[0]) + 2
+    assert summary["rows"] == ROWS - len(first[0])
+    amounts = first[0] + [amount for chunk in rest for amount in chunk]
+    assert amounts == [i + 0.25 for i in range(ROWS)]
+    assert checkpoint.complete and checkpoint.rows == ROWS
+
+    again = import_csv(path, EXPENSE_COLUMNS, collect([]), memory_limit=0, checkpoint=ImportCheckpoint(directory, path, "expenses"))
+    assert again["already_imported"] and again["rows"] == 0
+
+
+def test_changed_file_is_imported_from_the_start(tmp_path):
+    path = str(tmp_path / "big.csv")
+    write_ledger(path)
+    directory = str(tmp_path / "checkpoints")
+    with pytest.raises(Interrupted):
+        import_csv(path, EXPENSE_COLUMNS, collect([], fail_after=1), memory_limit=0,
+                   checkpoint=ImportCheckpoint(directory, path, "expenses"))
+    # Replaced by a different export before the import was resumed.
+    write_ledger(path, rows=ROWS - 1)
+
+    checkpoint = ImportCheckpoint(directory, path, "expenses")
+    assert checkpoint.stale and checkpoint.offset == 0
+    chunks = []
+    summary = import_csv(path, EXPENSE_COLUMNS, collect(chunks), memory_limit=0, checkpoint=checkpoint)
+    assert summary["resumed_at_line"] is None
+    assert [amount for chunk in chunks for amount in chunk] == [i + 0.25 for i in range(ROWS - 1)]
+    assert not ImportCheckpoint(directory, path, "expenses").stale
@@ -0,0 +1,59 @@
+# Expense-Tracker
+# The MySQL CLI's in-memory fallback filters like its database queries.
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+EXPENSE = "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+ROWS = [("Food", 10.0, "2024-02-28", "Cafe", False),
+        ("Food", 12.5, "2024-03-01", "Cafe", False),
+        ("Rent", 500.0, "2024-03-15", "Home", True),
+        ("Food", 7.5, "2024-03-31", "Shop", False),
+        ("Bills", 60.0, "2024-04-01", "Home", True)]
+
+
+@pytest.fixture
+def tracker(sql_tracker):
+    with sql_tracker.db.cursor() as cursor:
+        cursor.executemany(EXPENSE, ROWS)
+    sql_tracker.expense_store.extend({
+        "category": [row[0] for row in ROWS],
+        "amount": [row[1] for row in ROWS],
+        "date": pd.to_datetime([row[2] for row in ROWS]),
+        "place": [row[3] for row in ROWS],
+        "autopay": [row[4] for row in ROWS]
+    })
+    return sql_tracker
+
+
+def both(tracker, monkeypatch, call):
+    """Return call(tracker) on the database and then on the in-memory stores."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        online = call(tracker)
+        with monkeypatch.context() as patch:
+            patch.setattr(tracker.db, "available", lambda: False)
+            offline = call(tracker)
+    return online, offline
+
+
+@pytest.mark.parametrize("filters", [
+    {"use_monthly": "2024-03-01"},
+    {"use_monthly": "2024-03-01", "key": "category", "value": "Food"},
+    {"date_start": "2024-03-01", "date_end": "2024-03-20"}
+])
+def test_aggregate_offline_matches_database(tracker, monkeypatch, filters):
+    for by in (["month", "category"], ["date"]):
+        online, offline = both(tracker, monkeypatch, lambda t: t.aggregate("expenses", by, **filters))
+        assert offline.to_dict(orient="list") == online.to_dict(orient="list")
+
+
+def test_offline_filters_honor_use_monthly(tracker, monkeypatch):
+    online, offline = both(tracker, monkeypatch, lambda t: t.filter_data("expenses", use_monthly="2024-03-01", columns=["amount"]))
+    assert sorted(offline["amount"]) == sorted(online["amount"].astype(float)) == [7.5, 12.5, 500.0]
+    online, offline = both(tracker, monkeypatch, lambda t: list(t.iter_filtered("expenses", use_monthly="2024-03-01", columns=["date", "amount"])))
+    assert list(pd.concat(offline)["amount"]) == list(pd.concat(online)["amount"]) == [12.5, 500.0, 7.5]
+    online, offline = both(tracker, monkeypatch, lambda t: t.aggregate("expenses", ["month"], use_monthly="2024-13-01"))
+    assert offline.empty and online.empty
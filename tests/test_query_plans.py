@@ -0,0 +1,40 @@
+# Expense-Tracker
+# The MySQL CLI's filtered and month-range queries use the date indexes (checked on SQLite).
+
+import pytest
+
+EXPENSE = "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+RECEIVED = "INSERT INTO received (sender, amount, date) VALUES (%s, %s, %s)"
+
+
+def plan(tracker, table, **filters):
+    """Return the EXPLAIN QUERY PLAN details of the query _build_query makes for filters."""
+    arguments = dict(date_start=None, date_end=None, key=None, value=None, use_monthly=None)
+    arguments.update(filters)
+    with tracker.db.cursor() as cursor:
+        query, params = tracker._build_query(cursor, table, **arguments)
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        return " | ".join(row[-1] for row in cursor.fetchall())
+
+
+@pytest.fixture
+def tracker(sql_tracker):
+    with sql_tracker.db.cursor() as cursor:
+        cursor.executemany(EXPENSE, [("Food", day, f"2024-03-{day:02d}", "Cafe", False) for day in range(1, 29)])
+        cursor.executemany(RECEIVED, [("Mom", day, f"2024-03-{day:02d}") for day in range(1, 29)])
+    return sql_tracker
+
+
+@pytest.mark.parametrize("filters", [
+    {"use_monthly": "2024-03-01"},
+    {"date_start": "2024-03-01", "date_end": "2024-03-15"},
+    {"date_start": "2024-03-10"}
+])
+def test_date_ranges_use_date_indexes(tracker, filters):
+    assert "USING INDEX idx_expenses_date" in plan(tracker, "expenses", **filters)
+    assert "USING INDEX idx_received_date" in plan(tracker, "received", **filters)
+
+
+def test_key_and_month_use_composite_indexes(tracker):
+    assert "USING INDEX idx_expenses_category_date" in plan(tracker, "expenses", key="category", value="Food", use_monthly="2024-03-01")
+    assert "USING INDEX idx_received_sender_date" in plan(tracker, "received", key="sender", value="Mom", use_monthly="2024-03-01")
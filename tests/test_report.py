@@ -0,0 +1,50 @@
+# Expense-Tracker
+# The streaming PDF report.
+
+import base64
+import re
+import zlib
+
+import pandas as pd
+
+from ledger.report import write_pdf_report
+
+CATEGORIES = ["Food", "Rent", "Bills"]
+
+
+def expense_chunks(rows, size=30):
+    for start in range(0, rows, size):
+        lines = range(start, min(start + size, rows))
+        yield pd.DataFrame({
+            "Category": [CATEGORIES[i % 3] for i in lines],
+            "Amount": [i + 0.5 for i in lines],
+            "Date": pd.to_datetime(["2024-03-05"] * len(lines)),
+            "Place of Spending": ["Cafe"] * len(lines),
+            "Auto-Pay": [i % 2 == 0 for i in lines]
+        })
+
+
+def page_text(path):
+    """The PDF's page content streams, decoded, with the number of pages it declares."""
+    with open(path, "rb") as f:
+        data = f.read()
+    streams = re.findall(rb"/Filter \[ /ASCII85Decode /FlateDecode \] /Length \d+\s*>>\s*stream\r?\n(.*?)~>\s*endstream", data, re.S)
+    text = b"".join(zlib.decompress(base64.a85decode(stream.replace(b"\n", b""))) for stream in streams)
+    return int(re.search(rb"/Count (\d+)", data).group(1)), len(streams), text.decode("latin-1")
+
+
+def test_multi_page_report_has_a_table_per_page_and_subtotals(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    summaries = write_pdf_report(path, "Expense Report", [
+        ("Expenses", "Category", expense_chunks(100)),
+        ("Received", "Sender", iter([]))
+    ], rows_per_page=32)
+    assert summaries[0]["rows"] == 100
+    assert summaries[0]["subtotals"].to_dict() == {"Bills": 1666.5, "Food": 1700.0, "Rent": 1633.5}
+    assert summaries[1]["rows"] == 0
+    pages, compressed, text = page_text(path)
+    # Tables of 32, 32, 32 and 4 rows, one per page; every page's content is deflated.
+    assert pages == compressed == 4
+    subtotals = re.findall(r"\((Bills|Food|Rent|Total)\) Tj T\* ET\n.*?\((\d+)\) Tj T\* ET\n.*?\(([\d.]+)\) Tj", text)
+    assert subtotals == [("Bills", "33", "1666.50"), ("Food", "34", "1700.00"), ("Rent", "33", "1633.50"), ("Total", "100", "5000.00")]
+    assert "No received match the filter." in text
@@ -0,0 +1,130 @@
+# Expense-Tracker
+# Schema migrations, run against the embedded SQLite backend.
+
+from conftest import execute, query
+
+from ledger.schema import SQLITE_MIGRATIONS, migrate
+
+EXPENSE = "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+RECEIVED = "INSERT INTO received (sender, amount, date) VALUES (%s, %s, %s)"
+
+
+def monthly(connection, aggregate):
+    """The aggregate's non-empty rows, as (month, key, total, entries)."""
+    return query(connection, f"SELECT * FROM {aggregate} WHERE entries > 0 ORDER BY 1, 2")
+
+
+def recomputed(connection, table, key):
+    return query(connection, f"SELECT strftime('%Y-%m', date), {key}, SUM(amount), COUNT(*) FROM {table} "
+                             f"GROUP BY 1, 2 ORDER BY 1, 2")
+
+
+def test_migrate_fresh_database(connection):
+    assert migrate(connection, SQLITE_MIGRATIONS) == [1, 2, 3, 4, 5, 6]
+    assert [row[0] for row in query(connection, "SELECT version FROM schema_version ORDER BY version")] == [1, 2, 3, 4, 5, 6]
+    indexes = {row[0] for row in query(connection, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_expenses_row_hash", "idx_received_row_hash", "idx_expenses_date", "idx_received_date"} <= indexes
+    assert not {"uq_expenses_row_hash", "uq_received_row_hash"} & indexes
+    tables = {row[0] for row in query(connection, "SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"monthly_totals", "monthly_received"} <= tables
+
+
+def test_migrate_again_is_a_no_op(connection):
+    migrate(connection, SQLITE_MIGRATIONS)
+    execute(connection, EXPENSE, ("Food", 12.5, "2024-01-05", "Cafe", False))
+    schema = query(connection, "SELECT type, name, sql FROM sqlite_master ORDER BY name")
+    assert migrate(connection, SQLITE_MIGRATIONS) == []
+    assert query(connection, "SELECT type, name, sql FROM sqlite_master ORDER BY name") == schema
+    assert query(connection, "SELECT COUNT(*) FROM schema_version") == [(6,)]
+    assert query(connection, "SELECT total, entries FROM monthly_totals") == [(12.5, 1)]
+
+
+def test_migration_keeps_repeated_rows(connection):
+    for row in [("Food", 10, "2024-01-05", "Cafe", False),
+                ("Food", 10, "2024-01-05", "Cafe", False),
+                ("Rent", 500, "2024-01-01", "Home", True),
+                ("Food", 10, "2024-01-05", "Cafe", False)]:
+        execute(connection, EXPENSE, row)
+    migrate(connection, SQLITE_MIGRATIONS)
+    assert query(connection, "SELECT id, category FROM expenses ORDER BY id") == [
+        (1, "Food"), (2, "Food"), (3, "Rent"), (4, "Food")]
+    assert query(connection, "SELECT category, total, entries FROM monthly_totals ORDER BY category") == [
+        ("Food", 30, 3), ("Rent", 500, 1)]
+
+
+def test_identical_rows_are_separate_entries(connection):
+    migrate(connection, SQLITE_MIGRATIONS)
+    cursor = connection.cursor()
+    cursor.executemany(EXPENSE, [
+        ("Food", 10, "2024-01-05", "Cafe", False),
+        ("Food", 10, "2024-01-05", "Cafe", False),
+        ("Food", 10, "2024-01-05", "Cafe", True)
+    ])
+    connection.commit()
+    cursor.close()
+    assert query(connection, "SELECT autopay FROM expenses ORDER BY id") == [(0,), (0,), (1,)]
+    assert query(connection, "SELECT total, entries FROM monthly_totals") == [(30, 3)]
+
+
+def test_unique_row_hash_key_is_dropped(connection):
+    migrate(connection, SQLITE_MIGRATIONS[:5])
+    # As left by versions 1 and 2 before repeated entries were allowed.
+    execute(connection, "DROP INDEX idx_expenses_row_hash")
+    execute(connection, "CREATE UNIQUE INDEX uq_expenses_row_hash ON expenses (row_hash)")
+    assert migrate(connection, SQLITE_MIGRATIONS) == [6]
+    execute(connection, EXPENSE, ("Food", 10, "2024-01-05", "Cafe", False))
+    execute(connection, EXPENSE, ("Food", 10, "2024-01-05", "Cafe", False))
+    assert query(connection, "SELECT COUNT(*) FROM expenses") == [(2,)]
+    indexes = {row[0] for row in query(connection, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_expenses_row_hash" in indexes and "uq_expenses_row_hash" not in indexes
+
+
+def test_rerun_after_partly_applied_migration(connection):
+    # As if migration 1 failed after adding its column: MySQL would have committed the ALTER.
+    column = [step for step in SQLITE_MIGRATIONS[0][2] if isinstance(step, tuple)][0][1]
+    execute(connection, column)
+    assert migrate(connection, SQLITE_MIGRATIONS) == [1, 2, 3, 4, 5, 6]
+    assert query(connection, "SELECT COUNT(*) FROM pragma_table_xinfo('expenses') WHERE name = 'row_hash'") == [(1,)]
+
+
+def test_update_triggers_move_rows_between_months_and_keys(connection):
+    migrate(connection, SQLITE_MIGRATIONS)
+    execute(connection, EXPENSE, ("Food", 10, "2024-01-05", "Cafe", False))
+    execute(connection, EXPENSE, ("Food", 20, "2024-01-09", "Shop", False))
+    execute(connection, RECEIVED, ("Mom", 100, "2024-01-02"))
+    execute(connection, "UPDATE expenses SET amount = 15 WHERE place = 'Cafe'")
+    execute(connection, "UPDATE expenses SET date = '2024-02-01', category = 'Rent' WHERE place = 'Shop'")
+    execute(connection, "UPDATE received SET amount = 80, date = '2024-03-31'")
+    assert monthly(connection, "monthly_totals") == [("2024-01", "Food", 15, 1), ("2024-02", "Rent", 20, 1)]
+    assert monthly(connection, "monthly_totals") == recomputed(connection, "expenses", "category")
+    assert monthly(connection, "monthly_received") == [("2024-03", "Mom", 80, 1)]
+    assert monthly(connection, "monthly_received") == recomputed(connection, "received", "sender")
+
+
+def test_update_migration_repairs_earlier_drift(connection):
+    migrate(connection, SQLITE_MIGRATIONS[:4])
+    execute(connection, EXPENSE, ("Food", 10, "2024-01-05", "Cafe", False))
+    # Before migration 5 an update goes unnoticed.
+    execute(connection, "UPDATE expenses SET amount = 25")
+    assert monthly(connection, "monthly_totals") == [("2024-01", "Food", 10, 1)]
+    assert migrate(connection, SQLITE_MIGRATIONS) == [5, 6]
+    assert monthly(connection, "monthly_totals") == [("2024-01", "Food", 25, 1)]
+
+
+def test_month_tables_are_folded_into_expenses_and_dropped(connection):
+    execute(connection, EXPENSE, ("Rent", 500, "2024-01-01", "Home", True))
+    # As left by the old startup, which copied January into its own table on every start.
+    execute(connection, "CREATE TABLE expenses_2024_01 (id INTEGER PRIMARY KEY AUTOINCREMENT, category VARCHAR(32) NOT NULL, "
+                        "amount DECIMAL(10,2) NOT NULL, date DATE NOT NULL, place VARCHAR(32), autopay BOOLEAN NOT NULL DEFAULT FALSE)")
+    month = "INSERT INTO expenses_2024_01 (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+    for row in [("Rent", 500, "2024-01-01", "Home", True),
+                ("Rent", 500, "2024-01-01", "Home", True),
+                ("Food", 12.5, "2024-01-05", None, False),
+                ("Food", 12.5, "2024-01-05", None, False),
+                ("Bills", 60, "2024-01-11", "Online", False)]:
+        execute(connection, month, row)
+    assert migrate(connection, SQLITE_MIGRATIONS) == [1, 2, 3, 4, 5, 6]
+    assert query(connection, "SELECT category, amount, place FROM expenses ORDER BY category") == [
+        ("Bills", 60, "Online"), ("Food", 12.5, None), ("Rent", 500, "Home")]
+    assert query(connection, "SELECT name FROM sqlite_master WHERE name LIKE 'expenses_2024%'") == []
+    assert monthly(connection, "monthly_totals") == recomputed(connection, "expenses", "category")
@@ -0,0 +1,106 @@
+# Expense-Tracker
+# The MySQL CLI loading and syncing its CSV files, on the embedded SQLite backend.
+
+import os
+
+from conftest import quietly
+
+from ledger.ingest import EXPENSE_COLUMNS
+
+ENTRY = "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+
+EXPENSES_CSV = ("Category,Amount,Date,Place of Spending,Auto-Pay\n"
+                "Food,10.50,2024-03-05,Cafe,False\n"
+                "Food,10.50,2024-03-05,Cafe,False\n"
+                "Rent,500,2024-03-01,Home,True\n")
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def rows(tracker, sql):
+    with tracker.db.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+def test_repeated_csv_rows_are_loaded_once_per_start(sqlite_backend):
+    write("expenses.csv", EXPENSES_CSV)
+    write("received.csv", "Sender,Amount,Date of Receiving\n")
+    for _ in range(2):
+        tracker = quietly(sqlite_backend.Expenses)
+        assert rows(tracker, "SELECT COUNT(*) FROM expenses") == [(3,)]
+        assert tracker._aggregate_total("monthly_totals", "2024-03", tracker.expense_store) == 521.0
+        assert tracker.expense_store.running_total(month="2024-03") == 521.0
+        quietly(tracker.close)
+
+
+def test_repeated_entries_reach_the_database(sql_tracker):
+    for _ in range(2):
+        sql_tracker.writer.put("expenses", ("Food", 10.5, "2024-03-05", "Cafe", False))
+    assert sql_tracker.writer.flush()
+    assert rows(sql_tracker, "SELECT COUNT(*), SUM(amount) FROM expenses") == [(2, 21.0)]
+    assert sql_tracker.writer.reports() == []
+
+
+def test_mysql_is_chosen_per_operation_and_keeps_its_backlog(sqlite_backend, monkeypatch):
+    import sqlite3
+    from contextlib import contextmanager
+
+    from ledger.sqlite import SQLitePool
+
+    class FlakyMySQL(SQLitePool):
+        """Stands in for the MySQL pool: a SQLite file that is reachable only while up is set."""
+        up = False
+
+        def __init__(self, config, on_connect=None):
+            super().__init__("mysql.db", on_connect=on_connect)
+
+        def available(self):
+            return FlakyMySQL.up
+
+        @contextmanager
+        def cursor(self, **kwargs):
+            if not FlakyMySQL.up:
+                raise sqlite3.OperationalError("Database unavailable.")
+            with super().cursor(**kwargs) as cursor:
+                yield cursor
+
+    monkeypatch.setattr(sqlite_backend, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(sqlite_backend, "ConnectionPool", FlakyMySQL)
+    spill = sqlite_backend.WRITE_BEHIND_SPILL.format(backend="mysql")
+    # Left by an earlier MySQL session.
+    write(spill, '{"table":"expenses","row":["Rent",500.0,"2024-03-01","Home",true]}\n')
+
+    tracker = quietly(sqlite_backend.Expenses)
+    assert tracker.db._fallback is None
+    assert quietly(tracker.filter_data, "expenses").empty
+    assert tracker.db.dialect == "sqlite" and tracker.db._fallback is not None
+    assert not quietly(tracker.writer.flush)
+    assert rows(tracker, "SELECT COUNT(*) FROM expenses") == [(0,)]
+
+    FlakyMySQL.up = True
+    try:
+        assert tracker.writer.flush()
+        assert rows(tracker, "SELECT category FROM expenses") == [("Rent",)]
+        assert not os.path.exists(spill)
+        quietly(tracker.close)
+    finally:
+        FlakyMySQL.up = False
+
+
+def test_sync_inserts_only_the_copies_the_database_lacks(sql_tracker):
+    with sql_tracker.db.cursor() as cursor:
+        cursor.executemany(ENTRY, [("Food", 10.5, "2024-03-05", "Cafe", False), ("Rent", 500, "2024-03-01", "Home", True)])
+    write("expenses.csv", EXPENSES_CSV + "Food,10.50,2024-03-05,Cafe,False\nBills,60,2024-03-11,Online,False\n")
+    with sql_tracker.db.cursor() as cursor:
+        added = quietly(sql_tracker._sync_csv_file, cursor, "sqlite", "expenses.csv", EXPENSE_COLUMNS, "expenses", 2)
+    assert list(zip(added["category"], added["amount"])) == [("Food", 10.5), ("Food", 10.5), ("Bills", 60.0)]
+    assert rows(sql_tracker, "SELECT category, COUNT(*) FROM expenses GROUP BY category ORDER BY category") == [
+        ("Bills", 1), ("Food", 3), ("Rent", 1)]
+    with sql_tracker.db.cursor() as cursor:
+        again = quietly(sql_tracker._sync_csv_file, cursor, "sqlite", "expenses.csv", EXPENSE_COLUMNS, "expenses", 2)
+    assert again.empty
+    assert rows(sql_tracker, "SELECT total, entries FROM monthly_totals WHERE category = 'Food'") == [(31.5, 3)]
@@ -0,0 +1,102 @@
+# Expense-Tracker
+# ColumnStore running totals and fingerprints.
+
+import contextlib
+import io
+
+import pandas as pd
+
+from ledger.store import ColumnStore, EXPENSE_SCHEMA
+
+
+def expenses(rows):
+    return {
+        "category": [category for category, _, _ in rows],
+        "amount": [amount for _, amount, _ in rows],
+        "date": pd.to_datetime([date for _, _, date in rows]),
+        "place": ["Shop"] * len(rows),
+        "autopay": [False] * len(rows)
+    }
+
+
+def test_running_totals_follow_appends():
+    store = ColumnStore(EXPENSE_SCHEMA, capacity=2, group_by="category")
+    store.append(category="Food", amount=12.5, date="2024-01-05", place="Cafe", autopay=False)
+    store.extend(expenses([("Food", 7.5, "2024-01-20"), ("Rent", 500.0, "2024-02-01"), ("Bills", 60.25, "2024-02-11")]))
+    store.append(category="Rent", amount=500.0, date="2024-03-01", place="Home", autopay=True)
+    assert store.check_totals() == []
+    assert store.running_total(month="2024-01") == 20.0
+    assert store.running_total(key="Rent") == 1000.0
+    assert store.running_total() == store.total()
+
+
+def test_check_totals_catches_rows_changed_behind_its_back():
+    store = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    store.extend(expenses([("Food", 10.0, "2024-01-05"), ("Rent", 500.0, "2024-02-01")]))
+    # Rewrite an amount without going through append/extend.
+    store._arrays["amount"][1] = 450.0
+    mismatches = store.check_totals()
+    assert ("total", None, 510.0, 460.0) in mismatches
+    assert any(bucket == "by_month_key" and cached == 500.0 and expected == 450.0
+               for bucket, _, cached, expected in mismatches)
+
+
+def test_check_totals_after_compaction_drops_rows(tmp_path, monkeypatch):
+    import codewithoutSQL
+    monkeypatch.chdir(tmp_path)
+    with open(codewithoutSQL.CSV_FILE, "w") as f:
+        # The last line is torn, as if an append was interrupted.
+        f.write("Date,Amount Spent,Category,Place,Autopay\n01-01-2024,5.0,Food,Cafe,0\n02-01-2024,7")
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker = codewithoutSQL.Expenses()
+        tracker.add_expense("Rent", 500.0, pd.Timestamp("2024-02-01"), "Home", True)
+        tracker.add_expenses(pd.DataFrame(expenses([("Food", 2.5, "2024-01-09"), ("Bills", 60.0, "2024-03-03")])))
+        assert tracker.store.check_totals() == []
+        tracker.compact_csv()
+        tracker.close()
+        reloaded = codewithoutSQL.Expenses()
+        reloaded.close()
+    assert len(reloaded.store) == 4
+    assert reloaded.store.check_totals() == []
+    assert reloaded.store.running_total(month="2024-01") == 7.5
+
+
+def test_equal_totals_give_different_fingerprints():
+    first = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    second = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    first.extend(expenses([("Food", 10.0, "2024-01-05"), ("Food", 20.0, "2024-01-09")]))
+    second.extend(expenses([("Food", 15.0, "2024-01-05"), ("Food", 15.0, "2024-01-09")]))
+    assert first.totals.by_month_key == second.totals.by_month_key
+    assert first.fingerprint() != second.fingerprint()
+    third = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    third.extend(expenses([("Food", 10.0, "2024-01-09"), ("Food", 20.0, "2024-01-05")]))
+    assert third.fingerprint() != first.fingerprint()
+
+
+def test_same_rows_give_the_same_fingerprint_however_loaded():
+    rows = [("Food", 10.0, "2024-01-05"), ("Rent", 500.0, "2024-02-01"), ("Bills", 60.25, "2024-02-11")]
+    extended = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    extended.extend(expenses(rows))
+    appended = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    for row in pd.DataFrame(expenses(rows)).to_dict(orient="records"):
+        appended.append(**row)
+    # As read back from Parquet: dictionary-encoded with sorted categories.
+    categorical = ColumnStore(EXPENSE_SCHEMA, group_by="category")
+    frame = expenses(rows)
+    frame["category"] = pd.Categorical(frame["category"])
+    categorical.extend(frame)
+    assert appended.fingerprint() == extended.fingerprint() == categorical.fingerprint()
+    extended.append(category="Food", amount=1.0, date="2024-03-01", place="Shop", autopay=False)
+    assert extended.fingerprint() != appended.fingerprint()
+
+
+def test_ledger_version_tells_equal_totals_apart(sql_tracker):
+    statement = "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"
+    with sql_tracker.db.cursor() as cursor:
+        cursor.executemany(statement, [("Food", 10, "2024-01-05", "Cafe", False), ("Food", 20, "2024-01-09", "Cafe", False)])
+    before = sql_tracker._ledger_version("expenses")
+    with sql_tracker.db.cursor() as cursor:
+        cursor.execute("UPDATE expenses SET amount = 15")
+        cursor.execute("SELECT total, entries FROM monthly_totals")
+        assert cursor.fetchall() == [(30, 2)]
+    assert sql_tracker._ledger_version("expenses") != before
@@ -0,0 +1,68 @@
+# Expense-Tracker
+# Opt-in tracing of tracker operations, on the embedded SQLite backend.
+
+import inspect
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import quietly
+
+from ledger import trace
+
+ROWS = pd.DataFrame({
+    "category": ["Food", "Rent"],
+    "amount": [10.5, 500.0],
+    "date": pd.to_datetime(["2024-03-05", "2024-03-01"]),
+    "place": ["Cafe", "Home"],
+    "autopay": [False, True]
+})
+
+
+@pytest.fixture
+def tracing():
+    trace.reset()
+    yield trace
+    trace.disable()
+    trace.reset()
+
+
+def methods(cls):
+    return {name: value for name, value in vars(cls).items() if inspect.isfunction(value)}
+
+
+def test_traced_operations_count_their_sql(sql_tracker, tracing, tmp_path):
+    cls = type(sql_tracker)
+    originals = methods(cls)
+    path = tmp_path / "trace.jsonl"
+    tracing.enable(str(path))
+    assert cls.add_rows is not originals["add_rows"] and cls.add_rows.__wrapped__ is originals["add_rows"]
+
+    assert sql_tracker.add_rows("expenses", ROWS) == 2
+    quietly(sql_tracker.show_total_expenses, "2024-03")
+    metrics = tracing.metrics()
+    added = metrics["Expenses.add_rows"]
+    assert (added["count"], added["errors"], added["rows_written"]) == (1, 0, 2)
+    # Counters of nested spans are included in the enclosing one.
+    assert added["sql_statements"] >= metrics["Expenses._bulk_insert"]["sql_statements"] >= 1
+    total = metrics["Expenses.show_total_expenses"]
+    assert total["count"] == 1 and total["sql_statements"] >= 1 and total["rows_fetched"] >= 1
+    assert sql_tracker.total_expenses == 510.5
+
+    text = tracing.metrics_text()
+    assert "# TYPE expense_tracker_operation_seconds summary\n" in text
+    assert 'expense_tracker_operation_seconds_count{operation="Expenses.add_rows"} 1\n' in text
+    assert 'expense_tracker_sql_rows_written_total{operation="Expenses.add_rows"} 2\n' in text
+    assert 'expense_tracker_operation_errors_total{operation="Expenses.show_total_expenses"} 0\n' in text
+    # Peak memory is only measured with enable(memory=True).
+    assert "operation_peak_bytes" not in text
+
+    tracing.disable()
+    assert methods(cls) == originals
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    spans = {event["id"]: event for event in events}
+    bulk = next(event for event in events if event["name"] == "Expenses._bulk_insert")
+    assert spans[bulk["parent"]]["name"] == "Expenses.add_rows"
+    sql_tracker.add_rows("expenses", ROWS)
+    assert tracing.metrics()["Expenses.add_rows"]["count"] == 1
@@ -0,0 +1,119 @@
+# Expense-Tracker
+# The write-behind queue against the embedded SQLite backend.
+
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from ledger.schema import SQLITE_BASE_TABLES
+from ledger.sqlite import SQLitePool
+from ledger.writebehind import WriteBehind
+
+STATEMENTS = {"expenses": "INSERT INTO expenses (category, amount, date, place, autopay) VALUES (%s, %s, %s, %s, %s)"}
+FOOD = ("Food", 10.5, "2024-03-05", "Cafe", False)
+
+
+class FlakyPool:
+    """A SQLitePool that fails every transaction while down, recording when each was attempted."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.down = False
+        self.attempts = []
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        self.attempts.append(time.monotonic())
+        if self.down:
+            raise sqlite3.OperationalError("database is down")
+        with self.pool.cursor(**kwargs) as cursor:
+            yield cursor
+
+
+@pytest.fixture
+def pool(tmp_path):
+    sqlite = SQLitePool(str(tmp_path / "ledger.db"))
+    with sqlite.cursor() as cursor:
+        for statement in SQLITE_BASE_TABLES:
+            cursor.execute(statement)
+    yield FlakyPool(sqlite)
+    sqlite.close()
+
+
+def stored(pool):
+    with pool.pool.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM expenses")
+        return cursor.fetchone()[0]
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def open_queue(pool, tmp_path, **options):
+    return WriteBehind(pool, STATEMENTS, str(tmp_path / "pending.jsonl"), **options)
+
+
+def test_full_batch_is_written_in_one_transaction(pool, tmp_path):
+    queue = open_queue(pool, tmp_path, batch_records=3, flush_ms=60000)
+    queue.put("expenses", FOOD)
+    queue.put("expenses", FOOD)
+    time.sleep(0.1)
+    assert pool.attempts == [] and queue.pending() == 2
+    queue.put("expenses", FOOD)
+    wait_until(lambda: queue.written == 3)
+    assert len(pool.attempts) == 1 and stored(pool) == 3
+    assert queue.close() == 0
+
+
+def test_partial_batch_is_written_once_flush_ms_passes(pool, tmp_path):
+    queue = open_queue(pool, tmp_path, batch_records=100, flush_ms=300)
+    start = time.monotonic()
+    queue.put("expenses", FOOD)
+    assert queue.written == 0
+    wait_until(lambda: queue.written == 1)
+    assert time.monotonic() - start >= 0.3
+    assert len(pool.attempts) == 1 and stored(pool) == 1
+    queue.close()
+
+
+def test_failed_writes_are_retried_with_growing_delays(pool, tmp_path):
+    pool.down = True
+    queue = open_queue(pool, tmp_path, batch_records=1, retry_ms=50, max_retry_ms=200)
+    queue.put("expenses", FOOD)
+    wait_until(lambda: len(pool.attempts) >= 5)
+    gaps = [later - earlier for earlier, later in zip(pool.attempts, pool.attempts[1:])]
+    # 50, 100, 200, then capped at 200 milliseconds.
+    assert gaps[0] >= 0.05 and gaps[1] >= 0.1 and gaps[2] >= 0.2 and gaps[3] >= 0.2
+    assert gaps[1] > gaps[0] * 1.5 and gaps[3] < 0.4
+    assert queue.pending() == 1 and stored(pool) == 0
+    assert "They stay queued and will be retried." in queue.reports()[0]
+    pool.down = False
+    wait_until(lambda: queue.written == 1)
+    assert stored(pool) == 1
+    queue.close()
+
+
+def test_rows_left_at_close_are_spilled_and_written_by_the_next_queue(pool, tmp_path):
+    pool.down = True
+    queue = open_queue(pool, tmp_path, batch_records=100, flush_ms=60000)
+    queue.put("expenses", FOOD)
+    queue.put("expenses", ("Rent", 500.0, "2024-03-01", "Home", True))
+    queue.put("expenses", FOOD)
+    assert not queue.flush()
+    assert queue.close() == 3
+    assert list(WriteBehind.replay(queue.spill_path)) == [
+        ("expenses", list(FOOD)), ("expenses", ["Rent", 500.0, "2024-03-01", "Home", True]), ("expenses", list(FOOD))]
+
+    pool.down = False
+    reopened = open_queue(pool, tmp_path)
+    assert reopened.reports() == ["Retrying 3 entries left unwritten last time."]
+    assert reopened.flush()
+    assert stored(pool) == 3
+    assert not (tmp_path / "pending.jsonl").exists()
+    assert reopened.close() == 0